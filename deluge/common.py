@@ -1082,3 +1082,23 @@ def is_process_running(pid):
             return False
         else:
             return True
+
+
+def merge_response_part(result, part):
+    """Merge a part of a streamed RPC response into the result.
+
+    Args:
+        result (dict or list): The parts merged so far, or None for the first part.
+        part (dict or list): The part, dict parts update the result and list or tuple parts extend it.
+
+    Returns:
+        dict or list: The merged result.
+
+    """
+    if result is None:
+        return dict(part) if isinstance(part, dict) else list(part)
+    if isinstance(result, dict):
+        result.update(part)
+    else:
+        result.extend(part)
+    return result
@@ -16,16 +16,28 @@
 
 """
 
+import json
 import logging
+import os
+import time
 
 from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
 
 import deluge.component as component
 from deluge._libtorrent import lt
 from deluge.common import decode_string
+from deluge.configmanager import ConfigManager, get_config_dir
+from deluge.core.perfstats import PerfStats
 
 log = logging.getLogger(__name__)
 
+# The bounds of the adaptive alert polling interval, in seconds.
+ALERT_POLL_MIN_INTERVAL = 0.05
+ALERT_POLL_MAX_INTERVAL = 1.0
+# The delay after libtorrent notifies of new alerts, so that alerts posted together are popped together.
+ALERT_NOTIFY_DELAY = 0.005
+
 
 class AlertManager(component.Component):
     """AlertManager fetches and processes libtorrent alerts"""
@@ -55,15 +67,73 @@ def __init__(self):
         self.handlers = {}
         self.delayed_calls = []
 
+        # Set when libtorrent notifies of new alerts, so polling is only a fallback.
+        self.alert_notify = False
+        self.notify_call = None
+
+        # Statistics of the alerts and handlers, optionally dumped to a file periodically.
+        self.perf_stats = PerfStats()
+        self.perf_stats_dump_timer = LoopingCall(self.dump_perf_stats)
+        self.config = ConfigManager('core.conf')
+        self.config.register_set_function('perf_stats_dump_interval', self.on_set_perf_stats_dump_interval)
+
+    def start(self):
+        try:
+            self.session.set_alert_notify(self.on_alert_notify)
+        except AttributeError:
+            log.debug('No libtorrent alert notify, polling for alerts at an adaptive interval')
+        else:
+            self.alert_notify = True
+
     def update(self):
         self.delayed_calls = [dc for dc in self.delayed_calls if dc.active()]
-        self.handle_alerts()
+        num_alerts = self.handle_alerts()
+        self.adjust_poll_interval(num_alerts)
+
+    def adjust_poll_interval(self, num_alerts):
+        """Adjust the interval of the update timer to the alert load.
+
+        With alert notify the timer is only a fallback and polls at the max interval,
+        otherwise the interval halves when alerts were popped and doubles when idle.
+
+        Args:
+            num_alerts (int): The number of alerts popped by the last update.
+
+        """
+        timer = self._component_timer
+        if not timer:
+            return
+
+        if self.alert_notify:
+            timer.interval = ALERT_POLL_MAX_INTERVAL
+        elif num_alerts:
+            timer.interval = max(timer.interval / 2, ALERT_POLL_MIN_INTERVAL)
+        else:
+            timer.interval = min(timer.interval * 2, ALERT_POLL_MAX_INTERVAL)
+
+    def on_alert_notify(self):
+        """Called by libtorrent, from its own thread, when the alert queue is no longer empty."""
+        reactor.callFromThread(self.on_alerts_posted)
+
+    def on_alerts_posted(self):
+        # Coalesce notifications so a burst of alerts is handled in one update.
+        if self.notify_call and self.notify_call.active():
+            return
+        self.notify_call = reactor.callLater(ALERT_NOTIFY_DELAY, self.update)
 
     def stop(self):
+        if self.alert_notify:
+            self.session.set_alert_notify(lambda: None)
+            self.alert_notify = False
+        if self.notify_call and self.notify_call.active():
+            self.notify_call.cancel()
+        self.notify_call = None
         for delayed_call in self.delayed_calls:
             if delayed_call.active():
                 delayed_call.cancel()
         self.delayed_calls = []
+        if self.perf_stats_dump_timer.running:
+            self.perf_stats_dump_timer.stop()
 
     def register_handler(self, alert_type, handler):
         """
@@ -98,10 +168,12 @@ def deregister_handler(self, handler):
     def handle_alerts(self):
         """
         Pops all libtorrent alerts in the session queue and handles them appropriately.
+
+        :returns: int, the number of alerts popped
         """
         alerts = self.session.pop_alerts()
         if not alerts:
-            return
+            return 0
 
         num_alerts = len(alerts)
         if log.isEnabledFor(logging.DEBUG):
@@ -109,16 +181,52 @@ def handle_alerts(self):
         if num_alerts > 0.9 * self.alert_queue_size:
             log.warning('Warning total alerts queued, %s, passes 90%% of queue size.', num_alerts)
 
+        alert_types = [type(alert).__name__ for alert in alerts]
+        self.perf_stats.add_alerts(alert_types)
+        scheduled = time.time()
+
         # Loop through all alerts in the queue
-        for alert in alerts:
-            alert_type = type(alert).__name__
+        for alert, alert_type in zip(alerts, alert_types):
             # Display the alert message
             if log.isEnabledFor(logging.DEBUG):
                 log.debug('%s: %s', alert_type, decode_string(alert.message()))
             # Call any handlers for this alert type
             if alert_type in self.handlers:
                 for handler in self.handlers[alert_type]:
-                    self.delayed_calls.append(reactor.callLater(0, handler, alert))
+                    self.delayed_calls.append(reactor.callLater(0, self.call_handler, handler, alert, scheduled))
+        return num_alerts
+
+    def call_handler(self, handler, alert, scheduled):
+        """Call an alert handler, recording its run time and delay in the perf stats.
+
+        Args:
+            handler (func): The alert handler.
+            alert (lt.alert): The alert.
+            scheduled (float): The time the call was scheduled.
+
+        """
+        started = time.time()
+        try:
+            handler(alert)
+        finally:
+            self.perf_stats.add_handler_call(handler, scheduled, started, time.time())
+
+    def on_set_perf_stats_dump_interval(self, key, value):
+        if self.perf_stats_dump_timer.running:
+            self.perf_stats_dump_timer.stop()
+        if value > 0:
+            self.perf_stats_dump_timer.start(value, False)
+
+    def dump_perf_stats(self):
+        """Append the perf stats as a line of JSON to the perf_stats.log file in the config dir"""
+        stats = self.perf_stats.get_stats()
+        stats['time'] = time.time()
+        filepath = os.path.join(get_config_dir(), 'perf_stats.log')
+        try:
+            with open(filepath, 'a') as _file:
+                _file.write(json.dumps(stats) + '\n')
+        except IOError as ex:
+            log.error('Unable to write perf stats to %s: %s', filepath, ex)
 
     def set_alert_queue_size(self, queue_size):
         """Sets the maximum size of the libtorrent alert queue"""
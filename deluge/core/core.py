@@ -35,12 +35,17 @@
 from deluge.core.preferencesmanager import PreferencesManager
 from deluge.core.rpcserver import export
 from deluge.core.torrentmanager import TorrentManager
-from deluge.error import AddTorrentError, DelugeError, InvalidPathError, InvalidTorrentError
-from deluge.event import NewVersionAvailableEvent, SessionPausedEvent, SessionResumedEvent, TorrentQueueChangedEvent
+from deluge.core.torrentstatus import get_option_status_keys
+from deluge.error import AddTorrentError, DelugeError, InvalidParameterError, InvalidPathError, InvalidTorrentError
+from deluge.event import (NewVersionAvailableEvent, SessionPausedEvent, SessionResumedEvent, TorrentQueueChangedEvent,
+                          TorrentsChangedEvent)
 from deluge.httpdownloader import download_file
 
 log = logging.getLogger(__name__)
 
+# The shortest interval, in seconds, between the status updates pushed to a subscribed session.
+SUBSCRIPTION_MIN_INTERVAL = 0.5
+
 
 class Core(component.Component):
     def __init__(self, listen_interface=None, read_only_config_keys=None):
@@ -287,6 +292,72 @@ def add_torrents():
             defer.returnValue(errors)
         return task.deferLater(reactor, 0, add_torrents)
 
+    @export
+    def add_torrents_bulk(self, torrents):
+        """Adds torrent files, magnet links and urls to the session in bulk.
+
+        The urls are downloaded, then all the torrents are added with the TorrentManager
+        bulk add pipeline and the session state is saved once.
+
+        Args:
+            torrents (list of tuples): Torrents as tuple of (source, filedump, options), the source
+                is the filename of a torrent file with a base64 encoded filedump or, with a filedump
+                of None, a magnet uri or url.
+
+        Returns:
+            Deferred: Fires with a list, in the order of torrents, of tuples of (True, torrent_id)
+                if added or (False, error message) if not.
+
+        """
+        log.info('Adding %d torrents in bulk', len(torrents))
+
+        def download_url(url):
+            tmp_fd, tmp_file = tempfile.mkstemp(prefix='deluge_url.', suffix='.torrent')
+            os.close(tmp_fd)
+
+            def on_download_success(filename):
+                with open(filename, 'rb') as _file:
+                    data = _file.read()
+                try:
+                    os.remove(filename)
+                except OSError as ex:
+                    log.warning("Couldn't remove temp file: %s", ex)
+                return data
+            return download_file(url, tmp_file, force_filename=True).addCallback(on_download_success)
+
+        @defer.inlineCallbacks
+        def add_torrents():
+            entries = []
+            downloads = []
+            semaphore = defer.DeferredSemaphore(10)
+            for source, filedump, options in torrents:
+                if filedump:
+                    try:
+                        entries.append({'filename': source, 'filedump': base64.b64decode(filedump),
+                                        'options': options})
+                    except (TypeError, ValueError) as ex:
+                        entries.append({'error': 'There was an error decoding the filedump string: %s' % ex})
+                elif deluge.common.is_magnet(source):
+                    entries.append({'magnet': source, 'options': options})
+                elif deluge.common.is_url(source):
+                    entries.append({'url': source, 'options': options})
+                    downloads.append(semaphore.run(download_url, source))
+                else:
+                    entries.append({'error': 'Invalid torrent source: %s' % source})
+
+            downloaded = yield defer.DeferredList(downloads, consumeErrors=True)
+            url_entries = [entry for entry in entries if 'url' in entry]
+            for entry, (success, result) in zip(url_entries, downloaded):
+                if success:
+                    entry['filedump'] = result
+                else:
+                    entry['error'] = 'Failed to download torrent: %s' % result.getErrorMessage()
+
+            added = yield self.torrentmanager.add_bulk([entry for entry in entries if 'error' not in entry])
+            added = iter(added)
+            defer.returnValue([(False, entry['error']) if 'error' in entry else next(added) for entry in entries])
+        return add_torrents()
+
     @export
     def add_torrent_url(self, url, options, headers=None):
         """
@@ -392,6 +463,25 @@ def do_remove_torrents():
             return errors
         return task.deferLater(reactor, 0, do_remove_torrents)
 
+    @export
+    def get_perf_stats(self, reset=False):
+        """Get the performance statistics of the alert processing and RPC message encoding.
+
+        Args:
+            reset (bool, optional): Reset the statistics after getting them.
+
+        Returns:
+            dict: The alert counts, handler run times, alert queue high-water mark and reactor
+                lag, see `PerfStats.get_stats`, and the encoding time of the RPC messages per
+                method in 'rpc_encoding'.
+
+        """
+        stats = self.alertmanager.perf_stats.get_stats()
+        stats['rpc_encoding'] = component.get('RPCServer').get_encode_stats(reset)
+        if reset:
+            self.alertmanager.perf_stats.reset()
+        return stats
+
     @export
     def get_session_status(self, keys):
         """
@@ -470,6 +560,27 @@ def move_storage(self, torrent_ids, dest):
             if not self.torrentmanager[torrent_id].move_storage(dest):
                 log.warning('Error moving torrent %s to %s', torrent_id, dest)
 
+    @export
+    def move_torrents_storage(self, torrent_dests):
+        """Move the storage of many torrents, each to its own destination.
+
+        The state and resume data of the moved torrents are saved once and a single
+        TorrentsChangedEvent is emitted.
+
+        Args:
+            torrent_dests (dict): The destination folder of each torrent, {torrent_id: dest}.
+
+        Returns:
+            list: Tuples of (torrent_id, error message) of the torrents not moved.
+
+        """
+        log.debug('Moving storage of %d torrents', len(torrent_dests))
+
+        def move_storage(torrent, dest):
+            if not torrent.move_storage(dest):
+                return 'Error moving torrent to %s' % dest
+        return self._set_torrents_values(torrent_dests, move_storage, ['download_location', 'save_path'])
+
     @export
     def pause_session(self):
         """Pause all torrents in the session"""
@@ -530,6 +641,68 @@ def add_plugin_fields(args):
         d.addCallback(add_plugin_fields)
         return d
 
+    @export
+    def get_torrents_status_parts(self, filter_dict, keys, part_size=500):
+        """Get the status of the torrents in parts, for large results such as the files or peers of many torrents.
+
+        The parts are sent to the client as they are produced, see `DelugeRPCProtocol.send_response_parts`.
+
+        Args:
+            filter_dict (dict): The filters to apply, see `get_torrents_status`.
+            keys (list of str): The status keys, all the torrent keys if empty.
+            part_size (int, optional): The number of torrents in each part.
+
+        Yields:
+            dict: The status of up to part_size torrents, {torrent_id: {key: value}}.
+
+        Raises:
+            InvalidParameterError: If part_size is not a positive number.
+
+        """
+        if part_size <= 0:
+            raise InvalidParameterError('part_size must be a positive number of torrents, got %s' % part_size)
+
+        torrent_ids = list(self.filtermanager.filter_torrent_ids(filter_dict))
+        torrent_keys, plugin_keys = self.torrentmanager.separate_keys(keys, torrent_ids)
+        if not keys and self.torrentmanager.torrents:
+            torrent_keys = list(next(iter(self.torrentmanager.torrents.values())).status_funcs)
+
+        # Always yield a part so the result is a dict even without torrents.
+        for index in range(0, max(len(torrent_ids), 1), part_size):
+            status_dict = self.torrentmanager.status_snapshot.get_status(torrent_ids[index:index + part_size],
+                                                                         torrent_keys)
+            if plugin_keys:
+                for torrent_id in status_dict:
+                    status_dict[torrent_id].update(self.pluginmanager.get_status(torrent_id, plugin_keys))
+            yield status_dict
+
+    @export
+    def subscribe_torrents_status(self, filter_dict, keys, min_interval=1.0):
+        """Subscribe to the status of the torrents, instead of polling get_torrents_status.
+
+        After each libtorrent status update, at most every min_interval seconds, the changed
+        keys are pushed to the session in a TorrentsStatusUpdateEvent, so the client must
+        register a handler for it. The status poll is shared by all the subscribed sessions.
+
+        Args:
+            filter_dict (dict): The filters of the torrents, see `get_torrents_status`.
+            keys (list of str): The status keys, all the torrent keys if empty.
+            min_interval (float, optional): The minimum time, in seconds, between updates,
+                at least `SUBSCRIPTION_MIN_INTERVAL`.
+
+        Returns:
+            dict: The full status of the matching torrents, {torrent_id: {key: value}}.
+
+        """
+        session_id = component.get('RPCServer').get_session_id()
+        min_interval = max(min_interval, SUBSCRIPTION_MIN_INTERVAL)
+        return self.torrentmanager.status_subscriptions.subscribe(session_id, filter_dict, keys, min_interval)
+
+    @export
+    def unsubscribe_torrents_status(self):
+        """Stop the status updates of subscribe_torrents_status."""
+        self.torrentmanager.status_subscriptions.unsubscribe(component.get('RPCServer').get_session_id())
+
     @export
     def get_filter_tree(self, show_zero_hits=True, hide_cat=None):
         """
@@ -624,11 +797,118 @@ def set_torrent_options(self, torrent_ids, options):
         """Sets the torrent options for torrent_ids"""
         for torrent_id in torrent_ids:
             self.torrentmanager[torrent_id].set_options(options)
+            if 'owner' in options:
+                self.filtermanager.update_torrent(torrent_id, ['owner'])
+            if 'name' in options:
+                self.filtermanager.search_index.update(torrent_id)
+        if 'name' in options:
+            component.get('EventManager').emit(TorrentsChangedEvent(list(torrent_ids), ['name']))
 
     @export
     def set_torrent_trackers(self, torrent_id, trackers):
         """Sets a torrents tracker list.  trackers will be [{"url", "tier"}]"""
-        return self.torrentmanager[torrent_id].set_trackers(trackers)
+        self.torrentmanager[torrent_id].set_trackers(trackers)
+        self.filtermanager.update_torrent(torrent_id, ['tracker_host'])
+        self.filtermanager.search_index.update(torrent_id)
+
+    @export
+    def set_torrents_options(self, torrent_options):
+        """Set different options on many torrents at once.
+
+        Unlike calling set_torrent_options for each torrent, the state and resume data
+        of the torrents are saved once and a single TorrentsChangedEvent is emitted.
+
+        Args:
+            torrent_options (dict): The options to set on each torrent, {torrent_id: options},
+                see TorrentOptions class for valid keys.
+
+        Returns:
+            list: Tuples of (torrent_id, error message) of the torrents not changed.
+
+        """
+        keys = set()
+
+        def set_options(torrent, options):
+            torrent.set_options(options)
+            keys.update(get_option_status_keys(options))
+            if 'owner' in options:
+                self.filtermanager.update_torrent(torrent.torrent_id, ['owner'])
+            if 'name' in options:
+                self.filtermanager.search_index.update(torrent.torrent_id)
+        return self._set_torrents_values(torrent_options, set_options, keys)
+
+    @export
+    def set_torrents_trackers(self, torrent_trackers):
+        """Set the tracker lists of many torrents at once.
+
+        Args:
+            torrent_trackers (dict): The trackers of each torrent, {torrent_id: [{"url", "tier"}]}.
+
+        Returns:
+            list: Tuples of (torrent_id, error message) of the torrents not changed.
+
+        """
+        def set_trackers(torrent, trackers):
+            torrent.set_trackers(trackers)
+            self.filtermanager.update_torrent(torrent.torrent_id, ['tracker_host'])
+            self.filtermanager.search_index.update(torrent.torrent_id)
+        return self._set_torrents_values(torrent_trackers, set_trackers, ['trackers', 'tracker_host'])
+
+    @export
+    def set_torrents_file_priorities(self, torrent_priorities):
+        """Set the file priorities of many torrents at once.
+
+        Args:
+            torrent_priorities (dict): The file priorities of each torrent, {torrent_id: [priority, ...]}.
+
+        Returns:
+            list: Tuples of (torrent_id, error message) of the torrents not changed.
+
+        """
+        def set_file_priorities(torrent, priorities):
+            torrent.set_file_priorities(priorities)
+        return self._set_torrents_values(torrent_priorities, set_file_priorities, ['file_priorities'])
+
+    def _set_torrents_values(self, torrent_values, set_value, keys=None, save=True):
+        """Apply a change to many torrents, then queue a single save of them.
+
+        Args:
+            torrent_values (dict): The value for each torrent, {torrent_id: value}.
+            set_value (func): Called with the Torrent and its value, returns an error
+                message if the change failed. An exception it raises fails only that torrent.
+            keys (list, optional): The changed status keys, if set a TorrentsChangedEvent is emitted.
+            save (bool, optional): If False, the caller saves the changed torrents, defaults to True.
+
+        Returns:
+            list: Tuples of (torrent_id, error message) of the torrents not changed.
+
+        """
+        errors = []
+        changed = []
+        for torrent_id, value in torrent_values.items():
+            try:
+                torrent = self.torrentmanager[torrent_id]
+            except KeyError:
+                errors.append((torrent_id, "torrent_id '%s' not in session." % torrent_id))
+                continue
+            try:
+                error = set_value(torrent, value)
+            except Exception as ex:
+                log.error('Unable to change torrent %s: %s', torrent_id, ex)
+                error = 'Unable to change torrent: %s' % ex
+            if error:
+                errors.append((torrent_id, error))
+            else:
+                changed.append(torrent_id)
+
+        if changed:
+            if save:
+                self.torrentmanager.queue_save(changed)
+            if keys:
+                component.get('EventManager').emit(TorrentsChangedEvent(changed, sorted(keys)))
+        if errors:
+            log.warning('Failed to change %d of %d torrents.', len(errors), len(torrent_values))
+        return errors
 
     @export
     def set_torrent_max_connections(self, torrent_id, value):
@@ -720,6 +1000,7 @@ def set_owner(self, torrent_ids, username):
             torrent_ids = [torrent_ids]
         for torrent_id in torrent_ids:
             self.torrentmanager[torrent_id].set_owner(username)
+            self.filtermanager.update_torrent(torrent_id, ['owner'])
         return None
 
     @export
@@ -814,6 +1095,28 @@ def rename():
 
         return task.deferLater(reactor, 0, rename)
 
+    @export
+    def rename_torrents_files(self, torrent_filenames):
+        """Rename files in many torrents at once.
+
+        Like rename_files, watch for the TorrentFileRenamedEvents to know when
+        the files have been renamed. The file renamed alerts queue the save, so
+        the resume data of the torrents is then saved once. A single TorrentsChangedEvent
+        is emitted for the torrents renaming files.
+
+        Args:
+            torrent_filenames (dict): The (index, filename) pairs of each torrent,
+                {torrent_id: ((index, filename), ...)}.
+
+        Returns:
+            Deferred: Fires with a list of tuples of (torrent_id, error message) of the torrents not renamed.
+
+        """
+        def rename_files(torrent, filenames):
+            torrent.rename_files(filenames)
+        return task.deferLater(reactor, 0, self._set_torrents_values, torrent_filenames, rename_files, ['files'],
+                               save=False)
+
     @export
     def rename_folder(self, torrent_id, folder, new_folder):
         """
@@ -8,13 +8,16 @@
 #
 
 import logging
+from functools import cmp_to_key
 
 import deluge.component as component
 from deluge.common import TORRENT_STATE
+from deluge.core.searchindex import TorrentSearchIndex
 
 log = logging.getLogger(__name__)
 
 STATE_SORT = ['All', 'Active'] + TORRENT_STATE
+KEYWORD_FIELDS = ['filename', 'tracker', 'files']
 
 
 # Special purpose filters:
@@ -34,25 +37,21 @@ def filter_one_keyword(torrent_ids, keyword):
     searches title,state,tracker-status,tracker,files
     """
     all_torrents = component.get('TorrentManager').torrents
+    # The name, tracker and files are looked up in the search index.
+    matches = component.get('FilterManager').search_index.search(keyword, KEYWORD_FIELDS)
 
     for torrent_id in torrent_ids:
-        torrent = all_torrents[torrent_id]
-        if keyword in torrent.filename.lower():
-            yield torrent_id
-        elif keyword in torrent.state.lower():
-            yield torrent_id
-        elif torrent.trackers and keyword in torrent.trackers[0]['url']:
+        if torrent_id in matches:
             yield torrent_id
         elif keyword in torrent_id:
             yield torrent_id
-        # Want to find broken torrents (search on "error", or "unregistered")
-        elif keyword in torrent.tracker_status.lower():
-            yield torrent_id
         else:
-            for t_file in torrent.get_files():
-                if keyword in t_file['path'].lower():
-                    yield torrent_id
-                    break
+            torrent = all_torrents[torrent_id]
+            if keyword in torrent.state.lower():
+                yield torrent_id
+            # Want to find broken torrents (search on "error", or "unregistered")
+            elif keyword in torrent.tracker_status.lower():
+                yield torrent_id
 
 
 def filter_by_name(torrent_ids, search_string):
@@ -63,41 +62,29 @@ def filter_by_name(torrent_ids, search_string):
         search_string = search_string[0]
         match_case = False
 
-    if match_case is False:
-        search_string = search_string.lower()
+    matches = component.get('FilterManager').search_index.search(search_string, ['name'])
 
     for torrent_id in torrent_ids:
-        torrent_name = all_torrents[torrent_id].get_name()
-        if match_case is False:
-            torrent_name = all_torrents[torrent_id].get_name().lower()
-        else:
-            torrent_name = all_torrents[torrent_id].get_name()
-
-        if search_string in torrent_name:
+        if torrent_id not in matches:
+            continue
+        # The index is case-insensitive so check the case of the match.
+        if match_case is False or search_string in all_torrents[torrent_id].get_name():
             yield torrent_id
 
 
-def tracker_error_filter(torrent_ids, values):
-    filtered_torrent_ids = []
-    tm = component.get('TorrentManager')
-
-    # If this is a tracker_host, then we need to filter on it
-    if values[0] != 'Error':
-        for torrent_id in torrent_ids:
-            if values[0] == tm[torrent_id].get_status(['tracker_host'])['tracker_host']:
-                filtered_torrent_ids.append(torrent_id)
-        return filtered_torrent_ids
-
-    # Check torrent's tracker_status for 'Error:' and return those torrent_ids
-    for torrent_id in torrent_ids:
-        if 'Error:' in tm[torrent_id].get_status(['tracker_status'])['tracker_status']:
-            filtered_torrent_ids.append(torrent_id)
-    return filtered_torrent_ids
-
-
 class FilterManager(component.Component):
     """FilterManager
 
+    Tree fields registered as indexed have an inverted index, {value: set of torrent_ids},
+    that is kept up to date from the torrent events. Filtering on these fields is then a
+    set intersection and the tree counts are the sizes of the sets.
+
+    Attributes:
+        indexes (dict): Maps indexed field to the index, {value: set of torrent_ids}.
+        indexed_values (dict): Maps indexed field to the current value, {torrent_id: value}.
+        tracker_errors (set): The torrent_ids with a tracker error status.
+        search_index (TorrentSearchIndex): Index of the text searched by the keyword and name filters.
+
     """
     def __init__(self, core):
         component.Component.__init__(self, 'FilterManager')
@@ -108,26 +95,39 @@ def __init__(self, core):
         self.register_filter('keyword', filter_keywords)
         self.register_filter('name', filter_by_name)
         self.tree_fields = {}
+        self.indexes = {}
+        self.indexed_values = {}
+        self.tracker_errors = set()
+        self.search_index = TorrentSearchIndex(self._get_search_texts)
 
-        self.register_tree_field('state', self._init_state_tree)
+        self.register_tree_field('state', self._init_state_tree, indexed=True)
 
         def _init_tracker_tree():
             return {'Error': 0}
-        self.register_tree_field('tracker_host', _init_tracker_tree)
-
-        self.register_filter('tracker_host', tracker_error_filter)
+        self.register_tree_field('tracker_host', _init_tracker_tree, indexed=True)
 
         def _init_users_tree():
             return {'': 0}
-        self.register_tree_field('owner', _init_users_tree)
+        self.register_tree_field('owner', _init_users_tree, indexed=True)
+
+        event_manager = component.get('EventManager')
+        event_manager.register_event_handler('TorrentAddedEvent', self.on_torrent_added)
+        event_manager.register_event_handler('TorrentRemovedEvent', self.on_torrent_removed)
+        event_manager.register_event_handler('TorrentStateChangedEvent', self.on_torrent_state_changed)
+        event_manager.register_event_handler('TorrentTrackerStatusEvent', self.on_torrent_tracker_status)
+        event_manager.register_event_handler('TorrentFileRenamedEvent', self.on_torrent_file_renamed)
+        event_manager.register_event_handler('TorrentFolderRenamedEvent', self.on_torrent_folder_renamed)
 
-    def filter_torrent_ids(self, filter_dict):
+    def filter_torrent_ids(self, filter_dict, user=None, auth_level=None):
         """
         returns a list of torrent_id's matching filter_dict.
         core filter method
+
+        The torrents are those listed for the user and auth_level, see
+        `TorrentManager.get_torrent_list`, the ones of the current RPC if not set.
         """
         if not filter_dict:
-            return self.torrents.get_torrent_list()
+            return self.torrents.get_torrent_list(user, auth_level)
 
         # Sanitize input: filter-value must be a list of strings
         for key, value in list(filter_dict.items()):
@@ -139,21 +139,31 @@ def filter_torrent_ids(self, filter_dict):
             torrent_ids = list(filter_dict['id'])
             del filter_dict['id']
         else:
-            torrent_ids = self.torrents.get_torrent_list()
+            torrent_ids = self.torrents.get_torrent_list(user, auth_level)
 
         # Return if there's nothing more to filter
         if not filter_dict:
             return torrent_ids
 
         # Special purpose, state=Active.
-        if 'state' in filter_dict:
-            # We need to make sure this is a list for the logic below
-            filter_dict['state'] = list(filter_dict['state'])
-
+        filter_active = False
         if 'state' in filter_dict and 'Active' in filter_dict['state']:
-            filter_dict['state'].remove('Active')
+            filter_dict['state'] = [state for state in filter_dict['state'] if state != 'Active']
             if not filter_dict['state']:
                 del filter_dict['state']
+            filter_active = True
+
+        # Indexed fields, matches any of the values for each field.
+        matches = None
+        for field in [field for field in filter_dict if field in self.indexes]:
+            field_ids = set()
+            for value in filter_dict.pop(field):
+                field_ids.update(self.get_indexed_ids(field, value))
+            matches = field_ids if matches is None else matches & field_ids
+        if matches is not None:
+            torrent_ids = [torrent_id for torrent_id in torrent_ids if torrent_id in matches]
+
+        if filter_active:
             torrent_ids = self.filter_state_active(torrent_ids)
 
         if not filter_dict:
@@ -171,14 +181,15 @@ def filter_torrent_ids(self, filter_dict):
 
         torrent_keys, plugin_keys = self.torrents.separate_keys(list(filter_dict.keys()), torrent_ids)
         # Leftover filter arguments, default filter on status fields.
-        for torrent_id in list(torrent_ids):
+        filtered_torrent_ids = []
+        for torrent_id in torrent_ids:
             status = self.core.create_torrent_status(torrent_id, torrent_keys, plugin_keys)
-            for field, values in list(filter_dict.items()):
-                if field in status and status[field] in values:
-                    continue
-                elif torrent_id in torrent_ids:
-                    torrent_ids.remove(torrent_id)
-        return torrent_ids
+            for field, values in filter_dict.items():
+                if field not in status or status[field] not in values:
+                    break
+            else:
+                filtered_torrent_ids.append(torrent_id)
+        return filtered_torrent_ids
 
     def get_filter_tree(self, show_zero_hits=True, hide_cat=None):
         """
@@ -191,18 +202,35 @@ def get_filter_tree(self, show_zero_hits=True, hide_cat=None):
             for cat in hide_cat:
                 tree_keys.remove(cat)
 
-        torrent_keys, plugin_keys = self.torrents.separate_keys(tree_keys, torrent_ids)
+        # Only count the torrents visible to a non-admin user.
+        visible_ids = None
+        if len(torrent_ids) != len(self.torrents.torrents):
+            visible_ids = set(torrent_ids)
+
+        def count(ids):
+            return len(ids) if visible_ids is None else len(visible_ids.intersection(ids))
+
         items = dict((field, self.tree_fields[field]()) for field in tree_keys)
 
-        for torrent_id in list(torrent_ids):
-            status = self.core.create_torrent_status(torrent_id, torrent_keys, plugin_keys)  # status={key:value}
-            for field in tree_keys:
-                value = status[field]
-                items[field][value] = items[field].get(value, 0) + 1
+        for field in tree_keys:
+            if field in self.indexes:
+                for value, ids in self.indexes[field].items():
+                    hits = count(ids)
+                    if hits:
+                        items[field][value] = items[field].get(value, 0) + hits
+
+        scan_keys = [field for field in tree_keys if field not in self.indexes]
+        if scan_keys:
+            torrent_keys, plugin_keys = self.torrents.separate_keys(scan_keys, torrent_ids)
+            for torrent_id in torrent_ids:
+                status = self.core.create_torrent_status(torrent_id, torrent_keys, plugin_keys)
+                for field in scan_keys:
+                    value = status[field]
+                    items[field][value] = items[field].get(value, 0) + 1
 
         if 'tracker_host' in items:
             items['tracker_host']['All'] = len(torrent_ids)
-            items['tracker_host']['Error'] = len(tracker_error_filter(torrent_ids, ('Error',)))
+            items['tracker_host']['Error'] = count(self.tracker_errors)
 
         if not show_zero_hits:
             for cat in ['state', 'owner', 'tracker_host']:
@@ -215,7 +243,7 @@ def get_filter_tree(self, show_zero_hits=True, hide_cat=None):
             sorted_items[field] = sorted(items[field].items())
 
         if 'state' in tree_keys:
-            sorted_items['state'].sort(self._sort_state_items)
+            sorted_items['state'].sort(key=cmp_to_key(self._sort_state_items))
 
         return sorted_items
 
@@ -233,21 +261,157 @@ def register_filter(self, filter_id, filter_func, filter_value=None):
     def deregister_filter(self, filter_id):
         del self.registered_filters[filter_id]
 
-    def register_tree_field(self, field, init_func=lambda: {}):
+    def register_tree_field(self, field, init_func=lambda: {}, indexed=False):
+        """Register a field to show in the filter tree.
+
+        Args:
+            field (str): The status key.
+            init_func (func, optional): Returns the initial {value: count} dict for the tree.
+            indexed (bool, optional): Maintain an index of the field values. The owner of the
+                field must then call `update_torrent` whenever a value changes.
+
+        """
         self.tree_fields[field] = init_func
+        if indexed:
+            self.rebuild_index(field)
+        else:
+            self._drop_index(field)
 
     def deregister_tree_field(self, field):
         if field in self.tree_fields:
             del self.tree_fields[field]
+        self._drop_index(field)
 
-    def filter_state_active(self, torrent_ids):
-        for torrent_id in list(torrent_ids):
-            status = self.torrents[torrent_id].get_status(['download_payload_rate', 'upload_payload_rate'])
-            if status['download_payload_rate'] or status['upload_payload_rate']:
-                pass
+    def rebuild_index(self, field):
+        """Rebuild the index of a field from the status of all torrents.
+
+        Args:
+            field (str): The indexed field.
+
+        """
+        self.indexes[field] = {}
+        self.indexed_values[field] = {}
+        if field == 'tracker_host':
+            self.tracker_errors.clear()
+        for torrent_id in list(self.torrents.torrents):
+            self.update_torrent(torrent_id, [field])
+
+    def _drop_index(self, field):
+        self.indexes.pop(field, None)
+        self.indexed_values.pop(field, None)
+        if field == 'tracker_host':
+            self.tracker_errors.clear()
+
+    def get_indexed_ids(self, field, value):
+        """Get the torrent_ids with a value for an indexed field.
+
+        Args:
+            field (str): The indexed field.
+            value (str): The field value, for `tracker_host` the value 'Error' matches the
+                torrents with a tracker error.
+
+        Returns:
+            set: The torrent_ids, this must not be modified.
+
+        """
+        if field == 'tracker_host' and value == 'Error':
+            return self.tracker_errors
+        return self.indexes[field].get(value, ())
+
+    def update_torrent(self, torrent_id, fields=None):
+        """Update the indexed values of a torrent.
+
+        Args:
+            torrent_id (str): The torrent_id.
+            fields (list of str, optional): The fields to update, defaults to all indexed fields.
+
+        """
+        if torrent_id not in self.torrents.torrents:
+            return
+        if fields is None:
+            fields = list(self.indexes)
+        else:
+            fields = [field for field in fields if field in self.indexes]
+        if not fields:
+            return
+
+        torrent_keys, plugin_keys = self.torrents.separate_keys(fields, [torrent_id])
+        status = self.core.create_torrent_status(torrent_id, torrent_keys, plugin_keys)
+        for field in fields:
+            self._set_indexed_value(field, torrent_id, status.get(field))
+
+        if 'tracker_host' in fields:
+            if 'Error:' in self.torrents[torrent_id].tracker_status:
+                self.tracker_errors.add(torrent_id)
             else:
-                torrent_ids.remove(torrent_id)
-        return torrent_ids
+                self.tracker_errors.discard(torrent_id)
+
+    def _set_indexed_value(self, field, torrent_id, value):
+        index = self.indexes[field]
+        indexed_values = self.indexed_values[field]
+        if torrent_id in indexed_values:
+            old_value = indexed_values[torrent_id]
+            if old_value == value:
+                return
+            self._discard_indexed_id(index, old_value, torrent_id)
+        indexed_values[torrent_id] = value
+        index.setdefault(value, set()).add(torrent_id)
+
+    def _discard_indexed_id(self, index, value, torrent_id):
+        ids = index[value]
+        ids.discard(torrent_id)
+        if not ids:
+            del index[value]
+
+    def _get_search_texts(self, torrent_id):
+        torrent = self.torrents[torrent_id]
+        return {
+            'name': torrent.get_name(),
+            'filename': torrent.filename or '',
+            'tracker': torrent.trackers[0]['url'] if torrent.trackers else '',
+            'files': '\n'.join(torrent_file['path'] for torrent_file in torrent.get_files()),
+        }
+
+    def on_torrent_added(self, torrent_id, from_state):
+        self.update_torrent(torrent_id)
+        self.search_index.update(torrent_id)
+
+    def on_torrent_removed(self, torrent_id):
+        for field, indexed_values in self.indexed_values.items():
+            if torrent_id in indexed_values:
+                self._discard_indexed_id(self.indexes[field], indexed_values.pop(torrent_id), torrent_id)
+        self.tracker_errors.discard(torrent_id)
+        self.search_index.remove(torrent_id)
+
+    def on_torrent_state_changed(self, torrent_id, state):
+        # The event is also emitted while the torrent is created, before it is added.
+        if 'state' in self.indexes and torrent_id in self.torrents.torrents:
+            # The state may have changed again before the event is handled, index the current one.
+            self._set_indexed_value('state', torrent_id, self.torrents[torrent_id].state)
+
+    def on_torrent_tracker_status(self, torrent_id, status):
+        self.update_torrent(torrent_id, ['tracker_host'])
+
+    def on_torrent_file_renamed(self, torrent_id, index, name):
+        self.search_index.update(torrent_id)
+
+    def on_torrent_folder_renamed(self, torrent_id, old, new):
+        self.search_index.update(torrent_id)
+
+    def filter_state_active(self, torrent_ids):
+        """Filter the torrents that are downloading or uploading.
+
+        Args:
+            torrent_ids (list of str): The torrent_ids.
+
+        Returns:
+            list of str: The active torrent_ids.
+
+        """
+        torrent_ids, slots, (download_rates, upload_rates) = self.torrents.status_snapshot.get_columns(
+            torrent_ids, ['download_payload_rate', 'upload_payload_rate'])
+        return [torrent_id for torrent_id, slot in zip(torrent_ids, slots)
+                if download_rates[slot] or upload_rates[slot]]
 
     def _hide_state_items(self, state_items):
         """For hide(show)-zero hits"""
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Deluge and is licensed under GNU General Public License 3.0, or later, with
+# the additional special exception to link portions of this program with the OpenSSL library.
+# See LICENSE for more details.
+#
+
+"""Performance statistics of the alert processing in the Core.
+
+Attributes:
+    LATENCY_BUCKETS (list): The upper bounds, in seconds, of the latency histogram buckets.
+
+"""
+
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = [0.0001, 0.001, 0.01, 0.1, 1.0]
+
+
+def get_handler_name(handler):
+    """Get a readable name for an alert handler.
+
+    Args:
+        handler (func): The handler function or bound method.
+
+    Returns:
+        str: The name, including the class for a bound method.
+
+    """
+    name = getattr(handler, '__name__', repr(handler))
+    owner = getattr(handler, '__self__', None)
+    if owner is not None:
+        name = '%s.%s' % (type(owner).__name__, name)
+    return name
+
+
+class LatencyStats(object):
+    """The count, total, max and histogram of a latency.
+
+    Attributes:
+        count (int): The number of samples.
+        total (float): The sum of the samples, in seconds.
+        max (float): The largest sample, in seconds.
+        buckets (list): The sample count of each `LATENCY_BUCKETS` bucket, plus one for larger samples.
+
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, latency):
+        self.count += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.buckets[index] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+            'avg': self.total / self.count if self.count else 0.0,
+            'buckets': self.buckets[:],
+        }
+
+
+class PerfStats(object):
+    """Collects the statistics of the alerts and their handlers.
+
+    Attributes:
+        start_time (float): When the statistics were started or last reset.
+        alert_counts (dict): The number of alerts popped per alert type.
+        handlers (dict): The `LatencyStats` of the run time of each handler, by name.
+        reactor_lag (LatencyStats): The delay between scheduling and running the handlers.
+        pops (int): The number of times alerts were popped.
+        queue_high_water (int): The most alerts popped at once.
+
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Reset all the statistics"""
+        self.start_time = time.time()
+        self.alert_counts = {}
+        self.handlers = {}
+        self.reactor_lag = LatencyStats()
+        self.pops = 0
+        self.queue_high_water = 0
+
+    def add_alerts(self, alert_types):
+        """Record the alerts popped from the session.
+
+        Args:
+            alert_types (list of str): The type of each alert popped.
+
+        """
+        self.pops += 1
+        if len(alert_types) > self.queue_high_water:
+            self.queue_high_water = len(alert_types)
+        alert_counts = self.alert_counts
+        for alert_type in alert_types:
+            alert_counts[alert_type] = alert_counts.get(alert_type, 0) + 1
+
+    def add_handler_call(self, handler, scheduled, started, finished):
+        """Record a call of an alert handler.
+
+        Args:
+            handler (func): The handler.
+            scheduled (float): The time the call was scheduled.
+            started (float): The time the handler started.
+            finished (float): The time the handler finished.
+
+        """
+        name = get_handler_name(handler)
+        if name not in self.handlers:
+            self.handlers[name] = LatencyStats()
+        self.handlers[name].add(finished - started)
+        self.reactor_lag.add(started - scheduled)
+
+    def get_stats(self):
+        """Get the statistics.
+
+        Returns:
+            dict: The statistics, the latencies are in seconds.
+
+        """
+        return {
+            'duration': time.time() - self.start_time,
+            'alert_pops': self.pops,
+            'alert_queue_high_water': self.queue_high_water,
+            'alert_counts': dict(self.alert_counts),
+            'handlers': dict((name, stats.to_dict()) for name, stats in self.handlers.items()),
+            'reactor_lag': self.reactor_lag.to_dict(),
+            'latency_buckets': LATENCY_BUCKETS,
+        }
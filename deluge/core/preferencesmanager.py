@@ -71,6 +71,13 @@
     'max_download_speed_per_torrent': -1,
     'enabled_plugins': [],
     'add_paused': False,
+    'add_torrents_bulk_max_in_flight': 100,
+    'perf_stats_dump_interval': 0,
+    'rpc_compression': 'zlib',
+    'rpc_compression_level': -1,
+    'rpc_compression_threshold': 1024,
+    'rpc_encode_threads': 0,
+    'rpc_encode_threshold': 1000,
     'max_active_seeding': 5,
     'max_active_downloading': 3,
     'max_active_limit': 8,
@@ -459,6 +466,27 @@ def _on_set_geoip_db_location(self, key, geoipdb_path):
         else:
             log.warning('Unable to find GeoIP database file: %s', geoipdb_path)
 
+    def _on_set_rpc_compression(self, key, value):
+        try:
+            rpcserver = component.get('RPCServer')
+        except KeyError:
+            # Standalone Core without an RPCServer.
+            return
+        rpcserver.set_compression(self.config['rpc_compression'], self.config['rpc_compression_level'],
+                                  self.config['rpc_compression_threshold'])
+
+    _on_set_rpc_compression_level = _on_set_rpc_compression
+    _on_set_rpc_compression_threshold = _on_set_rpc_compression
+
+    def _on_set_rpc_encode_threads(self, key, value):
+        try:
+            rpcserver = component.get('RPCServer')
+        except KeyError:
+            return
+        rpcserver.set_encode_threads(self.config['rpc_encode_threads'], self.config['rpc_encode_threshold'])
+
+    _on_set_rpc_encode_threshold = _on_set_rpc_encode_threads
+
     def _on_set_cache_size(self, key, value):
         self.session_set_setting('cache_size', value)
 
@@ -13,23 +13,31 @@
 import os
 import stat
 import sys
+import time
 import traceback
-from types import FunctionType
+from collections import deque
+from types import FunctionType, GeneratorType
 
 from OpenSSL import SSL, crypto
 from twisted.internet import defer, reactor
 from twisted.internet.protocol import Factory, connectionDone
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
 
+import deluge.common
 import deluge.component as component
 import deluge.configmanager
 from deluge.core.authmanager import AUTH_LEVEL_ADMIN, AUTH_LEVEL_DEFAULT, AUTH_LEVEL_NONE
+from deluge.core.perfstats import LatencyStats
 from deluge.error import DelugeError, IncompatibleClient, NotAuthorizedError, WrappedException, _ClientSideRecreateError
 from deluge.event import ClientDisconnectedEvent
-from deluge.transfer import DelugeTransferProtocol
+from deluge.transfer import CODECS, DelugeTransferProtocol, get_compression_level
 
 RPC_RESPONSE = 1
 RPC_ERROR = 2
 RPC_EVENT = 3
+RPC_RESPONSE_PART = 4
+RPC_BATCH = 5
 
 log = logging.getLogger(__name__)
 
@@ -89,6 +97,41 @@ def format_request(call):
         return s
 
 
+def get_message_size(data):
+    """
+    Returns the number of items in the result of a RPC_RESPONSE or RPC_RESPONSE_PART,
+    or the results in a RPC_BATCH, used to decide whether to encode the message in
+    the thread pool.
+
+    :param data: the message
+    :type data: tuple
+    :returns: int, the number of items, 0 for other messages
+    """
+    if data[0] == RPC_BATCH:
+        return sum(get_message_size(response) for response in data[2])
+    if data[0] in (RPC_RESPONSE, RPC_RESPONSE_PART) and isinstance(data[2], (dict, list, tuple)):
+        return len(data[2])
+    return 0
+
+
+def copy_message(data):
+    """
+    Copies the dicts, lists and tuples of a message, so the copy can be encoded
+    in a thread while the objects the message was built from keep changing.
+
+    :param data: the message
+    :type data: tuple
+    :returns: tuple, the copied message
+    """
+    if isinstance(data, dict):
+        return dict((key, copy_message(value)) for key, value in data.items())
+    if isinstance(data, list):
+        return [copy_message(value) for value in data]
+    if isinstance(data, tuple):
+        return tuple(copy_message(value) for value in data)
+    return data
+
+
 class ServerContextFactory(object):
     def getContext(self):  # NOQA: N802
         """
@@ -106,6 +149,20 @@ def getContext(self):  # NOQA: N802
 
 
 class DelugeRPCProtocol(DelugeTransferProtocol):
+    # Set when the client negotiates to receive the RPC_RESPONSE_PART messages of streamed responses.
+    stream_responses = False
+    # Set when the client negotiates to receive the messages sent while dispatching
+    # the requests of a message in one RPC_BATCH message.
+    batch_responses = False
+
+    def __init__(self):
+        DelugeTransferProtocol.__init__(self)
+        # The messages waiting to be sent, in order, as [message] lists with a
+        # message of None while it is being encoded in the thread pool.
+        self._send_queue = deque()
+        # The responses collected while dispatching a batch of requests
+        self._batch_responses = None
+
     def message_received(self, request):
         """
         This method is called whenever a message is received from a client.  The
@@ -125,30 +182,132 @@ def message_received(self, request):
             log.debug('Received invalid message: there are no items')
             return
 
+        calls = []
         for call in request:
             if len(call) != 4:
                 log.debug('Received invalid rpc request: number of items '
                           'in request is %s', len(call))
                 continue
             # log.debug("RPCRequest: %s", format_request(call))
-            reactor.callLater(0, self.dispatch, *call)
+            calls.append(call)
+
+        if len(calls) > 1 and self.batch_responses:
+            reactor.callLater(0, self.dispatch_batch, calls)
+        else:
+            for call in calls:
+                reactor.callLater(0, self.dispatch, *call)
+
+    def dispatch_batch(self, calls):
+        """
+        Dispatches the requests of a message in order. The messages sent while
+        dispatching, responses and events, are sent to the client in order in a
+        single RPC_BATCH message, the responses of requests returning a Deferred
+        follow when it fires.
+
+        Only used for clients that negotiated it with `daemon.set_batch_responses`.
+
+        :param calls: the requests, as (request_id, method, args, kwargs) tuples
+        :type calls: list
+
+        """
+        self._batch_responses = []
+        try:
+            for call in calls:
+                self.dispatch(*call)
+        finally:
+            responses, self._batch_responses = self._batch_responses, None
+        if responses:
+            self.sendData((RPC_BATCH, None, responses))
 
-    def sendData(self, data):  # NOQA: N802
+    def sendData(self, data, method=None):  # NOQA: N802
         """
         Sends the data to the client.
 
+        If enabled, large responses are encoded in the thread pool of the
+        RPCServer, messages are still sent to the client in order.
+
         :param data: the object that is to be sent to the client.  This should
             be one of the RPC message types.
         :type data: object
+        :param method: the RPC method the data is the response of, the encoding
+            time is recorded per method and event.
+        :type method: str
 
         """
+        if self._batch_responses is not None:
+            self._batch_responses.append(data)
+            return
+
+        if method is None and data[0] == RPC_EVENT:
+            method = data[1]
+
+        pool = self.factory.encode_pool
+        if pool and get_message_size(data) >= self.factory.encode_threshold:
+            entry = [None]
+            self._send_queue.append(entry)
+            # Copied here as the reactor thread can change the status dicts while encoding.
+            d = deferToThreadPool(reactor, pool, self.encode_message_timed, copy_message(data))
+            d.addCallbacks(self.on_message_encoded, self.on_message_encode_failed,
+                           callbackArgs=[entry, method], errbackArgs=[entry, data])
+            return
+
         try:
-            self.transfer_message(data)
+            start = time.time()
+            if self._send_queue:
+                # Wait for the messages being encoded in the thread pool.
+                self._send_queue.append([self.encode_message(data)])
+            else:
+                self.transfer_message(data)
+            self.add_encode_time(method, time.time() - start)
         except Exception as ex:
             log.warn('Error occurred when sending message: %s.', ex)
             log.exception(ex)
             raise
 
+    def encode_message_timed(self, data):
+        """
+        Encodes the data, run in the thread pool.
+
+        :returns: tuple, the message and the time taken to encode it
+        """
+        start = time.time()
+        message = self.encode_message(data)
+        return message, time.time() - start
+
+    def on_message_encoded(self, result, entry, method):
+        message, elapsed = result
+        entry[0] = message
+        self.add_encode_time(method, elapsed)
+        self.flush_send_queue()
+
+    def on_message_encode_failed(self, failure, entry, data):
+        log.error('Error occurred when encoding message: %s', failure.getTraceback())
+        if data[0] in (RPC_RESPONSE, RPC_RESPONSE_PART):
+            # Send an error so the client is not left waiting for the response.
+            formated_tb = failure.getTraceback()
+            entry[0] = self.encode_message((
+                RPC_ERROR, data[1], 'WrappedException',
+                (failure.getErrorMessage(), failure.type.__name__, formated_tb), {}, formated_tb
+            ))
+        else:
+            self._send_queue.remove(entry)
+        self.flush_send_queue()
+
+    def flush_send_queue(self):
+        """
+        Sends the encoded messages at the front of the send queue.
+        """
+        while self._send_queue and self._send_queue[0][0] is not None:
+            self.write_message(self._send_queue.popleft()[0])
+
+    def add_encode_time(self, method, elapsed):
+        if method is None:
+            return
+        encode_stats = self.factory.encode_stats
+        if method not in encode_stats:
+            encode_stats[method] = LatencyStats()
+        encode_stats[method].add(elapsed)
+
     def connectionMade(self):  # NOQA: N802
         """
         This method is called when a new client connects.
@@ -176,7 +335,7 @@ def connectionLost(self, reason=connectionDone):  # NOQA: N802
             del self.factory.interested_events[self.transport.sessionno]
 
         if self.factory.state == 'running':
-            component.get('EventManager').emit(ClientDisconnectedEvent(self.factory.session_id))
+            component.get('EventManager').emit(ClientDisconnectedEvent(self.transport.sessionno))
         log.info('Deluge client disconnected: %s', reason.value)
 
     def valid_session(self):
@@ -225,6 +384,15 @@ def send_error():
             except Exception as ex:
                 log.error('An exception occurred while sending RPC_ERROR to client: %s', ex)
 
+        def send_response(result):
+            """
+            Sends the result, or streams its parts if the method returned a generator.
+            """
+            if isinstance(result, GeneratorType):
+                self.send_response_parts(request_id, method, result, None, send_error)
+            else:
+                self.sendData((RPC_RESPONSE, request_id, result), method)
+
         if method == 'daemon.info':
             # This is a special case and used in the initial connection process
             self.sendData((RPC_RESPONSE, request_id, deluge.common.get_version()))
@@ -255,6 +423,39 @@ def send_error():
         if not self.valid_session():
             return
 
+        if method == 'daemon.set_compression':
+            log.debug('RPC dispatch daemon.set_compression')
+            # This special case negotiates the compression of the messages sent
+            # to the client, from the codecs the client is able to decode.
+            try:
+                codec, level, threshold = self.factory.compression
+                if codec not in args[0]:
+                    # The configured level may not be valid for zlib.
+                    codec = 'zlib'
+                    level = -1
+                self.set_compression(codec, level, threshold)
+            except Exception:
+                send_error()
+            else:
+                self.sendData((RPC_RESPONSE, request_id, (codec, level, threshold)))
+            return
+
+        if method == 'daemon.set_response_streaming':
+            log.debug('RPC dispatch daemon.set_response_streaming')
+            # This special case allows clients to receive the parts of responses
+            # from methods returning a generator as they are produced.
+            self.stream_responses = bool(args[0])
+            self.sendData((RPC_RESPONSE, request_id, self.stream_responses))
+            return
+
+        if method == 'daemon.set_batch_responses':
+            log.debug('RPC dispatch daemon.set_batch_responses')
+            # This special case allows clients to receive the responses to the
+            # requests of a message in one RPC_BATCH message.
+            self.batch_responses = bool(args[0])
+            self.sendData((RPC_RESPONSE, request_id, self.batch_responses))
+            return
+
         if method == 'daemon.set_event_interest':
             log.debug('RPC dispatch daemon.set_event_interest')
             # This special case is to allow clients to set which events they are
@@ -303,7 +504,7 @@ def send_error():
             if isinstance(ret, defer.Deferred):
                 def on_success(result):
                     try:
-                        self.sendData((RPC_RESPONSE, request_id, result))
+                        send_response(result)
                     except Exception:
                         send_error()
                     return result
@@ -317,7 +518,52 @@ def on_fail(failure):
 
                 ret.addCallbacks(on_success, on_fail)
             else:
-                self.sendData((RPC_RESPONSE, request_id, ret))
+                send_response(ret)
+
+    def send_response_parts(self, request_id, method, parts, result, send_error):
+        """
+        Sends the next part yielded by the generator of an RPC method and
+        schedules sending the following one, so the reactor is not blocked
+        while a large result is produced.
+
+        Clients that did not negotiate streaming are sent all the parts merged
+        in one RPC_RESPONSE, streaming clients are sent an RPC_RESPONSE_PART per
+        part followed by an empty RPC_RESPONSE.
+
+        :param request_id: int, the request_id from the client
+        :param method: str, the method called
+        :param parts: generator, the parts of the response
+        :param result: the parts merged so far
+        :param send_error: func, sends an RPC_ERROR for the current exception
+
+        """
+        if not self.valid_session():
+            # The client disconnected.
+            parts.close()
+            return
+
+        # The parts are produced in later reactor iterations, so set the session_id
+        # of this session for the method, as other requests may have changed it.
+        session_id = self.factory.session_id
+        self.factory.session_id = self.transport.sessionno
+        try:
+            part = next(parts)
+        except StopIteration:
+            self.sendData((RPC_RESPONSE, request_id, result), method)
+            return
+        except Exception as ex:
+            send_error()
+            if not isinstance(ex, DelugeError):
+                log.exception('Exception streaming RPC response: %s', ex)
+            return
+        finally:
+            self.factory.session_id = session_id
+
+        if self.stream_responses:
+            self.sendData((RPC_RESPONSE_PART, request_id, part), method)
+        else:
+            result = deluge.common.merge_response_part(result, part)
+        reactor.callLater(0, self.send_response_parts, request_id, method, parts, result, send_error)
 
 
 class RPCServer(component.Component):
@@ -352,6 +598,13 @@ def __init__(self, port=58846, interface='', allow_remote=False, listen=True):
         self.factory.session_protocols = {}
         # Holds the interested event list for the sessions
         self.factory.interested_events = {}
+        # The compression (codec, level, threshold) offered to clients, see set_compression.
+        self.factory.compression = ('zlib', -1, 1024)
+        # The thread pool encoding large responses, see set_encode_threads.
+        self.factory.encode_pool = None
+        self.factory.encode_threshold = 0
+        # Holds the LatencyStats of the message encoding time per method and event
+        self.factory.encode_stats = {}
 
         self.listen = listen
         if not listen:
@@ -377,6 +630,60 @@ def __init__(self, port=58846, interface='', allow_remote=False, listen=True):
             log.error(ex)
             raise
 
+    def set_compression(self, codec, level=-1, threshold=0):
+        """
+        Sets the compression of the messages sent to clients that negotiate it
+        with `daemon.set_compression`, other clients always get zlib.
+
+        :param codec: str, the codec, 'none', 'zlib', 'lz4' or 'zstd'
+        :param level: int, the compression level, -1 for the codec default,
+            clamped to the levels of the codec
+        :param threshold: int, the message size, in bytes, below which messages
+            are sent uncompressed
+        """
+        if codec not in CODECS:
+            log.warning('Compression codec %s is not available, using zlib', codec)
+            codec = 'zlib'
+            level = -1
+        valid_level = get_compression_level(codec, level)
+        if valid_level != level and level >= 0:
+            log.warning('Compression level %s is not valid for %s, using %s', level, codec, valid_level)
+        self.factory.compression = (codec, valid_level, threshold)
+
+    def set_encode_threads(self, threads, threshold):
+        """
+        Sets the thread pool used to serialize and compress large responses, so
+        that they do not block the reactor.
+
+        :param threads: int, the maximum number of threads, 0 encodes all the
+            messages in the reactor thread
+        :param threshold: int, the number of items in a response, e.g. torrents
+            in a status dict, from which it is encoded in the thread pool
+        """
+        self.factory.encode_threshold = threshold
+        pool = self.factory.encode_pool
+        if threads > 0:
+            if pool:
+                pool.adjustPoolsize(0, threads)
+            else:
+                self.factory.encode_pool = ThreadPool(0, threads, 'RPCServerEncode')
+                self.factory.encode_pool.start()
+        elif pool:
+            self.factory.encode_pool = None
+            pool.stop()
+
+    def get_encode_stats(self, reset=False):
+        """
+        Returns the time spent encoding messages per RPC method and event.
+
+        :param reset: bool, reset the statistics
+        :returns: dict, {method: stats}, see `LatencyStats.to_dict`
+        """
+        stats = dict((method, latency.to_dict()) for method, latency in self.factory.encode_stats.items())
+        if reset:
+            self.factory.encode_stats.clear()
+        return stats
+
     def register_object(self, obj, name=None):
         """
         Registers an object to export it's rpc methods.  These methods should
@@ -533,6 +840,9 @@ def emit_event_for_session_id(self, session_id, event):
 
     def stop(self):
         self.factory.state = 'stopping'
+        if self.factory.encode_pool:
+            self.factory.encode_pool.stop()
+            self.factory.encode_pool = None
 
 
 def check_ssl_keys():
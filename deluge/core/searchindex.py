@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Deluge and is licensed under GNU General Public License 3.0, or later, with
+# the additional special exception to link portions of this program with the OpenSSL library.
+# See LICENSE for more details.
+#
+
+"""Trigram index used by FilterManager for the keyword and name filters."""
+
+import logging
+
+log = logging.getLogger(__name__)
+
+
+def get_trigrams(text):
+    """Get the set of three character substrings in text.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        set: The trigrams.
+
+    """
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+class TorrentSearchIndex(object):
+    """A trigram index of the searchable text of torrents.
+
+    A search for a string of three characters or more only has to check the
+    torrents that contain all of its trigrams. The text of a torrent is only
+    fetched, with `get_texts`, when the index is next searched after the torrent
+    was added or updated, so adding many torrents does not read all their files.
+
+    Args:
+        get_texts (func): Called with a torrent_id, returns a dict of {field: text}.
+
+    Attributes:
+        texts (dict): The lowercased text of each torrent, {torrent_id: {field: text}}.
+        trigrams (dict): Maps trigram to the set of torrent_ids with the trigram in any field.
+        pending (set): The torrent_ids to (re)index before the next search.
+
+    """
+    def __init__(self, get_texts):
+        self.get_texts = get_texts
+        self.texts = {}
+        self.trigrams = {}
+        self.pending = set()
+
+    def __contains__(self, torrent_id):
+        return torrent_id in self.texts or torrent_id in self.pending
+
+    def update(self, torrent_id):
+        """Add a torrent to the index or mark its text as changed.
+
+        Args:
+            torrent_id (str): The torrent_id.
+
+        """
+        self.pending.add(torrent_id)
+
+    def remove(self, torrent_id):
+        """Remove a torrent from the index.
+
+        Args:
+            torrent_id (str): The torrent_id.
+
+        """
+        self.pending.discard(torrent_id)
+        texts = self.texts.pop(torrent_id, None)
+        if not texts:
+            return
+
+        for trigram in self._get_text_trigrams(texts):
+            torrent_ids = self.trigrams[trigram]
+            torrent_ids.discard(torrent_id)
+            if not torrent_ids:
+                del self.trigrams[trigram]
+
+    def _get_text_trigrams(self, texts):
+        trigrams = set()
+        for text in texts.values():
+            trigrams.update(get_trigrams(text))
+        return trigrams
+
+    def _index_pending(self):
+        while self.pending:
+            torrent_id = self.pending.pop()
+            self.remove(torrent_id)
+            try:
+                texts = self.get_texts(torrent_id)
+            except KeyError:
+                # Torrent was removed meanwhile.
+                continue
+
+            texts = dict((field, text.lower()) for field, text in texts.items())
+            self.texts[torrent_id] = texts
+            for trigram in self._get_text_trigrams(texts):
+                self.trigrams.setdefault(trigram, set()).add(torrent_id)
+
+    def search(self, string, fields):
+        """Find the torrents with string in the text of any of the fields.
+
+        Args:
+            string (str): The string to find, matched case-insensitively.
+            fields (list of str): The fields to search.
+
+        Returns:
+            set: The matching torrent_ids.
+
+        """
+        self._index_pending()
+        string = string.lower()
+
+        if len(string) < 3:
+            candidates = self.texts
+        else:
+            trigram_ids = []
+            for trigram in get_trigrams(string):
+                torrent_ids = self.trigrams.get(trigram)
+                if not torrent_ids:
+                    return set()
+                trigram_ids.append(torrent_ids)
+            trigram_ids.sort(key=len)
+            candidates = trigram_ids[0].intersection(*trigram_ids[1:])
+
+        matches = set()
+        for torrent_id in candidates:
+            texts = self.texts[torrent_id]
+            for field in fields:
+                if string in texts.get(field, ''):
+                    matches.add(torrent_id)
+                    break
+        return matches
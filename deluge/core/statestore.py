@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Deluge and is licensed under GNU General Public License 3.0, or later, with
+# the additional special exception to link portions of this program with the OpenSSL library.
+# See LICENSE for more details.
+#
+
+"""SQLite backed storage of the TorrentManager session state."""
+
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+from contextlib import closing
+
+log = logging.getLogger(__name__)
+
+
+class TorrentStateStore(object):
+    """Stores the TorrentState and resume data of each torrent as rows in an SQLite database.
+
+    Saving only writes the rows of torrents whose pickled state differs from the
+    last saved or loaded state, and deletes the rows of removed torrents, in a
+    single transaction so a crash leaves either the old or the new state.
+
+    Every save still pickles the state of each torrent to compare digests, so its
+    cost grows with the session size. Dirty flags set by each Torrent setter would
+    avoid this, but would also have to catch the queue moves changing many torrents.
+
+    Resume data is kept in a separate table so that saving the resume data of
+    a torrent only writes that torrent's row.
+
+    The database is opened for each operation so it can be used from the
+    thread saving the state as well as the main thread.
+
+    Args:
+        filepath (str): The path of the database file.
+
+    Attributes:
+        is_new (bool): True if the database file did not exist when the store was created.
+        is_migrated (bool): True once the legacy state files were imported, see `migrate`.
+        digests (dict): The digest of the pickled state last saved or loaded, {torrent_id: digest}.
+
+    """
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.is_new = not os.path.isfile(filepath)
+        self.digests = {}
+
+        with closing(self._connect()) as conn:
+            # Write-ahead logging so a save does not wait on a load still reading rows.
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS torrents '
+                             '(torrent_id TEXT PRIMARY KEY, queue INTEGER, state BLOB)')
+                conn.execute('CREATE TABLE IF NOT EXISTS resume_data (torrent_id TEXT PRIMARY KEY, data BLOB)')
+                conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def _connect(self, threadsafe=False):
+        return sqlite3.connect(self.filepath, check_same_thread=not threadsafe)
+
+    @property
+    def is_migrated(self):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone() is not None
+
+    def __len__(self):
+        with closing(self._connect()) as conn:
+            return conn.execute('SELECT COUNT(*) FROM torrents').fetchone()[0]
+
+    def load(self, reverse=False, threadsafe=False):
+        """Load the torrent states with their resume data, one row at a time.
+
+        Rows that fail to unpickle are logged and skipped.
+
+        Args:
+            reverse (bool, optional): Yield in descending queue order, defaults to ascending.
+            threadsafe (bool, optional): Allow the iteration to continue in another thread,
+                the caller must ensure it is never iterated by two threads at once.
+
+        Yields:
+            tuple: The TorrentState and the bencoded resume data, or None, of each torrent in queue order.
+
+        """
+        query = ('SELECT torrents.torrent_id, state, data FROM torrents LEFT JOIN resume_data '
+                 'ON torrents.torrent_id = resume_data.torrent_id ORDER BY queue %s' % ('DESC' if reverse else 'ASC'))
+        with closing(self._connect(threadsafe)) as conn:
+            for torrent_id, data, resume_data in conn.execute(query):
+                data = bytes(data)
+                try:
+                    state = pickle.loads(data)
+                except (EOFError, AttributeError, ImportError, pickle.UnpicklingError) as ex:
+                    log.warning('Unable to load state of torrent %s: %s', torrent_id, ex)
+                    continue
+                self.digests[torrent_id] = hashlib.sha1(data).digest()
+                yield state, bytes(resume_data) if resume_data is not None else None
+
+    def save(self, states):
+        """Save the states of all the torrents in the session.
+
+        Args:
+            states (list of TorrentState): The state of every torrent, rows of any other
+                torrents are deleted.
+
+        Returns:
+            int: The number of torrent rows written or deleted.
+
+        Raises:
+            sqlite3.Error: If the transaction failed, the stored state is then unchanged.
+
+        """
+        digests = {}
+        rows = []
+        for state in states:
+            data = pickle.dumps(state, protocol=2)
+            digest = hashlib.sha1(data).digest()
+            digests[state.torrent_id] = digest
+            if self.digests.get(state.torrent_id) != digest:
+                rows.append((state.torrent_id, state.queue, sqlite3.Binary(data)))
+        removed = [(torrent_id,) for torrent_id in self.digests if torrent_id not in digests]
+
+        if rows or removed:
+            with closing(self._connect()) as conn:
+                with conn:
+                    conn.executemany('INSERT OR REPLACE INTO torrents VALUES (?, ?, ?)', rows)
+                    conn.executemany('DELETE FROM torrents WHERE torrent_id = ?', removed)
+        self.digests = digests
+        return len(rows) + len(removed)
+
+    def migrate(self, states, resume_data):
+        """Import the torrents of the legacy state files and mark the store as migrated.
+
+        The rows and the migrated mark are written in a single transaction, rows of
+        torrents already in the store are kept, so a failed import can be retried.
+
+        Args:
+            states (list of TorrentState): The states of the legacy torrents.state file.
+            resume_data (dict): The bencoded resume data of the legacy torrents.fastresume
+                file, {torrent_id: data}.
+
+        Raises:
+            sqlite3.Error: If the transaction failed, the store is then unchanged.
+
+        """
+        rows = [(state.torrent_id, state.queue, sqlite3.Binary(pickle.dumps(state, protocol=2))) for state in states]
+        resume_rows = [(torrent_id, sqlite3.Binary(data)) for torrent_id, data in resume_data.items()]
+        with closing(self._connect()) as conn:
+            with conn:
+                conn.executemany('INSERT OR IGNORE INTO torrents VALUES (?, ?, ?)', rows)
+                conn.executemany('INSERT OR IGNORE INTO resume_data VALUES (?, ?)', resume_rows)
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('migrated', '1')")
+
+    def checkpoint(self):
+        """Write the write-ahead log into the database file and truncate the log.
+
+        The database file alone then holds all the saved rows, e.g. to archive a copy of it.
+
+        Raises:
+            sqlite3.Error: If the checkpoint failed.
+
+        """
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def save_resume_data(self, resume_data):
+        """Save the resume data of torrents.
+
+        Args:
+            resume_data (dict): The bencoded resume data to save, {torrent_id: data}, a
+                value of None deletes the torrent's resume data.
+
+        Raises:
+            sqlite3.Error: If the transaction failed, the stored resume data is then unchanged.
+
+        """
+        rows = [(torrent_id, sqlite3.Binary(data)) for torrent_id, data in resume_data.items() if data is not None]
+        removed = [(torrent_id,) for torrent_id, data in resume_data.items() if data is None]
+        with closing(self._connect()) as conn:
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO resume_data VALUES (?, ?)', rows)
+                conn.executemany('DELETE FROM resume_data WHERE torrent_id = ?', removed)
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Deluge and is licensed under GNU General Public License 3.0, or later, with
+# the additional special exception to link portions of this program with the OpenSSL library.
+# See LICENSE for more details.
+#
+
+"""Push subscriptions of client sessions to the status of torrents."""
+
+import logging
+import time
+
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+
+import deluge.component as component
+from deluge.event import TorrentsStatusUpdateEvent
+
+log = logging.getLogger(__name__)
+
+
+class StatusSubscription(object):
+    """The status subscription of a client session.
+
+    Args:
+        filter_dict (dict): The filters of the torrents, see `FilterManager.filter_torrent_ids`.
+        keys (list of str): The status keys, all the torrent keys if empty.
+        min_interval (float): The minimum time, in seconds, between the pushed updates.
+        user (str): The user of the session, whose torrents are pushed.
+        auth_level (int): The auth level of the session.
+
+    Attributes:
+        torrent_ids (set): The torrent_ids matching the filter at the last push.
+        plugin_status (dict): The plugin keys last pushed, {torrent_id: {key: value}}.
+        last_push (float): When the last update was pushed.
+        delayed_push (DelayedCall): The push waiting for min_interval to pass, if any.
+
+    """
+    def __init__(self, filter_dict, keys, min_interval, user, auth_level):
+        self.filter_dict = filter_dict
+        self.keys = keys
+        self.min_interval = min_interval
+        self.user = user
+        self.auth_level = auth_level
+        self.torrent_ids = set()
+        self.plugin_status = {}
+        self.last_push = 0
+        self.delayed_push = None
+
+
+class TorrentStatusSubscriptions(object):
+    """Pushes the status changes of torrents to the client sessions subscribed to them.
+
+    All the subscriptions share one libtorrent status poll, a timer at the smallest
+    min_interval posts torrent updates unless a status request did recently. After
+    each state_update_alert the changes are pushed, as a TorrentsStatusUpdateEvent,
+    to the subscriptions whose min_interval has passed, later ones are coalesced
+    into a single delayed push.
+
+    The changes are diffed by the TorrentStatusSnapshot of the TorrentManager, with
+    a diff state separate from the `get_torrents_status` diffs of the same session.
+
+    Args:
+        torrentmanager (TorrentManager): The TorrentManager.
+
+    Attributes:
+        subscriptions (dict): The `StatusSubscription` of each session_id.
+
+    """
+    def __init__(self, torrentmanager):
+        self.torrentmanager = torrentmanager
+        self.subscriptions = {}
+        self.poll_timer = LoopingCall(self.poll)
+
+    def _get_diff_session(self, session_id):
+        return ('subscription', session_id)
+
+    def subscribe(self, session_id, filter_dict, keys, min_interval):
+        """Subscribe a session to the status of torrents, replacing its previous subscription.
+
+        Must be called by an RPC of the session, whose user and auth level select the
+        torrents of the subscription, as the pushes are not made in an RPC of the session.
+
+        Args:
+            session_id (int): The session_id.
+            filter_dict (dict): The filters of the torrents.
+            keys (list of str): The status keys, all the torrent keys if empty.
+            min_interval (float): The minimum time, in seconds, between the pushed updates.
+
+        Returns:
+            dict: The full status of the matching torrents, {torrent_id: {key: value}}.
+
+        """
+        self.unsubscribe(session_id)
+        rpcserver = component.get('RPCServer')
+        subscription = StatusSubscription(filter_dict, keys, min_interval, rpcserver.get_session_user(),
+                                          rpcserver.get_session_auth_level())
+        self.subscriptions[session_id] = subscription
+        self.update_poll_timer()
+        return self.get_changes(session_id, subscription)[0]
+
+    def unsubscribe(self, session_id):
+        """Remove the subscription of a session.
+
+        Args:
+            session_id (int): The session_id.
+
+        """
+        subscription = self.subscriptions.pop(session_id, None)
+        if not subscription:
+            return
+
+        if subscription.delayed_push and subscription.delayed_push.active():
+            subscription.delayed_push.cancel()
+        self.torrentmanager.status_snapshot.remove_session(self._get_diff_session(session_id))
+        self.update_poll_timer()
+
+    def stop(self):
+        for session_id in list(self.subscriptions):
+            self.unsubscribe(session_id)
+
+    def update_poll_timer(self):
+        if self.poll_timer.running:
+            self.poll_timer.stop()
+        if self.subscriptions:
+            interval = min(subscription.min_interval for subscription in self.subscriptions.values())
+            self.poll_timer.start(interval, now=False)
+
+    def poll(self):
+        """Ask libtorrent for the status of the torrents, unless it was updated within the poll interval"""
+        if time.time() - self.torrentmanager.last_state_update_alert_ts >= self.poll_timer.interval:
+            self.torrentmanager.session.post_torrent_updates()
+
+    def on_status_updated(self):
+        """Push the changes to the subscriptions, called after each state_update_alert"""
+        now = time.time()
+        for session_id, subscription in list(self.subscriptions.items()):
+            wait = subscription.last_push + subscription.min_interval - now
+            if wait <= 0:
+                self.push(session_id)
+            elif not (subscription.delayed_push and subscription.delayed_push.active()):
+                subscription.delayed_push = reactor.callLater(wait, self.push, session_id)
+
+    def push(self, session_id):
+        """Send the status changes of the subscription of a session.
+
+        Args:
+            session_id (int): The session_id.
+
+        """
+        subscription = self.subscriptions.get(session_id)
+        if not subscription:
+            return
+
+        status, removed = self.get_changes(session_id, subscription)
+        if status or removed:
+            component.get('RPCServer').emit_event_for_session_id(
+                session_id, TorrentsStatusUpdateEvent(status, removed))
+
+    def get_changes(self, session_id, subscription):
+        """Get the status changes since the last push of a subscription.
+
+        Args:
+            session_id (int): The session_id.
+            subscription (StatusSubscription): The subscription of the session.
+
+        Returns:
+            tuple: The changed keys of each torrent with changes, {torrent_id: {key: value}}, and
+                the list of torrent_ids no longer matching the filter.
+
+        """
+        torrentmanager = self.torrentmanager
+        diff_session = self._get_diff_session(session_id)
+        subscription.last_push = time.time()
+
+        # Copied as filter_torrent_ids modifies the filter_dict.
+        torrent_ids = set(component.get('FilterManager').filter_torrent_ids(
+            dict(subscription.filter_dict), subscription.user, subscription.auth_level))
+        removed = list(subscription.torrent_ids - torrent_ids)
+        subscription.torrent_ids = torrent_ids
+        # The full status is sent again if a removed torrent matches the filter again.
+        torrentmanager.status_snapshot.reset_session_torrents(diff_session, removed)
+        for torrent_id in removed:
+            subscription.plugin_status.pop(torrent_id, None)
+
+        torrent_keys, plugin_keys = torrentmanager.separate_keys(subscription.keys, torrent_ids)
+        if not subscription.keys and torrentmanager.torrents:
+            # No keys means all the torrent status keys.
+            torrent_keys = list(next(iter(torrentmanager.torrents.values())).status_funcs)
+
+        status_dict = torrentmanager.status_snapshot.get_status(list(torrent_ids), torrent_keys, diff_session)
+        if plugin_keys:
+            pluginmanager = component.get('CorePluginManager')
+            for torrent_id, status in status_dict.items():
+                plugin_status = pluginmanager.get_status(torrent_id, plugin_keys)
+                sent = subscription.plugin_status.get(torrent_id, {})
+                status.update((key, value) for key, value in plugin_status.items()
+                              if key not in sent or sent[key] != value)
+                subscription.plugin_status[torrent_id] = plugin_status
+
+        return dict((torrent_id, status) for torrent_id, status in status_dict.items() if status), removed
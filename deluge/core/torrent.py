@@ -104,6 +104,22 @@ def convert_lt_files(files):
     return filelist
 
 
+def write_torrentfiles(files):
+    """Writes out torrent files.
+
+    Args:
+        files (list of tuples): The torrent files as tuples of (filepath, filedump).
+
+    """
+    for filepath, filedump in files:
+        log.debug('Writing torrent file to: %s', filepath)
+        try:
+            with open(filepath, 'wb') as save_file:
+                save_file.write(filedump)
+        except IOError as ex:
+            log.error('Unable to save torrent file to: %s', ex)
+
+
 class TorrentOptions(dict):
     """TorrentOptions create a dict of the torrent options.
 
@@ -194,9 +210,6 @@ class Torrent(object):
         torrent_info: store the torrent info.
         has_metadata (bool): True if the metadata for the torrent is available, False otherwise.
         status_funcs (dict): The function mappings to get torrent status
-        prev_status (dict): Previous status dicts returned for this torrent. We use this to return
-            dicts that only contain changes from the previous.
-            {session_id: status_dict, ...}
         waiting_on_folder_rename (list of dict): A list of Deferreds for file indexes we're waiting for file_rename
             alerts on. This is so we can send one folder_renamed signal instead of multiple file_renamed signals.
             [{index: Deferred, ...}, ...]
@@ -258,7 +271,6 @@ def __init__(self, handle, options, state=None, filename=None, magnet=None):
         self.forcing_recheck = False
         self.forcing_recheck_paused = False
         self.status_funcs = None
-        self.prev_status = {}
         self.waiting_on_folder_rename = []
 
         self.update_status(self.handle.status())
@@ -923,41 +935,29 @@ def get_status(self, keys, diff=False, update=False, all_keys=False):
         Args:
             keys (list of str): the keys to get the status on
             diff (bool): Will return a diff of the changes since the last
-                call to get_status based on the session_id
+                call to get_status based on the session_id, tracked by the
+                TorrentManager status snapshot
             update (bool): If True the status will be updated from libtorrent
                 if False, the cached values will be returned
 
         Returns:
             dict: a dictionary of the status keys and their values
         """
-        if update:
-            self.update_status(self.handle.status())
+        if update and self.update_status(self.handle.status()):
+            component.get('FilterManager').update_torrent(self.torrent_id, ['tracker_host'])
 
         if all_keys:
             keys = list(self.status_funcs.keys())
 
-        status_dict = {}
-
-        for key in keys:
-            status_dict[key] = self.status_funcs[key]()
-
         if diff:
+            status_snapshot = component.get('TorrentManager').status_snapshot
             session_id = self.rpcserver.get_session_id()
-            if session_id in self.prev_status:
-                # We have a previous status dict, so lets make a diff
-                status_diff = {}
-                for key, value in list(status_dict.items()):
-                    if key in self.prev_status[session_id]:
-                        if value != self.prev_status[session_id][key]:
-                            status_diff[key] = value
-                    else:
-                        status_diff[key] = value
+            return status_snapshot.get_status([self.torrent_id], keys, session_id).get(self.torrent_id, {})
 
-                self.prev_status[session_id] = status_dict
-                return status_diff
+        status_dict = {}
 
-            self.prev_status[session_id] = status_dict
-            return status_dict
+        for key in keys:
+            status_dict[key] = self.status_funcs[key]()
 
         return status_dict
 
@@ -966,8 +966,15 @@ def update_status(self, status):
 
         Args:
             status (libtorrent.torrent_status): a libtorrent torrent status
+
+        Returns:
+            bool: True if the current tracker changed, its tracker_host is then recomputed.
         """
+        tracker_changed = self.status.current_tracker != status.current_tracker
+        if tracker_changed:
+            self.tracker_host = None
         self.status = status
+        return tracker_changed
 
     def _create_status_funcs(self):
         """Creates the functions for getting torrent status"""
@@ -1173,23 +1180,16 @@ def save_resume_data(self, flush_disk_cache=False):
         else:
             self.handle.save_resume_data(flags)
 
-    def write_torrentfile(self, filedump=None):
+    def write_torrentfile(self, filedump=None, torrentfile_writes=None):
         """Writes the torrent file to the state dir and optional 'copy of' dir.
 
         Args:
             filedump (str, optional): bencoded filedump of a torrent file.
+            torrentfile_writes (list, optional): If set, the (filepath, filedump) of the files are
+                appended to the list to be written later with `write_torrentfiles`.
 
         """
-
-        def write_file(filepath, filedump):
-            """Write out the torrent file"""
-            log.debug('Writing torrent file to: %s', filepath)
-            try:
-                with open(filepath, 'wb') as save_file:
-                    save_file.write(filedump)
-            except IOError as ex:
-                log.error('Unable to save torrent file to: %s', ex)
-
+        files = []
         filepath = os.path.join(get_config_dir(), 'state', self.torrent_id + '.torrent')
         # Regenerate the file priorities
         self.set_file_priorities([])
@@ -1197,14 +1197,19 @@ def write_file(filepath, filedump):
             metadata = lt.bdecode(self.torrent_info.metadata())
             torrent_file = {'info': metadata}
             filedump = lt.bencode(torrent_file)
-        write_file(filepath, filedump)
+        files.append((filepath, filedump))
 
         # If the user has requested a copy of the torrent be saved elsewhere we need to do that.
         if self.config['copy_torrent_file']:
             if not self.filename:
                 self.filename = self.get_name() + '.torrent'
             filepath = os.path.join(self.config['torrentfiles_location'], self.filename)
-            write_file(filepath, filedump)
+            files.append((filepath, filedump))
+
+        if torrentfile_writes is None:
+            write_torrentfiles(files)
+        else:
+            torrentfile_writes.extend(files)
 
     def delete_torrentfile(self, delete_copies=False):
         """Deletes the .torrent file in the state directory in config"""
@@ -1349,16 +1354,6 @@ def remove_empty_folders(self, folder):
         except OSError as ex:
             log.debug('Cannot Remove Folder: %s', ex)
 
-    def cleanup_prev_status(self):
-        """Checks the validity of the keys in the prev_status dict.
-
-        If the key is no longer valid, the dict will be deleted.
-        """
-        # Dict will be modified so iterate over generated list
-        for key in list(self.prev_status):
-            if not self.rpcserver.is_session_valid(key):
-                del self.prev_status[key]
-
     def _get_pieces_info(self):
         """Get the pieces for this torrent."""
         if not self.has_metadata or self.status.is_seeding:
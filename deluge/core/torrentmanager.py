@@ -12,10 +12,11 @@
 import pickle
 import datetime
 import logging
-import operator
 import os
 import shutil
+import sqlite3
 import time
+from itertools import islice
 
 from twisted.internet import defer, reactor, threads
 from twisted.internet.defer import Deferred, DeferredList
@@ -26,14 +27,25 @@
 from deluge.common import decode_string, get_magnet_info, utf8_encoded
 from deluge.configmanager import ConfigManager, get_config_dir
 from deluge.core.authmanager import AUTH_LEVEL_ADMIN
-from deluge.core.torrent import Torrent, TorrentOptions, sanitize_filepath
+from deluge.core.statestore import TorrentStateStore
+from deluge.core.statussubscriptions import TorrentStatusSubscriptions
+from deluge.core.torrent import Torrent, TorrentOptions, sanitize_filepath, write_torrentfiles
+from deluge.core.torrentstatus import TorrentStatusSnapshot
 from deluge.error import AddTorrentError, InvalidTorrentError
-from deluge.event import (ExternalIPEvent, PreTorrentRemovedEvent, SessionStartedEvent, TorrentAddedEvent,
-                          TorrentFileCompletedEvent, TorrentFileRenamedEvent, TorrentFinishedEvent, TorrentRemovedEvent,
-                          TorrentResumedEvent)
+from deluge.event import (ExternalIPEvent, PreTorrentRemovedEvent, SessionLoadingProgressEvent, SessionStartedEvent,
+                          TorrentAddedEvent, TorrentFileCompletedEvent, TorrentFileRenamedEvent, TorrentFinishedEvent,
+                          TorrentRemovedEvent, TorrentResumedEvent, TorrentsChangedEvent)
 
 log = logging.getLogger(__name__)
 
+# The number of torrents read, decoded or written at a time in a thread.
+TORRENT_BATCH_SIZE = 200
+# The delay, in seconds, to coalesce queued state and resume data saves into one write.
+QUEUED_SAVE_DELAY = 1.0
+# The status keys that change when the metadata of a magnet torrent is received.
+METADATA_KEYS = ['comment', 'file_priorities', 'file_progress', 'files', 'name', 'num_files', 'num_pieces',
+                 'orig_files', 'piece_length', 'private', 'total_size']
+
 
 class TorrentState:  # pylint: disable=old-style-class
     """Create a torrent state.
@@ -111,10 +123,13 @@ def __init__(self):
         if not os.path.exists(self.state_dir):
             os.makedirs(self.state_dir)
         self.temp_file = os.path.join(self.state_dir, '.safe_state_check')
+        # The torrent states, saved incrementally
+        self.state_store = TorrentStateStore(os.path.join(self.state_dir, 'torrents.db'))
 
         # Create the torrents dict { torrent_id: Torrent }
         self.torrents = {}
         self.queued_torrents = set()
+        self.is_loading_state = False
         self.is_saving_state = False
         self.save_resume_data_file_lock = defer.DeferredLock()
         self.torrents_loading = {}
@@ -126,12 +141,20 @@ def __init__(self):
         # Keep track of torrents finished but moving storage
         self.waiting_on_finish_moving = []
 
-        # Keeps track of resume data
+        # Keeps track of resume data and the torrent_ids with resume data not yet saved
         self.resume_data = {}
+        self.resume_data_changed = set()
+        # Torrents changed in bulk, saved together by save_queued
+        self.queued_save_torrent_ids = set()
+        self.queued_save_call = None
 
         self.torrents_status_requests = []
         self.status_dict = {}
+        # Columnar status of all torrents, refreshed from state_update_alerts
+        self.status_snapshot = TorrentStatusSnapshot()
         self.last_state_update_alert_ts = 0
+        # Client sessions subscribed to status updates pushed after each state_update_alert
+        self.status_subscriptions = TorrentStatusSubscriptions(self)
 
         # Register set functions
         self.config.register_set_function('max_connections_per_torrent',
@@ -167,10 +190,13 @@ def __init__(self):
         self.alerts.register_handler('fastresume_rejected_alert', self.on_alert_fastresume_rejected)
         self.alerts.register_handler('add_torrent_alert', self.on_add_torrent_alert)
 
+        # Drop the status diff state of disconnected clients
+        component.get('EventManager').register_event_handler(
+            'ClientDisconnectedEvent', self.on_client_disconnected)
+
         # Define timers
         self.save_state_timer = LoopingCall(self.save_state)
         self.save_resume_data_timer = LoopingCall(self.save_resume_data)
-        self.prev_status_cleanup_loop = LoopingCall(self.cleanup_torrents_prev_status)
 
     def start(self):
         # Check for old temp file to verify safe shutdown
@@ -184,6 +210,8 @@ def archive_file(filename):
                     os.makedirs(archive_dir)
 
                 for _filepath in (filepath, filepath_bak):
+                    if not os.path.isfile(_filepath):
+                        continue
                     timestamp = datetime.datetime.now().replace(microsecond=0).isoformat().replace(':', '-')
                     archive_filepath = os.path.join(archive_dir, filename + '-' + timestamp)
                     try:
@@ -194,22 +222,31 @@ def archive_file(filename):
                         log.info('Archive of %s successful: %s', filename, archive_filepath)
 
             log.warning('Potential bad shutdown of Deluge detected, archiving torrent state files...')
-            archive_file('torrents.state')
-            archive_file('torrents.fastresume')
+            try:
+                self.state_store.checkpoint()
+            except sqlite3.Error as ex:
+                log.error('Unable to checkpoint torrents state before archiving: %s', ex)
+            archive_file('torrents.db')
         else:
             with open(self.temp_file, 'a'):
                 os.utime(self.temp_file, None)
 
         # Try to load the state from file
-        self.load_state()
+        self.load_state().addErrback(self.on_load_state_failed)
 
         # Save the state periodically
         self.save_state_timer.start(200, False)
         self.save_resume_data_timer.start(190, False)
-        self.prev_status_cleanup_loop.start(10)
 
     @defer.inlineCallbacks
     def stop(self):
+        self.status_subscriptions.stop()
+
+        # The queued torrents are saved with all the others below
+        if self.queued_save_call and self.queued_save_call.active():
+            self.queued_save_call.cancel()
+        self.queued_save_torrent_ids.clear()
+
         # Stop timers
         if self.save_state_timer.running:
             self.save_state_timer.stop()
@@ -217,9 +254,6 @@ def stop(self):
         if self.save_resume_data_timer.running:
             self.save_resume_data_timer.stop()
 
-        if self.prev_status_cleanup_loop.running:
-            self.prev_status_cleanup_loop.stop()
-
         # Save state on shutdown
         yield self.save_state()
 
@@ -259,18 +293,25 @@ def __getitem__(self, torrent_id):
         """
         return self.torrents[torrent_id]
 
-    def get_torrent_list(self):
+    def get_torrent_list(self, user=None, auth_level=None):
         """Creates a list of torrent_ids, owned by current user and any marked shared.
 
+        Args:
+            user (str, optional): The user, defaults to the user of the current RPC.
+            auth_level (int, optional): The auth level of the user, defaults to the
+                auth level of the current RPC.
+
         Returns:
             list: A list of torrent_ids.
 
         """
+        if auth_level is None:
+            auth_level = component.get('RPCServer').get_session_auth_level()
         torrent_ids = list(self.torrents.keys())
-        if component.get('RPCServer').get_session_auth_level() == AUTH_LEVEL_ADMIN:
+        if auth_level == AUTH_LEVEL_ADMIN:
             return torrent_ids
 
-        current_user = component.get('RPCServer').get_session_user()
+        current_user = user if user is not None else component.get('RPCServer').get_session_user()
         for torrent_id in torrent_ids[:]:
             torrent_status = self.torrents[torrent_id].get_status(['owner', 'shared'])
             if torrent_status['owner'] != current_user and not torrent_status['shared']:
@@ -298,7 +339,7 @@ def get_torrent_info_from_file(self, filepath):
             return torrent_info
 
     def add(self, torrent_info=None, state=None, options=None, save_state=True,
-            filedump=None, filename=None, magnet=None, resume_data=None):
+            filedump=None, filename=None, magnet=None, resume_data=None, torrentfile_writes=None):
         """Adds a torrent to the torrent manager.
 
         Args:
@@ -306,10 +347,12 @@ def add(self, torrent_info=None, state=None, options=None, save_state=True,
             state (TorrentState, optional): The torrent state.
             options (dict, optional): The options to apply to the torrent on adding.
             save_state (bool, optional): If True save the session state after adding torrent, defaults to True.
-            filedump (str, optional): bencoded filedump of a torrent file.
+            filedump (str, optional): bencoded filedump of a torrent file, only decoded if torrent_info is not set.
             filename (str, optional): The filename of the torrent file.
             magnet (str, optional): The magnet uri.
             resume_data (lt.entry, optional): libtorrent fast resume data.
+            torrentfile_writes (list, optional): Collects the torrent file writes of filedump,
+                see `Torrent.write_torrentfile`, instead of writing them when added.
 
         Returns:
             str: If successful the torrent_id of the added torrent, None if adding the torrent failed.
@@ -321,7 +364,7 @@ def add(self, torrent_info=None, state=None, options=None, save_state=True,
         if not torrent_info and not filedump and not magnet:
             raise AddTorrentError('You must specify a valid torrent_info, torrent state or magnet.')
 
-        if filedump:
+        if filedump and not torrent_info:
             try:
                 torrent_info = lt.torrent_info(lt.bdecode(filedump))
             except RuntimeError as ex:
@@ -349,6 +392,8 @@ def add(self, torrent_info=None, state=None, options=None, save_state=True,
         if torrent_id in self.get_torrent_list():
             # Attempt merge trackers before returning.
             self.torrents[torrent_id].merge_trackers(torrent_info)
+            component.get('FilterManager').update_torrent(torrent_id, ['tracker_host'])
+            component.get('FilterManager').search_index.update(torrent_id)
             raise AddTorrentError('Torrent already in session (%s).' % torrent_id)
         elif torrent_id in self.torrents_loading:
             raise AddTorrentError('Torrent already being added (%s).' % torrent_id)
@@ -401,16 +446,83 @@ def add(self, torrent_info=None, state=None, options=None, save_state=True,
 
         d = Deferred()
         try:
-            self.torrents_loading[torrent_id] = (d, options, state, filename, magnet, resume_data, filedump, save_state)
+            self.torrents_loading[torrent_id] = (d, options, state, filename, magnet, resume_data, filedump,
+                                                 save_state, torrentfile_writes)
             self.session.async_add_torrent(add_torrent_params)
         except RuntimeError as ex:
             raise AddTorrentError('Unable to add torrent to session: %s' % ex)
         return d
 
+    @defer.inlineCallbacks
+    def add_bulk(self, torrents, max_in_flight=None):
+        """Adds many torrents to the torrent manager.
+
+        The torrent files are decoded in threads and the torrents added with at most
+        max_in_flight waiting on libtorrent. The torrent files are written in batches
+        in a thread and the session state is saved once all torrents are added.
+
+        Args:
+            torrents (list of dict): The `add` keyword arguments for each torrent, any of
+                filedump, filename, magnet and options.
+            max_in_flight (int, optional): The limit of torrents being added at once, defaults
+                to the add_torrents_bulk_max_in_flight config value.
+
+        Returns:
+            Deferred: Fires with a list, in the order of torrents, of tuples of (True, torrent_id)
+                if added or (False, error message) if not.
+
+        """
+        if max_in_flight is None:
+            max_in_flight = self.config['add_torrents_bulk_max_in_flight']
+
+        def decode_filedumps(filedumps):
+            torrent_infos = []
+            for filedump in filedumps:
+                try:
+                    torrent_infos.append(lt.torrent_info(lt.bdecode(filedump)) if filedump else None)
+                except RuntimeError as ex:
+                    torrent_infos.append(AddTorrentError('Unable to add torrent, decoding filedump failed: %s' % ex))
+            return torrent_infos
+
+        filedumps = [torrent.get('filedump') for torrent in torrents]
+        decoded = yield DeferredList([
+            threads.deferToThread(decode_filedumps, filedumps[i:i + TORRENT_BATCH_SIZE])
+            for i in range(0, len(filedumps), TORRENT_BATCH_SIZE)], fireOnOneErrback=True, consumeErrors=True)
+        torrent_infos = [torrent_info for dummy_success, batch in decoded for torrent_info in batch]
+
+        torrentfile_writes = []
+        writes_saved = []
+
+        def flush_torrentfile_writes(result=None, min_count=0):
+            if len(torrentfile_writes) > min_count:
+                writes_saved.append(threads.deferToThread(write_torrentfiles, torrentfile_writes[:]))
+                del torrentfile_writes[:]
+            return result
+
+        semaphore = defer.DeferredSemaphore(max_in_flight)
+        deferreds = []
+        for torrent, torrent_info in zip(torrents, torrent_infos):
+            if isinstance(torrent_info, AddTorrentError):
+                deferreds.append(defer.fail(torrent_info))
+                continue
+            d = semaphore.run(self.add, torrent_info=torrent_info, options=torrent.get('options'),
+                              save_state=False, filedump=torrent.get('filedump'),
+                              filename=torrent.get('filename'), magnet=torrent.get('magnet'),
+                              torrentfile_writes=torrentfile_writes)
+            deferreds.append(d.addBoth(flush_torrentfile_writes, TORRENT_BATCH_SIZE))
+
+        results = yield DeferredList(deferreds, consumeErrors=True)
+        flush_torrentfile_writes()
+        yield DeferredList(writes_saved)
+        self.save_state()
+
+        defer.returnValue([(True, result) if success else (False, result.getErrorMessage())
+                           for success, result in results])
+
     def on_add_torrent_alert(self, alert):
         """Alert handler for libtorrent add_torrent_alert"""
-        if not alert.handle.is_valid():
-            log.warn('Torrent handle is invalid!')
+        if alert.error.value() or not alert.handle.is_valid():
+            self.on_add_torrent_failed(alert)
             return
 
         try:
@@ -419,15 +531,20 @@ def on_add_torrent_alert(self, alert):
             log.warn('Failed to get torrent id from handle: %s', ex)
             return
 
-        d, options, state, filename, magnet, resume_data, filedump, save_state = self.torrents_loading.pop(torrent_id)
+        (d, options, state, filename, magnet, resume_data, filedump,
+         save_state, torrentfile_writes) = self.torrents_loading.pop(torrent_id)
 
         # Create a Torrent object and add to the dictionary.
         torrent = Torrent(alert.handle, options, state, filename, magnet)
         self.torrents[torrent.torrent_id] = torrent
+        self.status_snapshot.add(torrent)
 
         # Store the orignal resume_data, in case of errors.
         if resume_data:
             self.resume_data[torrent.torrent_id] = resume_data
+            # Resume data loaded with the state is already in the state store.
+            if state is None:
+                self.resume_data_changed.add(torrent.torrent_id)
 
         # Add to queued torrents set.
         self.queued_torrents.add(torrent.torrent_id)
@@ -453,7 +570,7 @@ def on_add_torrent_alert(self, alert):
 
         # Write the .torrent file to the state directory.
         if filedump:
-            torrent.write_torrentfile(filedump)
+            torrent.write_torrentfile(filedump, torrentfile_writes)
 
         # Save the session state.
         if save_state:
@@ -461,6 +578,33 @@ def on_add_torrent_alert(self, alert):
 
         d.callback(torrent.torrent_id)
 
+    def on_add_torrent_failed(self, alert):
+        """Fails the pending add of a torrent libtorrent was unable to add.
+
+        Args:
+            alert (lt.add_torrent_alert): The alert with the error and add_torrent_params.
+
+        """
+        error_message = decode_string(alert.error.message())
+        log.warn('Torrent handle is invalid: %s', error_message)
+
+        torrent_id = None
+        try:
+            if alert.params.ti:
+                torrent_id = str(alert.params.ti.info_hash())
+            else:
+                magnet_info = get_magnet_info(alert.params.url)
+                if magnet_info:
+                    torrent_id = magnet_info['info_hash']
+        except (AttributeError, RuntimeError) as ex:
+            log.warn('Failed to get torrent id from add_torrent_params: %s', ex)
+
+        try:
+            d = self.torrents_loading.pop(torrent_id)[0]
+        except KeyError:
+            return
+        d.errback(AddTorrentError('Unable to add torrent to session: %s' % error_message))
+
     def remove(self, torrent_id, remove_data=False, save_state=True):
         """Remove a torrent from the session.
 
@@ -498,6 +642,7 @@ def remove(self, torrent_id, remove_data=False, save_state=True):
 
         # Remove fastresume data if it is exists
         self.resume_data.pop(torrent_id, None)
+        self.resume_data_changed.add(torrent_id)
 
         # Remove the .torrent file in the state and copy location, if user requested.
         delete_copies = self.config['copy_torrent_file'] and self.config['del_copy_torrent_file']
@@ -513,6 +658,7 @@ def remove(self, torrent_id, remove_data=False, save_state=True):
 
         # Remove the torrent from deluge's session
         del self.torrents[torrent_id]
+        self.status_snapshot.remove(torrent_id)
 
         if save_state:
             self.save_state()
@@ -532,19 +678,30 @@ def fixup_state(self, state):
             TorrentManagerState: A fixedup TorrentManager state.
 
         """
-        if state.torrents:
-            t_state_tmp = TorrentState()
-            if dir(state.torrents[0]) != dir(t_state_tmp):
-                try:
-                    for attr in set(dir(t_state_tmp)) - set(dir(state.torrents[0])):
-                        for t_state in state.torrents:
-                            setattr(t_state, attr, getattr(t_state_tmp, attr, None))
-                except AttributeError as ex:
-                    log.error('Unable to update state file to a compatible version: %s', ex)
+        for t_state in state.torrents:
+            self.fixup_torrent_state(t_state)
         return state
 
+    def fixup_torrent_state(self, t_state):
+        """Fixup an old torrent state by adding missing TorrentState options with default values.
+
+        Args:
+            t_state (TorrentState): The state of a torrent.
+
+        Returns:
+            TorrentState: The fixedup torrent state.
+
+        """
+        for attr, value in vars(TorrentState()).items():
+            if not hasattr(t_state, attr):
+                setattr(t_state, attr, value)
+        return t_state
+
     def open_state(self):
-        """Open the torrents.state file containing a TorrentManager state with session torrents.
+        """Open the legacy torrents.state file containing a TorrentManager state with session torrents.
+
+        Note:
+            Only used to migrate the session torrents to the state store.
 
         Returns:
             TorrentManagerState: The TorrentManager state.
@@ -567,56 +724,143 @@ def open_state(self):
             state = TorrentManagerState()
         return state
 
+    def migrate_state(self):
+        """Import the torrents and resume data of legacy torrents.state and torrents.fastresume
+        files into the state store.
+
+        The import is retried on each start until it succeeds.
+
+        """
+        state = self.fixup_state(self.open_state())
+        resume_data = self.load_resume_data_file() if state.torrents else {}
+        try:
+            self.state_store.migrate(state.torrents, resume_data)
+        except (sqlite3.Error, pickle.PicklingError) as ex:
+            log.error('Unable to migrate torrents.state to the state store: %s', ex)
+        else:
+            if state.torrents:
+                log.info('Migrated %d torrents from torrents.state to the state store', len(state.torrents))
+
+    @defer.inlineCallbacks
     def load_state(self):
-        """Load all the torrents from TorrentManager state into session.
+        """Load all the torrents from the state store into session.
+
+        The torrent states are read and their torrent files parsed in threads, a batch
+        at a time, and added to the session without blocking the reactor. Only the
+        batch being added and the next batch being read are held in memory.
 
         Emits:
+            SessionLoadingProgressEvent: Emitted after each batch of torrents is added.
             SessionStartedEvent: Emitted after all torrents are added to the session.
 
         """
         start = datetime.datetime.now()
-        state = self.open_state()
-        state = self.fixup_state(state)
+        # Saving a partially loaded session would remove the remaining torrents from the store.
+        self.is_loading_state = True
+        if not self.state_store.is_migrated:
+            self.migrate_state()
 
-        # Reorder the state.torrents list to add torrents in the correct queue order.
-        state.torrents.sort(key=operator.attrgetter('queue'), reverse=self.config['queue_new_to_top'])
-        resume_data = self.load_resume_data_file()
+        def on_add_failed(failure, torrent_id):
+            log.warn("Error when adding torrent '%s' to session: %s", torrent_id, failure.getErrorMessage())
 
-        deferreds = []
-        for t_state in state.torrents:
-            # Populate the options dict from state
-            options = TorrentOptions()
-            for option in options:
-                try:
-                    options[option] = getattr(t_state, option)
-                except AttributeError:
-                    pass
-            # Manually update unmatched attributes
-            options['download_location'] = t_state.save_path
-            options['pre_allocate_storage'] = t_state.storage_mode == 'allocate'
-            options['prioritize_first_last_pieces'] = t_state.prioritize_first_last
-            options['add_paused'] = t_state.paused
-
-            magnet = t_state.magnet
-            torrent_info = self.get_torrent_info_from_file(
-                os.path.join(self.state_dir, t_state.torrent_id + '.torrent'))
-            if torrent_info:
-                magnet = None
+        try:
+            total = len(self.state_store)
+            loaded = 0
+            # The torrent states are read from the store in the correct queue order.
+            t_states = self.state_store.load(reverse=self.config['queue_new_to_top'], threadsafe=True)
+            next_batch = threads.deferToThread(self._read_state_batch, t_states)
+            deferreds = []
+            batch_added = None
+            while True:
+                batch = yield next_batch
+                if not batch:
+                    break
+                next_batch = threads.deferToThread(self._read_state_batch, t_states)
+
+                torrent_infos = yield DeferredList([
+                    threads.deferToThread(self.get_torrent_info_from_file,
+                                          os.path.join(self.state_dir, t_state.torrent_id + '.torrent'))
+                    for t_state, dummy_resume_data in batch])
+
+                # Bound the torrents waiting on libtorrent to the previous batch.
+                if batch_added:
+                    yield batch_added
+
+                batch_deferreds = []
+                for (t_state, resume_data), (success, torrent_info) in zip(batch, torrent_infos):
+                    d = self._add_from_state(t_state, torrent_info if success else None, resume_data)
+                    if d:
+                        batch_deferreds.append(d.addErrback(on_add_failed, t_state.torrent_id))
+                deferreds.extend(batch_deferreds)
+                batch_added = DeferredList(batch_deferreds, consumeErrors=True)
+
+                loaded += len(batch)
+                component.get('EventManager').emit(SessionLoadingProgressEvent(loaded, total))
+
+            yield DeferredList(deferreds, consumeErrors=True)
+        finally:
+            self.is_loading_state = False
+
+        log.info('Finished loading %d torrents in %s', len(deferreds), str(datetime.datetime.now() - start))
+        component.get('EventManager').emit(SessionStartedEvent())
+
+    def on_load_state_failed(self, failure):
+        """Errback of load_state, the session is started with the torrents loaded so far.
 
-            try:
-                d = self.add(torrent_info=torrent_info, state=t_state, options=options, save_state=False,
-                             magnet=magnet, resume_data=resume_data.get(t_state.torrent_id))
-            except AddTorrentError as ex:
-                log.warn("Error when adding torrent '%s' to session: %s", t_state.torrent_id, ex)
-            else:
-                deferreds.append(d)
+        Emits:
+            SessionStartedEvent: The loading of the torrents aborted.
 
-        deferred_list = DeferredList(deferreds, consumeErrors=False)
+        """
+        log.error('Loading the torrents aborted after %d torrents: %s', len(self.torrents), failure.getTraceback())
+        component.get('EventManager').emit(SessionStartedEvent())
+
+    def _read_state_batch(self, t_states):
+        """Read the next batch of torrent states with their resume data.
+
+        Args:
+            t_states (iterator): The torrent states and resume data from the state store.
+
+        Returns:
+            list of tuple: The fixedup TorrentState and resume data of up to `TORRENT_BATCH_SIZE` torrents.
+
+        """
+        return [(self.fixup_torrent_state(t_state), resume_data)
+                for t_state, resume_data in islice(t_states, TORRENT_BATCH_SIZE)]
 
-        def on_complete(result):
-            log.info('Finished loading %d torrents in %s', len(state.torrents), str(datetime.datetime.now() - start))
-            component.get('EventManager').emit(SessionStartedEvent())
-        deferred_list.addCallback(on_complete)
+    def _add_from_state(self, t_state, torrent_info, resume_data):
+        """Add a torrent loaded from the state store to the session.
+
+        Args:
+            t_state (TorrentState): The torrent state.
+            torrent_info (lt.torrent_info): The torrent info from the torrent file, None for a magnet.
+            resume_data (str): The bencoded resume data, or None.
+
+        Returns:
+            Deferred: Fires when the torrent is added, or None if adding failed.
+
+        """
+        # Populate the options dict from state
+        options = TorrentOptions()
+        for option in options:
+            try:
+                options[option] = getattr(t_state, option)
+            except AttributeError:
+                pass
+        # Manually update unmatched attributes
+        options['download_location'] = t_state.save_path
+        options['pre_allocate_storage'] = t_state.storage_mode == 'allocate'
+        options['prioritize_first_last_pieces'] = t_state.prioritize_first_last
+        options['add_paused'] = t_state.paused
+
+        magnet = t_state.magnet
+        if torrent_info:
+            magnet = None
+
+        try:
+            return self.add(torrent_info=torrent_info, state=t_state, options=options, save_state=False,
+                            magnet=magnet, resume_data=resume_data)
+        except AddTorrentError as ex:
+            log.warn("Error when adding torrent '%s' to session: %s", t_state.torrent_id, ex)
 
     def create_state(self):
         """Create a state of all the torrents in TorrentManager.
@@ -676,7 +920,7 @@ def save_state(self):
             If a save task is already running, this call is ignored.
 
         """
-        if self.is_saving_state:
+        if self.is_saving_state or self.is_loading_state:
             return defer.succeed(None)
         self.is_saving_state = True
         d = threads.deferToThread(self._save_state)
@@ -689,45 +933,18 @@ def on_state_saved(arg):
         return d
 
     def _save_state(self):
-        """Save the state of the TorrentManager to the torrents.state file."""
+        """Save the state of the changed torrents to the state store."""
         state = self.create_state()
         if not state.torrents:
             log.debug('Skipping saving state with no torrents loaded')
             return
 
-        filename = 'torrents.state'
-        filepath = os.path.join(self.state_dir, filename)
-        filepath_bak = filepath + '.bak'
-        filepath_tmp = filepath + '.tmp'
-
-        try:
-            log.debug('Creating the temporary file: %s', filepath_tmp)
-            with open(filepath_tmp, 'wb', 0) as _file:
-                pickle.dump(state, _file)
-                _file.flush()
-                os.fsync(_file.fileno())
-        except (OSError, pickle.PicklingError) as ex:
-            log.error('Unable to save %s: %s', filename, ex)
-            return
-
         try:
-            log.debug('Creating backup of %s at: %s', filename, filepath_bak)
-            if os.path.isfile(filepath_bak):
-                os.remove(filepath_bak)
-            if os.path.isfile(filepath):
-                os.rename(filepath, filepath_bak)
-        except OSError as ex:
-            log.error('Unable to backup %s to %s: %s', filepath, filepath_bak, ex)
-            return
-
-        try:
-            log.debug('Saving %s to: %s', filename, filepath)
-            os.rename(filepath_tmp, filepath)
-        except OSError as ex:
-            log.error('Failed to set new state file %s: %s', filepath, ex)
-            if os.path.isfile(filepath_bak):
-                log.info('Restoring backup of state from: %s', filepath_bak)
-                os.rename(filepath_bak, filepath)
+            count = self.state_store.save(state.torrents)
+        except (sqlite3.Error, pickle.PicklingError) as ex:
+            log.error('Unable to save torrents state: %s', ex)
+        else:
+            log.debug('Saved state of %d changed torrents', count)
 
     def save_resume_data(self, torrent_ids=None, flush_disk_cache=False):
         """Saves torrents resume data.
@@ -774,8 +991,40 @@ def on_all_resume_data_finished(dummy_result):
 
         return DeferredList(deferreds).addBoth(on_all_resume_data_finished)
 
+    def queue_save(self, torrent_ids):
+        """Queue saving the state and resume data of changed torrents.
+
+        The saves queued within `QUEUED_SAVE_DELAY` are coalesced into a single
+        save_state and save_resume_data, instead of one per call or per torrent.
+
+        Args:
+            torrent_ids (list of str): The torrents to save the resume data for.
+
+        """
+        self.queued_save_torrent_ids.update(torrent_ids)
+        if not self.queued_save_call or not self.queued_save_call.active():
+            self.queued_save_call = reactor.callLater(QUEUED_SAVE_DELAY, self.save_queued)
+
+    def save_queued(self):
+        """Save the state and the resume data of the torrents queued by queue_save.
+
+        Returns:
+            t.i.d.DeferredList: Fires when the resume data is saved.
+
+        """
+        if self.queued_save_call and self.queued_save_call.active():
+            self.queued_save_call.cancel()
+        torrent_ids = [torrent_id for torrent_id in self.queued_save_torrent_ids if torrent_id in self.torrents]
+        self.queued_save_torrent_ids.clear()
+        log.debug('Saving queued changes of %d torrents', len(torrent_ids))
+        self.save_state()
+        return self.save_resume_data(torrent_ids)
+
     def load_resume_data_file(self):
-        """Load the resume data from file for all torrents.
+        """Load the resume data from the legacy torrents.fastresume file for all torrents.
+
+        Note:
+            Only used to migrate the resume data to the state store.
 
         Returns:
             dict: A dict of torrents and their resume_data.
@@ -806,7 +1055,7 @@ def load_resume_data_file(self):
             return resume_data
 
     def save_resume_data_file(self, queue_task=False):
-        """Save resume data to file in a separate thread to avoid blocking main thread.
+        """Save changed resume data to the state store in a separate thread to avoid blocking main thread.
 
         Args:
             queue_task (bool): If True and a save task is already running then queue
@@ -821,9 +1070,14 @@ def save_resume_data_file(self, queue_task=False):
             return defer.succeed(None)
 
         def on_lock_aquired():
-            d = threads.deferToThread(self._save_resume_data_file)
+            changed, self.resume_data_changed = self.resume_data_changed, set()
+            resume_data = dict((torrent_id, self.resume_data.get(torrent_id)) for torrent_id in changed)
+            d = threads.deferToThread(self._save_resume_data_file, resume_data)
 
             def on_resume_data_file_saved(arg):
+                if not arg:
+                    # Retry with the next save.
+                    self.resume_data_changed.update(changed)
                 if self.save_resume_data_timer.running:
                     self.save_resume_data_timer.reset()
                 return arg
@@ -831,51 +1085,26 @@ def on_resume_data_file_saved(arg):
             return d
         return self.save_resume_data_file_lock.run(on_lock_aquired)
 
-    def _save_resume_data_file(self):
-        """Saves the resume data file with the contents of self.resume_data"""
-        if not self.resume_data:
-            return True
+    def _save_resume_data_file(self, resume_data):
+        """Saves the resume data of the changed torrents to the state store.
 
-        filename = 'torrents.fastresume'
-        filepath = os.path.join(self.state_dir, filename)
-        filepath_bak = filepath + '.bak'
-        filepath_tmp = filepath + '.tmp'
+        Args:
+            resume_data (dict): The bencoded resume data of each changed torrent, None if removed.
 
-        try:
-            log.debug('Creating the temporary file: %s', filepath_tmp)
-            with open(filepath_tmp, 'wb', 0) as _file:
-                _file.write(lt.bencode(self.resume_data))
-                _file.flush()
-                os.fsync(_file.fileno())
-        except (OSError, EOFError) as ex:
-            log.error('Unable to save %s: %s', filename, ex)
-            return False
+        Returns:
+            bool: True if the resume data was saved, otherwise False.
 
-        try:
-            log.debug('Creating backup of %s at: %s', filename, filepath_bak)
-            if os.path.isfile(filepath_bak):
-                os.remove(filepath_bak)
-            if os.path.isfile(filepath):
-                os.rename(filepath, filepath_bak)
-        except OSError as ex:
-            log.error('Unable to backup %s to %s: %s', filepath, filepath_bak, ex)
-            return False
+        """
+        if not resume_data:
+            return True
 
         try:
-            log.debug('Saving %s to: %s', filename, filepath)
-            os.rename(filepath_tmp, filepath)
-        except OSError as ex:
-            log.error('Failed to set new file %s: %s', filepath, ex)
-            if os.path.isfile(filepath_bak):
-                log.info('Restoring backup from: %s', filepath_bak)
-                os.rename(filepath_bak, filepath)
-        else:
-            # Sync the rename operations for the directory
-            if hasattr(os, 'O_DIRECTORY'):
-                dirfd = os.open(os.path.dirname(filepath), os.O_DIRECTORY)
-                os.fsync(dirfd)
-                os.close(dirfd)
-            return True
+            self.state_store.save_resume_data(resume_data)
+        except sqlite3.Error as ex:
+            log.error('Unable to save resume data of %d torrents: %s', len(resume_data), ex)
+            return False
+        log.debug('Saved resume data of %d torrents', len(resume_data))
+        return True
 
     def get_queue_position(self, torrent_id):
         """Get queue position of torrent"""
@@ -913,10 +1142,10 @@ def queue_bottom(self, torrent_id):
         self.torrents[torrent_id].handle.queue_position_bottom()
         return True
 
-    def cleanup_torrents_prev_status(self):
-        """Run cleanup_prev_status for each registered torrent"""
-        for torrent in list(self.torrents.items()):
-            torrent[1].cleanup_prev_status()
+    def on_client_disconnected(self, session_id):
+        """Forget the status diff state and subscription of a disconnected client session"""
+        self.status_snapshot.remove_session(session_id)
+        self.status_subscriptions.unsubscribe(session_id)
 
     def on_set_max_connections_per_torrent(self, key, value):
         """Sets the per-torrent connection limit"""
@@ -1163,6 +1392,7 @@ def on_alert_save_resume_data(self, alert):
         if torrent_id in self.torrents:
             # libtorrent add_torrent expects bencoded resume_data.
             self.resume_data[torrent_id] = lt.bencode(alert.resume_data)
+            self.resume_data_changed.add(torrent_id)
 
         if torrent_id in self.waiting_on_resume_data:
             self.waiting_on_resume_data[torrent_id].callback(None)
@@ -1225,7 +1455,7 @@ def on_alert_file_renamed(self, alert):
         else:
             # This is just a regular file rename so send the signal
             component.get('EventManager').emit(TorrentFileRenamedEvent(torrent_id, alert.index, new_name))
-            self.save_resume_data((torrent_id,))
+            self.queue_save((torrent_id,))
 
     def on_alert_metadata_received(self, alert):
         """Alert handler for libtorrent metadata_received_alert"""
@@ -1235,6 +1465,8 @@ def on_alert_metadata_received(self, alert):
         except (RuntimeError, KeyError):
             return
         torrent.on_metadata_received()
+        component.get('FilterManager').search_index.update(torrent.torrent_id)
+        component.get('EventManager').emit(TorrentsChangedEvent([torrent.torrent_id], METADATA_KEYS))
 
     def on_alert_file_error(self, alert):
         """Alert handler for libtorrent file_error_alert"""
@@ -1270,15 +1502,29 @@ def on_alert_state_update(self, alert):
         log.debug('on_status_notification: %s', decode_string(alert.message()))
         self.last_state_update_alert_ts = time.time()
 
+        updated_slots = []
+        tracker_changed = []
         for t_status in alert.status:
             try:
                 torrent_id = str(t_status.info_hash)
             except RuntimeError:
                 continue
             if torrent_id in self.torrents:
-                self.torrents[torrent_id].update_status(t_status)
-
-        self.handle_torrents_status_callback(self.torrents_status_requests.pop())
+                if self.torrents[torrent_id].update_status(t_status):
+                    tracker_changed.append(torrent_id)
+                updated_slots.append(self.status_snapshot.slots[torrent_id])
+
+        # Only the torrents in the alert need their status columns rebuilt.
+        self.status_snapshot.refresh(updated_slots)
+        # The current tracker can change without a tracker alert.
+        filtermanager = component.get('FilterManager')
+        for torrent_id in tracker_changed:
+            filtermanager.update_torrent(torrent_id, ['tracker_host'])
+        # Updates are also posted for the subscriptions so there may be no pending request,
+        # or several if their alerts were coalesced.
+        while self.torrents_status_requests:
+            self.handle_torrents_status_callback(self.torrents_status_requests.pop())
+        self.status_subscriptions.on_status_updated()
 
     def on_alert_external_ip(self, alert):
         """Alert handler for libtorrent external_ip_alert
@@ -1323,18 +1569,15 @@ def separate_keys(self, keys, torrent_ids):
 
     def handle_torrents_status_callback(self, status_request):
         """Build the status dictionary with torrent values"""
-        d, torrent_ids, keys, diff = status_request
-        status_dict = {}.fromkeys(torrent_ids)
+        d, torrent_ids, keys, session_id = status_request
         torrent_keys, plugin_keys = self.separate_keys(keys, torrent_ids)
+        if not keys and self.torrents:
+            # No keys requested means all the torrent status keys.
+            torrent_keys = list(next(iter(self.torrents.values())).status_funcs)
 
-        # Get the torrent status for each torrent_id
-        for torrent_id in torrent_ids:
-            if torrent_id not in self.torrents:
-                # The torrent_id does not exist in the dict.
-                # Could be the clients cache (sessionproxy) isn't up to speed.
-                del status_dict[torrent_id]
-            else:
-                status_dict[torrent_id] = self.torrents[torrent_id].get_status(torrent_keys, diff, all_keys=not keys)
+        # Slice the status from the snapshot columns, torrent_ids not in the session are
+        # skipped as the clients cache (sessionproxy) could be out of sync.
+        status_dict = self.status_snapshot.get_status(torrent_ids, torrent_keys, session_id)
         self.status_dict = status_dict
         d.callback((status_dict, plugin_keys))
 
@@ -1357,11 +1600,13 @@ def torrents_status_update(self, torrent_ids, keys, diff=False):
         """
         d = Deferred()
         now = time.time()
+        # The diff is tracked per session so store the session making the request.
+        session_id = component.get('RPCServer').get_session_id() if diff else None
         # If last update was recent, use cached data instead of request updates from libtorrent
         if (now - self.last_state_update_alert_ts) < 1.5:
-            reactor.callLater(0, self.handle_torrents_status_callback, (d, torrent_ids, keys, diff))
+            reactor.callLater(0, self.handle_torrents_status_callback, (d, torrent_ids, keys, session_id))
         else:
             # Ask libtorrent for status update
-            self.torrents_status_requests.insert(0, (d, torrent_ids, keys, diff))
+            self.torrents_status_requests.insert(0, (d, torrent_ids, keys, session_id))
             self.session.post_torrent_updates()
         return d
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Deluge and is licensed under GNU General Public License 3.0, or later, with
+# the additional special exception to link portions of this program with the OpenSSL library.
+# See LICENSE for more details.
+#
+
+"""Columnar torrent status storage used by TorrentManager.
+
+Attributes:
+    STATUS_KEYS (set): Status keys derived solely from the libtorrent torrent_status.
+    OPTION_KEYS (dict): Maps status keys to the TorrentOptions key holding the value.
+    ATTRIBUTE_KEYS (dict): Maps status keys to the Torrent attribute holding the value.
+
+"""
+
+import logging
+
+log = logging.getLogger(__name__)
+
+STATUS_KEYS = {
+    'active_time', 'all_time_download', 'completed_time', 'distributed_copies', 'download_payload_rate',
+    'finished_time', 'is_seed', 'last_seen_complete', 'next_announce', 'num_peers', 'num_seeds', 'paused',
+    'priority', 'queue', 'ratio', 'seed_mode', 'seed_rank', 'seeding_time', 'seeds_peers_ratio',
+    'storage_mode', 'super_seeding', 'time_added', 'time_since_download', 'time_since_upload', 'total_done',
+    'total_payload_download', 'total_payload_upload', 'total_peers', 'total_remaining', 'total_seeds',
+    'total_uploaded', 'total_wanted', 'tracker', 'upload_payload_rate',
+}
+
+OPTION_KEYS = {
+    'download_location': 'download_location',
+    'file_priorities': 'file_priorities',
+    'is_auto_managed': 'auto_managed',
+    'max_connections': 'max_connections',
+    'max_download_speed': 'max_download_speed',
+    'max_upload_slots': 'max_upload_slots',
+    'max_upload_speed': 'max_upload_speed',
+    'move_completed': 'move_completed',
+    'move_completed_path': 'move_completed_path',
+    'move_on_completed': 'move_completed',
+    'move_on_completed_path': 'move_completed_path',
+    'owner': 'owner',
+    'prioritize_first_last': 'prioritize_first_last_pieces',
+    'remove_at_ratio': 'remove_at_ratio',
+    'save_path': 'download_location',
+    'sequential_download': 'sequential_download',
+    'shared': 'shared',
+    'stop_at_ratio': 'stop_at_ratio',
+    'stop_ratio': 'stop_ratio',
+}
+
+ATTRIBUTE_KEYS = {
+    'hash': 'torrent_id',
+    'is_finished': 'is_finished',
+    'message': 'statusmsg',
+    'state': 'state',
+    'tracker_status': 'tracker_status',
+    'trackers': 'trackers',
+}
+
+def get_option_status_keys(options):
+    """Get the status keys holding the values of TorrentOptions keys.
+
+    Args:
+        options (iterable of str): The TorrentOptions keys.
+
+    Returns:
+        set of str: The status keys, an option not held by any `OPTION_KEYS` status key is kept as is.
+
+    """
+    status_keys = set()
+    for option in options:
+        keys = [key for key, key_option in OPTION_KEYS.items() if key_option == option]
+        status_keys.update(keys or [option])
+    return status_keys
+
+
+# Marks a column value that has to be computed before use.
+_STALE = object()
+
+
+class TorrentStatusSnapshot(object):
+    """A columnar snapshot of the status of all torrents in the session.
+
+    Each torrent is assigned a slot and every status key is stored as a column
+    (a list indexed by slot), so a status request is served by slicing the
+    requested columns instead of dispatching every key of every torrent.
+
+    Columns for `STATUS_KEYS` are only recomputed for torrents whose libtorrent
+    status was replaced since the column was built, i.e. the torrents listed in
+    the last state_update_alert. Option and attribute keys are cheap to read so
+    are refreshed directly on each request without a per-key function call.
+
+    Diffs are tracked with version numbers rather than copies of the previous
+    status: every request increments `version`, each column value records the
+    version it last changed at, and each session only remembers the version and
+    keys of the last status it was sent per torrent.
+
+    Attributes:
+        version (int): Incremented on every status request.
+        slots (dict): Maps torrent_id to slot index.
+        torrents (list): The Torrent object in each slot, None for a free slot.
+        statuses (list): The libtorrent status each slot's status columns were built from.
+        columns (dict): Maps status key to the list of values indexed by slot.
+        changed (dict): Maps status key to the list of versions the values last changed at.
+        stale (dict): Maps status key in `STATUS_KEYS` to the set of slots needing recomputing.
+        sessions (dict): Maps session_id to a tuple of lists, indexed by slot, of the version
+            and keys last sent to the session.
+        keysets (dict): Interned frozensets of requested keys.
+
+    """
+    def __init__(self):
+        self.version = 0
+        self.slots = {}
+        self.torrents = []
+        self.statuses = []
+        self.free_slots = []
+        self.columns = {}
+        self.changed = {}
+        self.stale = {}
+        self.sessions = {}
+        self.keysets = {}
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, torrent_id):
+        return torrent_id in self.slots
+
+    def add(self, torrent):
+        """Assign a slot to a torrent.
+
+        Args:
+            torrent (Torrent): The torrent to add.
+
+        Returns:
+            int: The slot index.
+
+        """
+        if torrent.torrent_id in self.slots:
+            return self.slots[torrent.torrent_id]
+
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.torrents[slot] = torrent
+            self.statuses[slot] = None
+            for sent_versions, sent_keys in self.sessions.values():
+                if slot < len(sent_keys):
+                    sent_keys[slot] = None
+        else:
+            slot = len(self.torrents)
+            self.torrents.append(torrent)
+            self.statuses.append(None)
+            for column in self.columns.values():
+                column.append(_STALE)
+            for versions in self.changed.values():
+                versions.append(0)
+
+        self.slots[torrent.torrent_id] = slot
+        return slot
+
+    def remove(self, torrent_id):
+        """Release the slot of a torrent.
+
+        Args:
+            torrent_id (str): The torrent_id to remove.
+
+        """
+        slot = self.slots.pop(torrent_id, None)
+        if slot is None:
+            return
+
+        self.torrents[slot] = None
+        self.statuses[slot] = None
+        for column in self.columns.values():
+            column[slot] = _STALE
+        for stale in self.stale.values():
+            stale.discard(slot)
+        self.free_slots.append(slot)
+
+    def remove_session(self, session_id):
+        """Forget the diff state of a session.
+
+        Args:
+            session_id (int): The session_id.
+
+        """
+        self.sessions.pop(session_id, None)
+
+    def reset_session_torrents(self, session_id, torrent_ids):
+        """Forget the status sent to a session for some torrents, the next diff includes all their keys.
+
+        Args:
+            session_id (int): The session_id.
+            torrent_ids (list of str): The torrent_ids, any not in the snapshot are skipped.
+
+        """
+        if session_id not in self.sessions:
+            return
+        sent_keys = self.sessions[session_id][1]
+        for slot in self.get_slots(torrent_ids)[1]:
+            if slot < len(sent_keys):
+                sent_keys[slot] = None
+
+    def clear(self):
+        """Remove all torrents, columns and sessions"""
+        self.__init__()
+
+    def get_slots(self, torrent_ids):
+        """Get the slots for torrent_ids, skipping any that are not in the snapshot.
+
+        Args:
+            torrent_ids (list of str): The torrent_ids.
+
+        Returns:
+            tuple: A list of the valid torrent_ids and a list of their slots.
+
+        """
+        slots = self.slots
+        valid_ids = [torrent_id for torrent_id in torrent_ids if torrent_id in slots]
+        return valid_ids, [slots[torrent_id] for torrent_id in valid_ids]
+
+    def refresh(self, slots):
+        """Mark the status columns stale for slots with an updated libtorrent status.
+
+        Args:
+            slots (list of int): The slots to check.
+
+        Returns:
+            list of int: The slots that were marked stale.
+
+        """
+        torrents = self.torrents
+        statuses = self.statuses
+
+        stale = []
+        for slot in slots:
+            status = torrents[slot].status
+            if status is not statuses[slot]:
+                statuses[slot] = status
+                stale.append(slot)
+
+        if stale:
+            for stale_slots in self.stale.values():
+                stale_slots.update(stale)
+        return stale
+
+    def get_column(self, key, slots):
+        """Get the up-to-date column of values for a status key.
+
+        Values that differ from those previously stored have their changed
+        version set to the current version.
+
+        Args:
+            key (str): The status key.
+            slots (list of int): The slots that must be valid in the column.
+
+        Returns:
+            list: The column values indexed by slot.
+
+        """
+        column = self.columns.get(key)
+        if column is None:
+            column = self.columns[key] = [_STALE] * len(self.torrents)
+            self.changed[key] = [0] * len(self.torrents)
+            if key in STATUS_KEYS:
+                self.stale[key] = set()
+        changed = self.changed[key]
+        version = self.version
+        torrents = self.torrents
+
+        if key in OPTION_KEYS:
+            option = OPTION_KEYS[key]
+            values = [torrents[slot].options[option] for slot in slots]
+        elif key in ATTRIBUTE_KEYS:
+            attr = ATTRIBUTE_KEYS[key]
+            values = [getattr(torrents[slot], attr) for slot in slots]
+        elif key in STATUS_KEYS:
+            stale = self.stale[key]
+            slots = [slot for slot in slots if slot in stale or column[slot] is _STALE]
+            stale.difference_update(slots)
+            values = [torrents[slot].status_funcs[key]() for slot in slots]
+        else:
+            values = [torrents[slot].status_funcs[key]() for slot in slots]
+
+        for slot, value in zip(slots, values):
+            if column[slot] is _STALE or value != column[slot]:
+                column[slot] = value
+                changed[slot] = version
+        return column
+
+    def get_columns(self, torrent_ids, keys):
+        """Get the up-to-date columns for keys.
+
+        Args:
+            torrent_ids (list of str): The torrent_ids, any not in the snapshot are skipped.
+            keys (list of str): The status keys.
+
+        Returns:
+            tuple: The valid torrent_ids, their slots and a column for each key.
+
+        """
+        self.version += 1
+        torrent_ids, slots = self.get_slots(torrent_ids)
+        self.refresh(slots)
+        return torrent_ids, slots, [self.get_column(key, slots) for key in keys]
+
+    def get_status(self, torrent_ids, keys, session_id=None):
+        """Returns the status of the torrents, sliced from the columns for keys.
+
+        Args:
+            torrent_ids (list of str): The torrent_ids, any not in the snapshot are skipped.
+            keys (list of str): The status keys.
+            session_id (int, optional): If set, only return the keys that changed since
+                the last status sent to this session.
+
+        Returns:
+            dict: A status dict for each torrent, {torrent_id: {key: value, ...}, ...}.
+
+            With a session_id, torrents without changes map to an empty dict.
+
+        """
+        torrent_ids, slots, columns = self.get_columns(torrent_ids, keys)
+
+        status_dict = {}
+        if session_id is None:
+            for torrent_id, slot in zip(torrent_ids, slots):
+                status_dict[torrent_id] = dict(zip(keys, [column[slot] for column in columns]))
+            return status_dict
+
+        sent_versions, sent_keys = self.sessions.setdefault(session_id, ([], []))
+        missing = len(self.torrents) - len(sent_keys)
+        if missing > 0:
+            sent_versions.extend([0] * missing)
+            sent_keys.extend([None] * missing)
+
+        # Interned so sessions requesting the same keys share one set object.
+        keys_set = frozenset(keys)
+        keys_set = self.keysets.setdefault(keys_set, keys_set)
+        changed = [self.changed[key] for key in keys]
+        items = list(zip(keys, columns, changed))
+        for torrent_id, slot in zip(torrent_ids, slots):
+            prev_keys = sent_keys[slot]
+            if prev_keys is keys_set:
+                last_version = sent_versions[slot]
+                status_dict[torrent_id] = dict(
+                    (key, column[slot]) for key, column, versions in items if versions[slot] > last_version)
+            elif prev_keys is None:
+                status_dict[torrent_id] = dict(zip(keys, [column[slot] for column in columns]))
+            else:
+                last_version = sent_versions[slot]
+                status_dict[torrent_id] = dict(
+                    (key, column[slot]) for key, column, versions in items
+                    if key not in prev_keys or versions[slot] > last_version)
+            sent_versions[slot] = self.version
+            sent_keys[slot] = keys_set
+        return status_dict
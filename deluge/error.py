@@ -41,6 +41,10 @@ class InvalidPathError(DelugeError):
     pass
 
 
+class InvalidParameterError(DelugeError):
+    pass
+
+
 class WrappedException(DelugeError):
 
     def __init__(self, message, exception_type, traceback):
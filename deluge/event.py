@@ -235,6 +235,48 @@ class SessionStartedEvent(DelugeEvent):
     pass
 
 
+class SessionLoadingProgressEvent(DelugeEvent):
+    """
+    Emitted while the torrents of the session are being loaded at startup.
+    """
+    def __init__(self, loaded, total):
+        """
+        Args:
+            loaded (int): The number of torrents loaded so far.
+            total (int): The number of torrents to load.
+        """
+        self._args = [loaded, total]
+
+
+class TorrentsStatusUpdateEvent(DelugeEvent):
+    """
+    Emitted to a session subscribed with core.subscribe_torrents_status when
+    the status of its torrents changed.
+    """
+    def __init__(self, status, removed):
+        """
+        Args:
+            status (dict): The changed status keys of the torrents, {torrent_id: {key: value}}.
+            removed (list): The torrent_ids that no longer match the subscription filter.
+        """
+        self._args = [status, removed]
+
+
+class TorrentsChangedEvent(DelugeEvent):
+    """
+    Emitted once when the options or trackers of many torrents were changed
+    by one of the bulk core methods, and when the name or metadata of a
+    torrent changed.
+    """
+    def __init__(self, torrent_ids, keys):
+        """
+        Args:
+            torrent_ids (list): The torrent_ids of the changed torrents.
+            keys (list): The status keys that may have changed.
+        """
+        self._args = [torrent_ids, keys]
+
+
 class SessionPausedEvent(DelugeEvent):
     """
     Emitted when the session has been paused.
@@ -93,7 +93,7 @@ def enable(self):
         component.get('EventManager').register_event_handler('TorrentRemovedEvent', self.post_torrent_remove)
 
         # register tree:
-        component.get('FilterManager').register_tree_field('label', self.init_filter_dict)
+        component.get('FilterManager').register_tree_field('label', self.init_filter_dict, indexed=True)
 
         log.debug('Label plugin enabled..')
 
@@ -182,6 +182,7 @@ def remove(self, label_id):
         del self.labels[label_id]
         self.clean_config()
         self.config.save()
+        component.get('FilterManager').rebuild_index('label')
 
     def _set_torrent_options(self, torrent_id, label_id):
         options = self.labels[label_id]
@@ -305,6 +306,7 @@ def set_torrent(self, torrent_id, label_id):
             self._set_torrent_options(torrent_id, label_id)
 
         self.config.save()
+        component.get('FilterManager').update_torrent(torrent_id, ['label'])
 
     @export
     def get_config(self):
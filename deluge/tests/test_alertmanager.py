@@ -6,6 +6,7 @@
 #
 
 import deluge.component as component
+from deluge.core.alertmanager import ALERT_POLL_MAX_INTERVAL
 from deluge.core.core import Core
 
 from .basetest import BaseTestCase
@@ -35,3 +36,18 @@ def handler(alert):
         self.am.register_handler('dummy_alert', handler)
         self.am.deregister_handler(handler)
         self.assertEqual(self.am.handlers['dummy_alert'], [])
+
+    def test_adjust_poll_interval(self):
+        timer = self.am._component_timer
+        self.am.alert_notify = False
+        timer.interval = 0.4
+        self.am.adjust_poll_interval(5)
+        self.assertEqual(timer.interval, 0.2)
+        self.am.adjust_poll_interval(0)
+        self.am.adjust_poll_interval(0)
+        self.am.adjust_poll_interval(0)
+        self.assertEqual(timer.interval, ALERT_POLL_MAX_INTERVAL)
+
+        self.am.alert_notify = True
+        self.am.adjust_poll_interval(5)
+        self.assertEqual(timer.interval, ALERT_POLL_MAX_INTERVAL)
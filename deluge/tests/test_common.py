@@ -3,7 +3,7 @@
 from .twisted.trial import unittest
 
 from deluge.common import (VersionSplit, fdate, fpcnt, fpeer, fsize, fspeed, ftime, get_path_size, is_infohash, is_ip,
-                           is_magnet, is_url)
+                           is_magnet, is_url, merge_response_part)
 from deluge.ui.util import lang
 
 
@@ -108,3 +108,9 @@ def test_parse_human_size(self):
         for human_size, byte_size in sizes:
             parsed = parse_human_size(human_size)
             self.assertEqual(parsed, byte_size, "Mismatch when converting '%s'" % human_size)
+
+    def test_merge_response_part(self):
+        result = merge_response_part(None, {'id0': 0})
+        self.assertEqual(merge_response_part(result, {'id1': 1}), {'id0': 0, 'id1': 1})
+        result = merge_response_part(None, (1, 2))
+        self.assertEqual(merge_response_part(result, [3]), [1, 2, 3])
@@ -3,6 +3,7 @@
 from hashlib import sha1 as sha
 
 import pytest
+from mock import MagicMock
 from .twisted.internet import defer, reactor
 from .twisted.internet.error import CannotListenError
 from .twisted.python.failure import Failure
@@ -16,7 +17,7 @@
 import deluge.core.torrent
 from deluge.core.core import Core
 from deluge.core.rpcserver import RPCServer
-from deluge.error import AddTorrentError, InvalidTorrentError
+from deluge.error import AddTorrentError, InvalidParameterError, InvalidTorrentError
 from deluge.ui.web.common import compress
 
 from . import common
@@ -130,6 +131,51 @@ def test_add_torrent_files_error_duplicate(self):
         self.assertEqual(len(errors), 1)
         self.assertTrue(str(errors[0]).startswith('Torrent already in session'))
 
+    @defer.inlineCallbacks
+    def test_add_torrents_bulk(self):
+        options = {}
+        filename = common.get_test_data_file('test.torrent')
+        with open(filename) as _file:
+            filedump = base64.encodestring(_file.read())
+        info_hash = '60d5d82328b4547511fdeac9bf4d0112daa0ce00'
+        torrents = [(filename, filedump, options),
+                    (deluge.common.create_magnet_uri(info_hash), None, options),
+                    (filename, filedump, options),
+                    ('not a torrent', None, options)]
+        results = yield self.core.add_torrents_bulk(torrents)
+        self.assertEqual([success for success, dummy_result in results], [True, True, False, False])
+        self.assertEqual(results[1][1], info_hash)
+        self.assertTrue(results[2][1].startswith('Torrent already'))
+        self.assertEqual(len(self.core.get_session_state()), 2)
+
+    @defer.inlineCallbacks
+    def test_add_torrents_bulk_failed_add_alert(self):
+        torrentmanager = self.core.torrentmanager
+        torrentmanager.config['add_torrents_bulk_max_in_flight'] = 1
+        async_add_torrent = torrentmanager.session.async_add_torrent
+        bad_magnet = deluge.common.create_magnet_uri('60d5d82328b4547511fdeac9bf4d0112daa0ce00')
+
+        def fail_async_add_torrent(add_torrent_params):
+            if add_torrent_params.get('url') != bad_magnet:
+                return async_add_torrent(add_torrent_params)
+            alert = MagicMock()
+            alert.error.value.return_value = 1
+            alert.error.message.return_value = 'bad torrent'
+            alert.params.ti = None
+            alert.params.url = add_torrent_params['url']
+            reactor.callLater(0, torrentmanager.on_add_torrent_alert, alert)
+        self.patch(torrentmanager.session, 'async_add_torrent', fail_async_add_torrent)
+
+        filename = common.get_test_data_file('test.torrent')
+        with open(filename) as _file:
+            filedump = base64.encodestring(_file.read())
+        torrents = [(bad_magnet, None, {}),
+                    (filename, filedump, {})]
+        results = yield self.core.add_torrents_bulk(torrents)
+        self.assertEqual([success for success, dummy_result in results], [False, True])
+        self.assertTrue(results[0][1].endswith('bad torrent'))
+        self.assertFalse(torrentmanager.torrents_loading)
+
     @defer.inlineCallbacks
     def test_add_torrent_file(self):
         options = {}
@@ -247,6 +293,48 @@ def test_remove_torrents_invalid(self):
         self.assertEqual(val[0], ('invalidid1', "torrent_id 'invalidid1' not in session."))
         self.assertEqual(val[1], ('invalidid2', "torrent_id 'invalidid2' not in session."))
 
+    @defer.inlineCallbacks
+    def test_set_torrents_options(self):
+        filename = common.get_test_data_file('test.torrent')
+        with open(filename) as _file:
+            filedump = base64.encodestring(_file.read())
+        torrent_id = yield self.core.add_torrent_file(filename, filedump, {})
+        errors = self.core.set_torrents_options({torrent_id: {'max_connections': 50, 'stop_ratio': 1.5},
+                                                 'invalidid': {'max_connections': 10}})
+        self.assertEqual(errors, [('invalidid', "torrent_id 'invalidid' not in session.")])
+        options = self.core.torrentmanager[torrent_id].options
+        self.assertEqual(options['max_connections'], 50)
+        self.assertEqual(options['stop_ratio'], 1.5)
+        self.assertEqual(self.core.torrentmanager.queued_save_torrent_ids, set([torrent_id]))
+
+        yield self.core.torrentmanager.save_queued()
+        self.assertFalse(self.core.torrentmanager.queued_save_torrent_ids)
+
+    @defer.inlineCallbacks
+    def test_set_torrents_options_error(self):
+        torrent_ids = []
+        for name in ('test.torrent', 'test_torrent.file.torrent'):
+            filename = common.get_test_data_file(name)
+            with open(filename) as _file:
+                filedump = base64.encodestring(_file.read())
+            torrent_id = yield self.core.add_torrent_file(filename, filedump, {})
+            torrent_ids.append(torrent_id)
+
+        def set_options(options):
+            raise ValueError('bad option')
+        self.patch(self.core.torrentmanager[torrent_ids[0]], 'set_options', set_options)
+
+        errors = self.core.set_torrents_options(dict((torrent_id, {'max_connections': 50})
+                                                     for torrent_id in torrent_ids))
+        self.assertEqual(errors, [(torrent_ids[0], 'Unable to change torrent: bad option')])
+        self.assertEqual(self.core.torrentmanager[torrent_ids[1]].options['max_connections'], 50)
+        self.assertEqual(self.core.torrentmanager.queued_save_torrent_ids, set([torrent_ids[1]]))
+
+    def test_get_torrents_status_parts_invalid_part_size(self):
+        for part_size in (0, -1):
+            parts = self.core.get_torrents_status_parts({}, ['name'], part_size)
+            self.assertRaises(InvalidParameterError, next, parts)
+
     def test_get_session_status(self):
         status = self.core.get_session_status(['upload_rate', 'download_rate'])
         self.assertEqual(type(status), dict)
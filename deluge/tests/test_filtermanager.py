@@ -0,0 +1,184 @@
+import deluge.component as component
+from deluge.core.authmanager import AUTH_LEVEL_ADMIN
+from deluge.core.eventmanager import EventManager
+from deluge.core.filtermanager import FilterManager
+from deluge.core.torrentstatus import TorrentStatusSnapshot
+
+from .basetest import BaseTestCase
+
+
+class FakeStatus(object):
+    def __init__(self, download_payload_rate=0, upload_payload_rate=0):
+        self.download_payload_rate = download_payload_rate
+        self.upload_payload_rate = upload_payload_rate
+
+
+class FakeTorrent(object):
+    def __init__(self, torrent_id, state='Paused', owner='localclient', tracker_host='example.com',
+                 files=None):
+        self.torrent_id = torrent_id
+        self.state = state
+        self.tracker_host = tracker_host
+        self.tracker_status = ''
+        self.filename = torrent_id + '.torrent'
+        self.trackers = [{'url': 'http://%s/announce' % tracker_host}]
+        self.files = files or []
+        self.status = FakeStatus()
+        self.options = {'owner': owner}
+        self.status_funcs = {
+            'state': lambda: self.state,
+            'owner': lambda: self.options['owner'],
+            'tracker_host': lambda: self.tracker_host,
+            'download_payload_rate': lambda: self.status.download_payload_rate,
+            'upload_payload_rate': lambda: self.status.upload_payload_rate,
+        }
+
+    def get_status(self, keys):
+        return dict((key, self.status_funcs[key]()) for key in keys)
+
+    def get_name(self):
+        return 'Name of ' + self.torrent_id
+
+    def get_files(self):
+        return [{'path': path} for path in self.files]
+
+
+class FakeTorrentManager(component.Component):
+    def __init__(self):
+        component.Component.__init__(self, 'TorrentManager')
+        self.torrents = {}
+        self.status_snapshot = TorrentStatusSnapshot()
+
+    def __getitem__(self, torrent_id):
+        return self.torrents[torrent_id]
+
+    def add(self, torrent):
+        self.torrents[torrent.torrent_id] = torrent
+        self.status_snapshot.add(torrent)
+
+    def get_torrent_list(self, user=None, auth_level=None):
+        # Like TorrentManager, defaults to the session of the current RPC if there is an RPCServer.
+        if auth_level is None:
+            try:
+                rpcserver = component.get('RPCServer')
+            except KeyError:
+                return list(self.torrents)
+            auth_level = rpcserver.get_session_auth_level()
+            user = rpcserver.get_session_user() if user is None else user
+        if auth_level == AUTH_LEVEL_ADMIN:
+            return list(self.torrents)
+        return [torrent_id for torrent_id, torrent in self.torrents.items() if torrent.options['owner'] == user]
+
+    def separate_keys(self, keys, torrent_ids):
+        torrent_keys = [key for key in keys if key in FakeTorrent('').status_funcs]
+        return torrent_keys, [key for key in keys if key not in torrent_keys]
+
+
+class FakeCore(object):
+    def __init__(self):
+        self.torrentmanager = FakeTorrentManager()
+        self.labels = {}
+
+    def create_torrent_status(self, torrent_id, torrent_keys, plugin_keys):
+        status = self.torrentmanager[torrent_id].get_status(torrent_keys)
+        if 'label' in plugin_keys:
+            status['label'] = self.labels.get(torrent_id, '')
+        return status
+
+
+class FilterManagerTestCase(BaseTestCase):
+
+    def set_up(self):
+        self.eventmanager = EventManager()
+        self.core = FakeCore()
+        self.fm = FilterManager(self.core)
+        self.add_torrent(FakeTorrent('id0', state='Downloading'))
+        self.add_torrent(FakeTorrent('id1', owner='user1'))
+        self.add_torrent(FakeTorrent('id2', tracker_host='other.org', files=['Dir/Readme.txt', 'Dir/Song.mp3']))
+
+    def tear_down(self):
+        return component.shutdown()
+
+    def add_torrent(self, torrent):
+        self.core.torrentmanager.add(torrent)
+        self.fm.on_torrent_added(torrent.torrent_id, False)
+
+    def filter(self, filter_dict):
+        return sorted(self.fm.filter_torrent_ids(filter_dict))
+
+    def test_filter_indexed_fields(self):
+        self.assertEqual(self.filter({'state': 'Paused'}), ['id1', 'id2'])
+        self.assertEqual(self.filter({'state': ['Paused', 'Downloading']}), ['id0', 'id1', 'id2'])
+        self.assertEqual(self.filter({'state': 'Paused', 'owner': 'localclient'}), ['id2'])
+        self.assertEqual(self.filter({'tracker_host': 'other.org', 'id': ['id0', 'id2']}), ['id2'])
+        self.assertEqual(self.filter({'owner': 'unknown'}), [])
+
+    def test_filter_state_active(self):
+        self.core.torrentmanager['id1'].status = FakeStatus(upload_payload_rate=10)
+        self.assertEqual(self.filter({'state': 'Active'}), ['id1'])
+        self.assertEqual(self.filter({'state': ['Active', 'Downloading']}), [])
+
+    def test_state_changed(self):
+        self.core.torrentmanager['id1'].state = 'Seeding'
+        self.fm.on_torrent_state_changed('id1', 'Seeding')
+        self.assertEqual(self.filter({'state': 'Seeding'}), ['id1'])
+        self.assertEqual(self.filter({'state': 'Paused'}), ['id2'])
+
+    def test_state_changed_stale_event(self):
+        self.core.torrentmanager['id1'].state = 'Checking'
+        self.fm.on_torrent_state_changed('id1', 'Downloading')
+        self.assertEqual(self.filter({'state': 'Checking'}), ['id1'])
+        self.assertEqual(self.filter({'state': 'Downloading'}), ['id0'])
+
+    def test_torrent_removed(self):
+        del self.core.torrentmanager.torrents['id2']
+        self.fm.on_torrent_removed('id2')
+        self.assertEqual(self.filter({'tracker_host': 'other.org'}), [])
+        self.assertFalse('other.org' in self.fm.indexes['tracker_host'])
+
+    def test_tracker_error(self):
+        self.core.torrentmanager['id0'].tracker_status = 'Error: timed out'
+        self.fm.on_torrent_tracker_status('id0', 'Error: timed out')
+        self.assertEqual(self.filter({'tracker_host': 'Error'}), ['id0'])
+
+        tree = dict(self.fm.get_filter_tree(hide_cat=['state', 'owner'])['tracker_host'])
+        self.assertEqual(tree, {'All': 3, 'Error': 1, 'example.com': 2, 'other.org': 1})
+
+    def test_filter_tree_counts(self):
+        tree = self.fm.get_filter_tree()
+        self.assertEqual(tree['owner'], [('', 0), ('localclient', 2), ('user1', 1)])
+        self.assertEqual(tree['state'][:4], [('All', 3), ('Active', 0), ('Allocating', 0), ('Checking', 0)])
+        self.assertEqual(dict(tree['state'])['Downloading'], 1)
+        self.assertEqual(dict(tree['state'])['Paused'], 2)
+
+    def test_plugin_field(self):
+        self.core.labels['id1'] = 'linux'
+        self.fm.register_tree_field('label', lambda: {'All': 3}, indexed=True)
+        self.assertEqual(self.filter({'label': 'linux'}), ['id1'])
+
+        self.core.labels['id2'] = 'linux'
+        self.fm.update_torrent('id2', ['label'])
+        self.assertEqual(self.filter({'label': 'linux'}), ['id1', 'id2'])
+        self.assertEqual(dict(self.fm.get_filter_tree()['label']), {'All': 3, '': 1, 'linux': 2})
+
+        self.fm.deregister_tree_field('label')
+        self.assertFalse('label' in self.fm.indexes)
+        self.assertEqual(self.filter({'label': 'linux'}), ['id1', 'id2'])
+
+    def test_filter_keyword(self):
+        self.assertEqual(self.filter({'keyword': 'song'}), ['id2'])
+        self.assertEqual(self.filter({'keyword': 'OTHER'}), ['id2'])
+        self.assertEqual(self.filter({'keyword': 'down'}), ['id0'])
+        self.assertEqual(self.filter({'keyword': 'id1.torrent'}), ['id1'])
+        self.assertEqual(self.filter({'keyword': 'readme,mp3'}), ['id2'])
+        self.assertEqual(self.filter({'keyword': 'readme,id1'}), [])
+
+    def test_filter_keyword_renamed_file(self):
+        self.core.torrentmanager['id1'].files = ['Video.mkv']
+        self.fm.on_torrent_file_renamed('id1', 0, 'Video.mkv')
+        self.assertEqual(self.filter({'keyword': 'video'}), ['id1'])
+
+    def test_filter_name(self):
+        self.assertEqual(self.filter({'name': 'name of id'}), ['id0', 'id1', 'id2'])
+        self.assertEqual(self.filter({'name': 'Name of id1::match'}), ['id1'])
+        self.assertEqual(self.filter({'name': 'name of id1::match'}), [])
@@ -8,9 +8,11 @@
 #
 
 import json as json_lib
+import zlib
 
 from mock import MagicMock
 from .twisted.internet import defer
+from .twisted.internet.task import Clock
 from .twisted.web import server
 from .twisted.web.http import Request
 
@@ -21,7 +23,8 @@
 from deluge.error import DelugeError
 from deluge.ui.client import client
 from deluge.ui.web.auth import Auth
-from deluge.ui.web.json_api import JSON, JSONException
+from deluge.ui.web.json_api import (JSON, MAX_QUEUED_EVENTS, STREAM_CHUNK_SIZE, EventQueue, JSONException,
+                                   JSONResponseProducer, get_json_dumps, iter_json, pack_torrents)
 
 from . import common
 from .basetest import BaseTestCase
@@ -114,6 +117,67 @@ def test_handle_request_invalid_json_request(self):
         self.assertRaises(JSONException, json._handle_request, request)
 
 
+class JSONEncodingTestCase(BaseTestCase):
+
+    def test_iter_json(self):
+        for obj in [{}, [], {'a': {'b': [1, (2, 3)], 'c': {}}, 1: None, True: 'd'}, 'e', [[[[{'f': 1.5}]]]]]:
+            self.assertEqual(''.join(iter_json(obj)), json_lib.dumps(obj))
+            self.assertEqual(json_lib.loads(''.join(iter_json(obj, get_json_dumps('orjson')))),
+                             json_lib.loads(json_lib.dumps(obj)))
+
+    def test_send_response_streamed(self):
+        json = JSON()
+        request = MagicMock()
+        request._disconnected = False
+        written = []
+        request.write = written.append
+
+        def register_producer(producer, streaming):
+            while producer.chunks is not None:
+                producer.resumeProducing()
+        request.registerProducer = register_producer
+
+        torrents = dict(('%040x' % index, {'name': 'Torrent %d' % index}) for index in range(5000))
+        response = {'result': {'torrents': torrents}, 'error': None, 'id': 1}
+        self.assertEqual(json._send_response(request, response), server.NOT_DONE_YET)
+        self.assertTrue(len(written) > 2)
+        self.assertTrue(all(written))
+        self.assertEqual(json_lib.loads(zlib.decompress(b''.join(written), zlib.MAX_WBITS + 16)), response)
+        request.setHeader.assert_any_call('content-encoding', 'gzip')
+        request.finish.assert_called_once_with()
+        self.assertTrue(len(json_lib.dumps(response)) > 2 * STREAM_CHUNK_SIZE)
+
+    def test_response_producer_error(self):
+        request = MagicMock()
+
+        def chunks():
+            yield ' ' * STREAM_CHUNK_SIZE
+            raise TypeError('not JSON serializable')
+        producer = JSONResponseProducer(request, chunks())
+        producer.start()
+        producer.resumeProducing()
+        self.assertEqual(request.write.call_count, 1)
+        producer.resumeProducing()
+        request.unregisterProducer.assert_called_once_with()
+        request.loseConnection.assert_called_once_with()
+        self.assertFalse(request.finish.called)
+        self.assertTrue(producer.chunks is None)
+
+    def test_pack_torrents(self):
+        torrents = {'a': {'name': 'A', 'state': 'Seeding'}, 'b': {'name': 'B'}}
+        packed = pack_torrents(torrents, ['state', 'name'])
+        self.assertEqual(packed['keys'], ['state', 'name'])
+        self.assertEqual(sorted(zip(packed['ids'], packed['rows'])), [('a', ['Seeding', 'A']), ('b', [None, 'B'])])
+        self.assertEqual(packed['updates'], [])
+        self.assertEqual(pack_torrents(torrents, [])['keys'], ['name', 'state'])
+
+        packed = pack_torrents({'a': {'state': 'Paused'}, 'c': {'name': 'C', 'state': 'Queued'}},
+                               ['state', 'name'], torrents)
+        self.assertEqual(packed['ids'], ['c'])
+        self.assertEqual(packed['rows'], [['Queued', 'C']])
+        self.assertEqual(packed['updates'], [['a', 0, 'Paused']])
+
+
 class JSONCustomUserTestCase(JSONBase):
 
     def set_up(self):
@@ -259,3 +323,84 @@ def on_success(arg):
             return True
         d.addCallbacks(on_success, self.fail)
         yield d
+
+
+class EventQueueTestCase(BaseTestCase):
+
+    def set_up(self):
+        self.clock = Clock()
+        self.patch(deluge.ui.web.json_api, 'reactor', self.clock)
+        self.handlers = {}
+        self.patch(client, 'register_event_handler', self.handlers.__setitem__)
+        self.patch(client, 'deregister_event_handler', lambda event, handler: None)
+        self.event_queue = EventQueue()
+        self.event_queue._EventQueue__keepalive.clock = self.clock
+
+    def test_get_events_delivered_on_arrival(self):
+        self.event_queue.add_listener('session', 'TorrentAddedEvent')
+        d = self.event_queue.get_events('session')
+        self.assertFalse(d.called)
+        self.handlers['TorrentAddedEvent']('torrent_id', False)
+        self.clock.advance(0)
+        self.assertEqual(self.successResultOf(d), [('TorrentAddedEvent', ('torrent_id', False))])
+        self.assertFalse(self.clock.getDelayedCalls())
+
+    def test_get_events_timeout(self):
+        d = self.event_queue.get_events('session')
+        self.clock.advance(deluge.ui.web.json_api.EVENTS_TIMEOUT)
+        self.assertEqual(self.successResultOf(d), None)
+
+    def test_coalesce_and_merge_events(self):
+        for event in ['TorrentStateChangedEvent', 'TorrentsStatusUpdateEvent']:
+            self.event_queue.add_listener('session', event)
+        self.handlers['TorrentStateChangedEvent']('a', 'Paused')
+        self.handlers['TorrentStateChangedEvent']('b', 'Paused')
+        self.handlers['TorrentsStatusUpdateEvent']({'a': {'state': 'Paused'}, 'c': {'name': 'C'}}, ['d'])
+        self.handlers['TorrentStateChangedEvent']('a', 'Seeding')
+        self.handlers['TorrentsStatusUpdateEvent']({'a': {'state': 'Seeding'}, 'd': {'name': 'D'}}, ['c'])
+        self.assertEqual(self.event_queue.get_events('session'), [
+            ('TorrentStateChangedEvent', ('b', 'Paused')),
+            ('TorrentStateChangedEvent', ('a', 'Seeding')),
+            ('TorrentsStatusUpdateEvent', ({'a': {'state': 'Seeding'}, 'd': {'name': 'D'}}, ['c'])),
+        ])
+
+    def test_idle_listener_removed(self):
+        timeout = deluge.ui.web.json_api.EVENTS_TIMEOUT
+        self.event_queue.add_listener('session', 'TorrentAddedEvent')
+        self.event_queue.add_listener('session', 'TorrentRemovedEvent')
+        self.assertFalse(self.event_queue.is_idle('session', timeout))
+        d = self.event_queue.get_events('session')
+        self.clock.advance(timeout)
+        self.assertEqual(self.successResultOf(d), None)
+        self.assertFalse(self.event_queue.is_idle('session', timeout))
+        self.clock.advance(timeout)
+        self.assertTrue(self.event_queue.is_idle('session', timeout))
+
+        self.handlers['TorrentAddedEvent']('a', False)
+        self.event_queue.remove_listeners('session')
+        self.assertEqual(self.event_queue.get_events('session').called, False)
+        self.assertFalse(self.event_queue._EventQueue__events)
+
+    def test_queue_bounded(self):
+        self.event_queue.add_listener('session', 'TorrentAddedEvent')
+        for index in range(MAX_QUEUED_EVENTS + 10):
+            self.handlers['TorrentAddedEvent'](index, False)
+        events = self.event_queue.get_events('session')
+        self.assertEqual(len(events), MAX_QUEUED_EVENTS)
+        self.assertEqual(events[0], ('TorrentAddedEvent', (10, False)))
+
+    def test_stream(self):
+        request = MagicMock()
+        self.event_queue.add_listener('session', 'TorrentRemovedEvent')
+        self.event_queue.add_stream('session', request)
+        self.handlers['TorrentRemovedEvent']('a')
+        self.handlers['TorrentRemovedEvent']('b')
+        self.clock.advance(0)
+        request.write.assert_called_once_with(
+            b'data: [["TorrentRemovedEvent", ["a"]], ["TorrentRemovedEvent", ["b"]]]\n\n')
+
+        self.clock.advance(deluge.ui.web.json_api.STREAM_KEEPALIVE_INTERVAL)
+        request.write.assert_called_with(b': keepalive\n\n')
+        self.event_queue.remove_stream('session', request)
+        self.handlers['TorrentRemovedEvent']('c')
+        self.assertFalse(self.clock.getDelayedCalls())
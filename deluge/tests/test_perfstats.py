@@ -0,0 +1,49 @@
+from .twisted.trial import unittest
+
+from deluge.core.perfstats import LatencyStats, PerfStats, get_handler_name
+
+
+class FakeHandlers(object):
+    def on_alert(self, alert):
+        pass
+
+
+class PerfStatsTestCase(unittest.TestCase):
+
+    def test_latency_buckets(self):
+        stats = LatencyStats()
+        for latency in [0.00005, 0.0005, 0.0005, 0.5, 5]:
+            stats.add(latency)
+        result = stats.to_dict()
+        self.assertEqual(result['count'], 5)
+        self.assertEqual(result['max'], 5)
+        self.assertEqual(result['buckets'], [1, 2, 0, 0, 1, 1])
+
+    def test_handler_name(self):
+        self.assertEqual(get_handler_name(FakeHandlers().on_alert), 'FakeHandlers.on_alert')
+        self.assertEqual(get_handler_name(get_handler_name), 'get_handler_name')
+
+    def test_alerts(self):
+        perf_stats = PerfStats()
+        perf_stats.add_alerts(['state_changed_alert', 'stats_alert', 'stats_alert'])
+        perf_stats.add_alerts(['stats_alert'])
+        stats = perf_stats.get_stats()
+        self.assertEqual(stats['alert_pops'], 2)
+        self.assertEqual(stats['alert_queue_high_water'], 3)
+        self.assertEqual(stats['alert_counts'], {'state_changed_alert': 1, 'stats_alert': 3})
+
+    def test_handler_calls_and_reset(self):
+        perf_stats = PerfStats()
+        handler = FakeHandlers().on_alert
+        perf_stats.add_handler_call(handler, 10.0, 10.5, 10.75)
+        perf_stats.add_handler_call(handler, 11.0, 11.0, 11.25)
+        stats = perf_stats.get_stats()
+        handler_stats = stats['handlers']['FakeHandlers.on_alert']
+        self.assertEqual(handler_stats['count'], 2)
+        self.assertEqual(handler_stats['avg'], 0.25)
+        self.assertEqual(stats['reactor_lag']['max'], 0.5)
+
+        perf_stats.reset()
+        stats = perf_stats.get_stats()
+        self.assertEqual(stats['handlers'], {})
+        self.assertEqual(stats['alert_pops'], 0)
@@ -0,0 +1,105 @@
+from .twisted.trial import unittest
+
+import deluge.rencode
+import deluge.transfer
+from deluge.transfer import c_rencode, select_rencode
+
+
+def create_torrents_status(count):
+    return dict(('%040x' % index, {
+        'name': 'Torrent name %d' % index,
+        'state': 'Downloading',
+        'progress': 42.5,
+        'download_payload_rate': index * 1024,
+        'total_size': index * 2 ** 30,
+        'eta': -1,
+        'is_auto_managed': True,
+        'tracker_host': 'tracker.org',
+        'label': None,
+    }) for index in range(count))
+
+
+# Values covering each type code of the wire format, floats are exact in 32 bits.
+CORPUS = [
+    0, 43, 44, -1, -32, -33, 127, -128, 128, 32767, -32768, 32768, 2 ** 31, -2 ** 31 - 1, 2 ** 63 - 1, 2 ** 64,
+    -2 ** 64, 0.5, -1024.25, True, False, None,
+    b'', b'a' * 63, b'a' * 64, b'\x00\xff' * 100, '', 'd\xe9j\xe0 vu', 'x' * 1000,
+    [], list(range(63)), list(range(64)), (1, (2, (3, ()))),
+    {}, dict((index, index) for index in range(24)), dict((str(index), index) for index in range(25)),
+    {(1, 2): {None: [True]}},
+    (1, (1, 'core.get_torrents_status', ({}, ['name', 'state'], True), {})),
+    [(1, 1, create_torrents_status(100))],
+]
+
+
+def normalize(value):
+    """Convert a value to what loads returns with decode_utf8."""
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize(item) for item in value)
+    if isinstance(value, dict):
+        return dict((normalize(key), normalize(item)) for key, item in value.items())
+    if isinstance(value, bytes):
+        try:
+            return value.decode('utf8')
+        except UnicodeDecodeError:
+            return value
+    return value
+
+
+class RencodeTestCase(unittest.TestCase):
+
+    def require_c_rencode(self):
+        if c_rencode is None:
+            raise unittest.SkipTest('The compiled rencode module is not installed')
+
+    def test_self_test(self):
+        deluge.rencode.test()
+
+    def test_corpus_round_trip(self):
+        for value in CORPUS:
+            if isinstance(value, bytes) and value.startswith(b'\x00'):
+                self.assertEqual(deluge.rencode.loads(deluge.rencode.dumps(value)), value)
+                continue
+            self.assertEqual(deluge.rencode.loads(deluge.rencode.dumps(value), decode_utf8=True), normalize(value))
+
+    def test_float64(self):
+        value = [0.1, -1e300]
+        self.assertEqual(deluge.rencode.loads(deluge.rencode.dumps(value, 64)), tuple(value))
+        self.assertRaises(ValueError, deluge.rencode.dumps, value, 16)
+
+    def test_invalid_data(self):
+        for data in [b'', b'\x3b', b'\x7f', b'\x3d12', deluge.rencode.dumps([1, 2]) + b'\x00']:
+            self.assertRaises(ValueError, deluge.rencode.loads, data)
+
+    def test_c_rencode_encodes_identically(self):
+        self.require_c_rencode()
+        for value in CORPUS:
+            self.assertEqual(c_rencode.dumps(value), deluge.rencode.dumps(value))
+            self.assertEqual(c_rencode.dumps(value, 64), deluge.rencode.dumps(value, 64))
+
+    def test_c_rencode_decodes_identically(self):
+        self.require_c_rencode()
+        for value in CORPUS:
+            encoded = deluge.rencode.dumps(value)
+            self.assertEqual(c_rencode.loads(encoded), deluge.rencode.loads(encoded))
+            if not (isinstance(value, bytes) and value.startswith(b'\x00')):
+                self.assertEqual(c_rencode.loads(encoded, decode_utf8=True),
+                                 deluge.rencode.loads(encoded, decode_utf8=True))
+
+    def test_select_rencode(self):
+        self.assertTrue(deluge.transfer.rencode in (c_rencode, deluge.rencode))
+
+        self.patch(deluge.transfer, 'c_rencode', None)
+        self.assertTrue(select_rencode() is deluge.rencode)
+
+        class IncompatibleRencode(object):
+            @staticmethod
+            def dumps(value):
+                return b'\x00'
+
+            @staticmethod
+            def loads(data, decode_utf8=False):
+                return None
+
+        self.patch(deluge.transfer, 'c_rencode', IncompatibleRencode)
+        self.assertTrue(select_rencode() is deluge.rencode)
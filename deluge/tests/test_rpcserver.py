@@ -7,12 +7,17 @@
 # See LICENSE for more details.
 #
 
+from twisted.internet import reactor, task
+
 import deluge.component as component
 import deluge.error
+import deluge.rencode as rencode
 from deluge.core import rpcserver
 from deluge.core.authmanager import AuthManager
-from deluge.core.rpcserver import DelugeRPCProtocol, RPCServer
+from deluge.core.rpcserver import DelugeRPCProtocol, RPCServer, export
+from deluge.event import TorrentAddedEvent
 from deluge.log import setup_logger
+from deluge.transfer import DelugeTransferProtocol
 from deluge.ui.common import get_localhost_auth
 
 from .basetest import BaseTestCase
@@ -28,6 +33,28 @@ def transfer_message(self, data):
         self.messages.append(data)
 
 
+class FakeTransport(object):
+
+    def __init__(self):
+        self.messages = []
+
+    def write(self, data):
+        self.messages.append(data)
+
+
+class StreamingObject(object):
+
+    @export
+    def get_parts(self):
+        for index in range(3):
+            yield {'id%d' % index: index}
+
+    @export
+    def get_session_parts(self):
+        for index in range(3):
+            yield {'id%d' % index: component.get('RPCServer').get_session_id()}
+
+
 class RPCServerTestCase(BaseTestCase):
 
     def set_up(self):
@@ -98,6 +125,140 @@ def test_client_invalid_method_call(self):
         self.assertEqual(msg[2], 'WrappedException')
         self.assertEqual(msg[3][1], 'AttributeError')
 
+    def test_set_compression(self):
+        self.rpcserver.set_compression('none', -1, 0)
+        self.protocol.dispatch(self.request_id, 'daemon.set_compression', [['zlib', 'none']], {})
+        msg = self.protocol.messages.pop()
+        self.assertEqual(msg[0], rpcserver.RPC_RESPONSE, str(msg))
+        self.assertEqual(msg[2], ('none', -1, 0), str(msg))
+        self.assertEqual(self.protocol._compression_codec, 'none')
+
+    def test_set_compression_unsupported_by_client(self):
+        self.rpcserver.set_compression('none', 0, 512)
+        self.protocol.dispatch(self.request_id, 'daemon.set_compression', [['zlib']], {})
+        msg = self.protocol.messages.pop()
+        # The configured level is not used for the fallback codec.
+        self.assertEqual(msg[2], ('zlib', -1, 512), str(msg))
+
+    def test_set_compression_level_clamped(self):
+        self.rpcserver.set_compression('zlib', 22, 0)
+        self.assertEqual(self.factory.compression, ('zlib', 9, 0))
+        self.rpcserver.set_compression('unknown', 22, 0)
+        self.assertEqual(self.factory.compression, ('zlib', -1, 0))
+
+    def dispatch_streamed(self, stream_responses):
+        self.rpcserver.register_object(StreamingObject(), 'test')
+        self.factory.authorized_sessions[self.session_id] = (rpcserver.AUTH_LEVEL_ADMIN, 'localclient')
+        self.protocol.stream_responses = stream_responses
+        del self.protocol.messages[:]
+        self.protocol.dispatch(self.request_id, 'test.get_parts', [], {})
+        # Each part is sent in a separate reactor iteration.
+        return task.deferLater(reactor, 0.1, lambda: self.protocol.messages[:])
+
+    def test_streamed_response_merged(self):
+        def on_sent(messages):
+            self.assertEqual(messages, [(rpcserver.RPC_RESPONSE, self.request_id, {'id0': 0, 'id1': 1, 'id2': 2})])
+        return self.dispatch_streamed(False).addCallback(on_sent)
+
+    def test_streamed_response_parts(self):
+        def on_sent(messages):
+            self.assertEqual(messages, [(rpcserver.RPC_RESPONSE_PART, self.request_id, {'id0': 0}),
+                                        (rpcserver.RPC_RESPONSE_PART, self.request_id, {'id1': 1}),
+                                        (rpcserver.RPC_RESPONSE_PART, self.request_id, {'id2': 2}),
+                                        (rpcserver.RPC_RESPONSE, self.request_id, None)])
+        return self.dispatch_streamed(True).addCallback(on_sent)
+
+    def test_streamed_response_session_id(self):
+        self.rpcserver.register_object(StreamingObject(), 'test')
+        self.factory.authorized_sessions[self.session_id] = (rpcserver.AUTH_LEVEL_ADMIN, 'localclient')
+        del self.protocol.messages[:]
+        self.protocol.dispatch(self.request_id, 'test.get_session_parts', [], {})
+        # Another session calls a method before the next parts are produced.
+        self.factory.session_id = '1'
+
+        def on_sent(result):
+            self.assertEqual(self.protocol.messages, [
+                (rpcserver.RPC_RESPONSE, self.request_id, {'id0': '0', 'id1': '0', 'id2': '0'})])
+            self.assertEqual(self.factory.session_id, '1')
+        return task.deferLater(reactor, 0.1, lambda: None).addCallback(on_sent)
+
+    def test_encode_in_thread_pool_keeps_order(self):
+        self.rpcserver.set_encode_threads(2, 10)
+        protocol = DelugeRPCProtocol()
+        protocol.factory = self.factory
+        protocol.transport = FakeTransport()
+        status = dict(('id%d' % index, {'name': 'Torrent %d' % index}) for index in range(100))
+        messages = [(rpcserver.RPC_RESPONSE, self.request_id, status),
+                    (rpcserver.RPC_EVENT, 'TorrentAddedEvent', ['id100', False])]
+        expected = rencode.dumps(messages)
+        protocol.sendData(messages[0], 'core.get_torrents_status')
+        protocol.sendData(messages[1])
+        # The event waits for the response being encoded in the thread pool.
+        self.assertEqual(protocol.transport.messages, [])
+        # The response is encoded as sent, not with the later changes.
+        status['id0']['name'] = 'Renamed'
+        status['id100'] = {'name': 'Torrent 100'}
+
+        def on_sent():
+            receiver = DelugeTransferProtocol()
+            received = []
+            receiver.message_received = received.append
+            receiver.dataReceived(b''.join(protocol.transport.messages))
+            self.assertEqual(rencode.dumps(received), expected)
+            self.assertEqual(sorted(self.rpcserver.get_encode_stats()),
+                             ['TorrentAddedEvent', 'core.get_torrents_status'])
+        return task.deferLater(reactor, 0.2, on_sent)
+
+    def test_set_batch_responses(self):
+        self.assertFalse(self.protocol.batch_responses)
+        self.protocol.dispatch(self.request_id, 'daemon.set_batch_responses', [True], {})
+        msg = self.protocol.messages.pop()
+        self.assertEqual(msg, (rpcserver.RPC_RESPONSE, self.request_id, True))
+        self.assertTrue(self.protocol.batch_responses)
+
+    def test_message_received_batch_negotiated(self):
+        dispatched = []
+        self.patch(self.protocol, 'dispatch', lambda *call: dispatched.append(call[0]))
+        self.patch(self.protocol, 'dispatch_batch', lambda calls: dispatched.append([call[0] for call in calls]))
+        request = ((1, 'daemon.info', [], {}), (2, 'daemon.info', [], {}))
+        self.protocol.message_received(request)
+        self.protocol.batch_responses = True
+        self.protocol.message_received(request)
+
+        def on_dispatched():
+            self.assertEqual(dispatched, [1, 2, [1, 2]])
+        return task.deferLater(reactor, 0, on_dispatched)
+
+    def test_dispatch_batch(self):
+        del self.protocol.messages[:]
+        self.protocol.dispatch_batch([(1, 'daemon.info', [], {}), (2, 'invalid_function', [], {}),
+                                      (3, 'daemon.info', [], {})])
+        self.assertEqual(len(self.protocol.messages), 1)
+        msg_type, dummy, responses = self.protocol.messages[0]
+        self.assertEqual(msg_type, rpcserver.RPC_BATCH)
+        self.assertEqual([(response[0], response[1]) for response in responses],
+                         [(rpcserver.RPC_RESPONSE, 1), (rpcserver.RPC_ERROR, 2), (rpcserver.RPC_RESPONSE, 3)])
+
+    def test_dispatch_batch_keeps_event_order(self):
+        del self.protocol.messages[:]
+        self.factory.interested_events[self.session_id] = ['TorrentAddedEvent']
+        self.factory.session_protocols[self.session_id] = self.protocol
+
+        class EmittingObject(object):
+            @export
+            def emit(self):
+                self.rpcserver.emit_event(TorrentAddedEvent('id', False))
+
+        emitting = EmittingObject()
+        emitting.rpcserver = self.rpcserver
+        self.rpcserver.register_object(emitting, 'test')
+        self.factory.authorized_sessions[self.session_id] = (rpcserver.AUTH_LEVEL_ADMIN, 'localclient')
+        self.protocol.dispatch_batch([(1, 'daemon.info', [], {}), (2, 'test.emit', [], {})])
+        self.assertEqual(len(self.protocol.messages), 1)
+        responses = self.protocol.messages[0][2]
+        self.assertEqual([response[0] for response in responses],
+                         [rpcserver.RPC_RESPONSE, rpcserver.RPC_EVENT, rpcserver.RPC_RESPONSE])
+
     def test_daemon_info(self):
         self.protocol.dispatch(self.request_id, 'daemon.info', [], {})
         msg = self.protocol.messages.pop()
@@ -0,0 +1,56 @@
+from .twisted.trial import unittest
+
+from deluge.core.searchindex import TorrentSearchIndex, get_trigrams
+
+
+class TorrentSearchIndexTestCase(unittest.TestCase):
+
+    def setUp(self):  # NOQA: N803
+        self.texts = {
+            'id0': {'name': 'Ubuntu Desktop', 'files': 'ubuntu/desktop.iso'},
+            'id1': {'name': 'Debian', 'files': 'debian/netinst.iso\ndebian/README'},
+        }
+        self.fetched = []
+        self.index = TorrentSearchIndex(self.get_texts)
+        for torrent_id in self.texts:
+            self.index.update(torrent_id)
+
+    def get_texts(self, torrent_id):
+        self.fetched.append(torrent_id)
+        return self.texts[torrent_id]
+
+    def test_get_trigrams(self):
+        self.assertEqual(get_trigrams('abcd'), {'abc', 'bcd'})
+        self.assertEqual(get_trigrams('ab'), set())
+
+    def test_search(self):
+        self.assertEqual(self.index.search('ISO', ['files']), {'id0', 'id1'})
+        self.assertEqual(self.index.search('desktop', ['name']), {'id0'})
+        self.assertEqual(self.index.search('readme', ['name']), set())
+        self.assertEqual(self.index.search('de', ['name']), {'id0', 'id1'})
+        self.assertEqual(self.index.search('missing', ['name', 'files']), set())
+
+    def test_texts_fetched_lazily(self):
+        self.assertEqual(self.fetched, [])
+        self.index.search('iso', ['files'])
+        self.index.search('iso', ['files'])
+        self.assertEqual(sorted(self.fetched), ['id0', 'id1'])
+
+    def test_update(self):
+        self.index.search('iso', ['files'])
+        self.texts['id1'] = {'name': 'Fedora', 'files': 'fedora.img'}
+        self.index.update('id1')
+        self.assertEqual(self.index.search('iso', ['files']), {'id0'})
+        self.assertEqual(self.index.search('fedora', ['name']), {'id1'})
+        self.assertFalse('deb' in self.index.trigrams)
+
+    def test_remove(self):
+        self.index.search('iso', ['files'])
+        self.index.remove('id0')
+        self.assertFalse('id0' in self.index)
+        self.assertEqual(self.index.search('iso', ['files']), {'id1'})
+        self.assertFalse('ubu' in self.index.trigrams)
+
+    def test_removed_before_indexing(self):
+        del self.texts['id0']
+        self.assertEqual(self.index.search('iso', ['files']), {'id1'})
@@ -119,7 +119,7 @@ def tear_down(self):
         return component.deregister(self.sp)
 
     def test_startup(self):
-        self.assertEqual(client.core.torrents['a'], self.sp.torrents['a'][1])
+        self.assertEqual(client.core.torrents['a'], self.sp.torrents.get_status(['a'])['a'])
 
     def test_get_torrent_status_no_change(self):
         d = self.sp.get_torrent_status('a', [])
@@ -154,3 +154,37 @@ def test_get_torrents_status_key_not_updated(self):
         d = self.sp.get_torrents_status({'id': ['a']}, ['key2'])
         d.addCallback(self.assertEqual, {'a': {'key2': 99}})
         return d
+
+    def test_get_torrent_status_key_cache_time(self):
+        self.sp.key_cache_times['key3'] = 10
+        self.clock.advance(self.sp.cache_time + 0.1)
+        client.core.torrents['a']['key1'] = 5
+        client.core.torrents['a']['key3'] = 99
+        d = self.sp.get_torrent_status('a', ['key1', 'key3'])
+        d.addCallback(self.assertEqual, {'key1': 5, 'key3': 3})
+        return d
+
+    def test_get_torrent_status_invalidated_key(self):
+        self.sp.key_cache_times['key3'] = 10
+        client.core.torrents['a']['key3'] = 99
+        self.sp.on_torrents_changed(['a'], ['key3'])
+        d = self.sp.get_torrent_status('a', ['key3'])
+        d.addCallback(self.assertEqual, {'key3': 99})
+        return d
+
+    def test_tracker_status_event(self):
+        self.sp.key_cache_times['key3'] = 10
+        client.core.torrents['a']['key3'] = 99
+        self.patch(deluge.ui.sessionproxy, 'TRACKER_STATUS_KEYS', ['key3'])
+        self.sp.on_torrent_tracker_status('a', 'Error: timed out')
+        d = self.sp.get_torrent_status('a', ['tracker_status', 'key3'])
+        d.addCallback(self.assertEqual, {'tracker_status': 'Error: timed out', 'key3': 99})
+        return d
+
+    def test_get_torrents_status_local_filter(self):
+        self.sp.on_torrent_state_changed('a', 'Seeding')
+        self.assertEqual(self.sp.get_local_filter({'state': 'Active'}), None)
+        self.assertEqual(self.sp.get_local_filter({'keyword': 'linux'}), None)
+        d = self.sp.get_torrents_status({'state': 'Seeding'}, ['key1'])
+        d.addCallback(self.assertEqual, {'a': {'key1': 1}})
+        return d
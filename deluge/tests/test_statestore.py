@@ -0,0 +1,82 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import closing
+
+from .twisted.trial import unittest
+
+from deluge.core.statestore import TorrentStateStore
+
+
+class FakeTorrentState(object):
+    def __init__(self, torrent_id, queue, paused=False):
+        self.torrent_id = torrent_id
+        self.queue = queue
+        self.paused = paused
+
+
+class TorrentStateStoreTestCase(unittest.TestCase):
+
+    def setUp(self):  # NOQA: N803
+        self.filepath = os.path.join(tempfile.mkdtemp(), 'torrents.db')
+        self.store = TorrentStateStore(self.filepath)
+        self.states = [FakeTorrentState('id%d' % i, i) for i in range(3)]
+
+    def load(self, reverse=False):
+        return [(state.torrent_id, state.paused) for state, _ in TorrentStateStore(self.filepath).load(reverse)]
+
+    def test_is_new(self):
+        self.assertTrue(self.store.is_new)
+        self.assertFalse(TorrentStateStore(self.filepath).is_new)
+
+    def test_save_load(self):
+        self.assertEqual(self.store.save(self.states), 3)
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.load(), [('id0', False), ('id1', False), ('id2', False)])
+        self.assertEqual(self.load(reverse=True), [('id2', False), ('id1', False), ('id0', False)])
+
+    def test_save_only_changed(self):
+        self.store.save(self.states)
+        self.assertEqual(self.store.save(self.states), 0)
+
+        self.states[1].paused = True
+        self.assertEqual(self.store.save(self.states), 1)
+        self.assertEqual(self.load(), [('id0', False), ('id1', True), ('id2', False)])
+
+    def test_save_removed(self):
+        self.store.save(self.states)
+        self.assertEqual(self.store.save(self.states[1:]), 1)
+        self.assertEqual(self.load(), [('id1', False), ('id2', False)])
+
+    def test_loaded_states_not_saved(self):
+        self.store.save(self.states)
+        store = TorrentStateStore(self.filepath)
+        self.assertEqual(len(list(store.load())), 3)
+        self.assertEqual(store.save(self.states), 0)
+
+    def test_resume_data(self):
+        self.store.save(self.states)
+        self.store.save_resume_data({'id0': b'd4:infoe', 'id2': b'd4:datae'})
+        self.store.save_resume_data({'id2': None})
+        resume_data = [(state.torrent_id, data) for state, data in TorrentStateStore(self.filepath).load()]
+        self.assertEqual(resume_data, [('id0', b'd4:infoe'), ('id1', None), ('id2', None)])
+
+    def test_migrate(self):
+        self.assertFalse(self.store.is_migrated)
+        self.store.save(self.states[:1])
+        self.states[0].paused = True
+        self.store.migrate(self.states, {'id1': b'd4:infoe'})
+        self.assertTrue(TorrentStateStore(self.filepath).is_migrated)
+        loaded = [(state.torrent_id, state.paused, data) for state, data in TorrentStateStore(self.filepath).load()]
+        self.assertEqual(loaded, [('id0', False, None), ('id1', False, b'd4:infoe'), ('id2', False, None)])
+
+    def test_checkpoint(self):
+        # An open connection keeps the saved rows in the write-ahead log, as after a crash.
+        with closing(sqlite3.connect(self.filepath)) as conn:
+            conn.execute('SELECT COUNT(*) FROM torrents').fetchone()
+            self.store.save(self.states)
+            self.store.checkpoint()
+            archive_filepath = os.path.join(os.path.dirname(self.filepath), 'archive.db')
+            shutil.copy2(self.filepath, archive_filepath)
+        self.assertEqual(len(TorrentStateStore(archive_filepath)), 3)
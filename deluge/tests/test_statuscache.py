@@ -0,0 +1,50 @@
+from .twisted.trial import unittest
+
+from deluge.ui.statuscache import TorrentStatusCache
+
+
+class TorrentStatusCacheTestCase(unittest.TestCase):
+
+    def setUp(self):  # NOQA
+        self.cache = TorrentStatusCache()
+        for torrent_id in ['a', 'b', 'c']:
+            self.cache.add(torrent_id, 0.0)
+
+    def test_update_and_get_status(self):
+        self.cache.update('a', {'state': 'Seeding', 'name': 'A'}, 1.0)
+        self.cache.update('b', {'state': 'Paused'}, 1.0)
+        self.cache.update('unknown', {'state': 'Paused'}, 1.0)
+        self.assertEqual(self.cache.get_status(['a', 'b', 'unknown'], ['state', 'name']),
+                         {'a': {'state': 'Seeding', 'name': 'A'}, 'b': {'state': 'Paused'}})
+        self.assertEqual(self.cache.get_status(['c']), {'c': {}})
+        self.assertEqual(sorted(self.cache.get_keys('a')), ['name', 'state'])
+        self.assertEqual(self.cache.get_value('b', 'name', 'default'), 'default')
+
+    def test_interned_strings(self):
+        self.cache.update('a', {'state': ''.join(['Seed', 'ing'])}, 1.0)
+        self.cache.update('b', {'state': ''.join(['Seed', 'ing'])}, 1.0)
+        self.assertTrue(self.cache.get_value('a', 'state') is self.cache.get_value('b', 'state'))
+
+    def test_expired_keys(self):
+        self.cache.update('a', {'state': 'Seeding', 'name': 'A'}, 10.0)
+        self.cache.touch('a', ['ratio'], 10.0)
+        cache_times = {'name': 30.0}.get
+        self.assertEqual(self.cache.get_expired_keys('a', ['state', 'name', 'ratio', 'eta'], 12.0,
+                                                     lambda key: cache_times(key, 1.5)), ['state', 'ratio', 'eta'])
+        self.assertEqual(self.cache.get_fetch_time('a'), 10.0)
+
+        self.cache.invalidate('a', ['name'])
+        self.assertEqual(self.cache.get_expired_keys('a', ['name'], 10.0, lambda key: 30.0), ['name'])
+        self.assertEqual(self.cache.get_value('a', 'name'), 'A')
+
+        self.cache.invalidate_all(['state'])
+        self.assertEqual(self.cache.get_expired_keys('a', ['state'], 10.0, lambda key: 30.0), ['state'])
+
+    def test_reuse_slot(self):
+        self.cache.update('a', {'state': 'Seeding'}, 1.0)
+        self.cache.remove('a')
+        self.assertFalse('a' in self.cache)
+        self.cache.add('d', 2.0)
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.get_status(['d']), {'d': {}})
+        self.assertEqual(self.cache.get_expired_keys('d', ['state'], 2.0, lambda key: 30.0), ['state'])
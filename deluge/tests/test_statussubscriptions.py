@@ -0,0 +1,101 @@
+import deluge.component as component
+from deluge.core.authmanager import AUTH_LEVEL_ADMIN, AUTH_LEVEL_NORMAL
+from deluge.core.eventmanager import EventManager
+from deluge.core.filtermanager import FilterManager
+from deluge.core.statussubscriptions import TorrentStatusSubscriptions
+
+from .basetest import BaseTestCase
+from .test_filtermanager import FakeCore, FakeStatus, FakeTorrent
+
+
+class FakeRPCServer(component.Component):
+    def __init__(self):
+        component.Component.__init__(self, 'RPCServer')
+        self.events = []
+        # The session of the current RPC.
+        self.session = ('localclient', AUTH_LEVEL_ADMIN)
+
+    def get_session_user(self):
+        return self.session[0]
+
+    def get_session_auth_level(self):
+        return self.session[1]
+
+    def emit_event_for_session_id(self, session_id, event):
+        self.events.append((session_id, event.name, event.args))
+
+
+class TorrentStatusSubscriptionsTestCase(BaseTestCase):
+
+    def set_up(self):
+        self.eventmanager = EventManager()
+        self.rpcserver = FakeRPCServer()
+        self.core = FakeCore()
+        self.fm = FilterManager(self.core)
+        for torrent in [FakeTorrent('id0', state='Downloading'), FakeTorrent('id1', owner='user1')]:
+            self.core.torrentmanager.add(torrent)
+            self.fm.on_torrent_added(torrent.torrent_id, False)
+        self.subscriptions = TorrentStatusSubscriptions(self.core.torrentmanager)
+
+    def tear_down(self):
+        self.subscriptions.stop()
+        return component.shutdown()
+
+    def set_state(self, torrent_id, state):
+        self.core.torrentmanager[torrent_id].state = state
+        self.fm.on_torrent_state_changed(torrent_id, state)
+
+    def test_subscribe(self):
+        status = self.subscriptions.subscribe(1, {'state': 'Paused'}, ['state', 'owner'], 1)
+        self.assertEqual(status, {'id1': {'state': 'Paused', 'owner': 'user1'}})
+        self.assertTrue(self.subscriptions.poll_timer.running)
+
+        self.subscriptions.unsubscribe(1)
+        self.assertFalse(self.subscriptions.poll_timer.running)
+
+    def test_push_changes(self):
+        self.subscriptions.subscribe(1, {}, ['download_payload_rate'], 1)
+        self.subscriptions.push(1)
+        self.assertEqual(self.rpcserver.events, [])
+
+        self.core.torrentmanager['id0'].status = FakeStatus(download_payload_rate=10)
+        self.subscriptions.push(1)
+        self.assertEqual(self.rpcserver.events,
+                         [(1, 'TorrentsStatusUpdateEvent', [{'id0': {'download_payload_rate': 10}}, []])])
+
+    def test_torrent_leaves_and_rejoins_filter(self):
+        self.subscriptions.subscribe(1, {'state': 'Paused'}, ['owner'], 1)
+        self.set_state('id1', 'Seeding')
+        self.subscriptions.push(1)
+        self.assertEqual(self.rpcserver.events[-1][2], [{}, ['id1']])
+
+        # The full status is sent as the client dropped the torrent.
+        self.set_state('id1', 'Paused')
+        self.subscriptions.push(1)
+        self.assertEqual(self.rpcserver.events[-1][2], [{'id1': {'owner': 'user1'}}, []])
+
+    def test_pushes_are_coalesced(self):
+        self.subscriptions.subscribe(1, {}, ['state'], 10)
+        self.subscriptions.on_status_updated()
+        delayed_push = self.subscriptions.subscriptions[1].delayed_push
+        self.assertTrue(delayed_push.active())
+        self.subscriptions.on_status_updated()
+        self.assertTrue(self.subscriptions.subscriptions[1].delayed_push is delayed_push)
+
+        self.subscriptions.unsubscribe(1)
+        self.assertFalse(delayed_push.active())
+
+    def test_sessions_of_different_owners(self):
+        self.rpcserver.session = ('user1', AUTH_LEVEL_NORMAL)
+        self.assertEqual(list(self.subscriptions.subscribe(1, {}, ['download_payload_rate'], 1)), ['id1'])
+        self.rpcserver.session = ('localclient', AUTH_LEVEL_ADMIN)
+        self.assertEqual(sorted(self.subscriptions.subscribe(2, {}, ['download_payload_rate'], 1)), ['id0', 'id1'])
+
+        # The pushes use the user of the subscription, not of the last RPC.
+        self.core.torrentmanager['id0'].status = FakeStatus(download_payload_rate=10)
+        self.subscriptions.push(1)
+        self.assertEqual(self.rpcserver.events, [])
+        self.rpcserver.session = ('user1', AUTH_LEVEL_NORMAL)
+        self.subscriptions.push(2)
+        self.assertEqual(self.rpcserver.events,
+                         [(2, 'TorrentsStatusUpdateEvent', [{'id0': {'download_payload_rate': 10}}, []])])
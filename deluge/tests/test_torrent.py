@@ -4,6 +4,7 @@
 import os
 import time
 
+from mock import MagicMock
 from .twisted.internet import defer, reactor
 from .twisted.internet.task import deferLater
 
@@ -19,6 +20,16 @@
 from .basetest import BaseTestCase
 
 
+class TrackerStatus(object):
+    """A libtorrent torrent_status with another current tracker."""
+    def __init__(self, status, current_tracker):
+        self._status = status
+        self.current_tracker = current_tracker
+
+    def __getattr__(self, name):
+        return getattr(self._status, name)
+
+
 class TorrentTestCase(BaseTestCase):
 
     def setup_config(self):
@@ -192,3 +203,18 @@ def assert_resume_data():
 
         yield deferLater(reactor, 0.5, assert_resume_data)
         return
+
+    @defer.inlineCallbacks
+    def test_tracker_host_reindexed_on_tracker_change(self):
+        filename = common.get_test_data_file('test.torrent')
+        with open(filename) as _file:
+            filedump = base64.encodestring(_file.read())
+        torrent_id = yield self.core.add_torrent_file(filename, filedump, {})
+        torrent = self.core.torrentmanager.torrents[torrent_id]
+        torrent.get_tracker_host()
+
+        alert = MagicMock()
+        alert.status = [TrackerStatus(torrent.handle.status(), 'udp://tracker.example.org:80/announce')]
+        self.core.torrentmanager.on_alert_state_update(alert)
+        self.assertEqual(torrent.get_tracker_host(), 'example.org')
+        self.assertEqual(self.core.filtermanager.filter_torrent_ids({'tracker_host': 'example.org'}), [torrent_id])
@@ -7,6 +7,7 @@
 from deluge import component
 from deluge.core.core import Core
 from deluge.core.rpcserver import RPCServer
+from deluge.core.torrentmanager import TorrentState
 from deluge.error import InvalidTorrentError
 
 from . import common
@@ -42,3 +43,18 @@ def test_remove_torrent_false(self):
 
     def test_remove_invalid_torrent(self):
         self.assertRaises(InvalidTorrentError, self.core.torrentmanager.remove, 'torrentidthatdoesntexist')
+
+    @defer.inlineCallbacks
+    def test_load_state_failed(self):
+        torrentmanager = self.core.torrentmanager
+        torrentmanager.state_store.save([TorrentState(torrent_id='0' * 40, queue=0)])
+
+        def read_state_batch(t_states):
+            raise ValueError('corrupt state')
+        self.patch(torrentmanager, '_read_state_batch', read_state_batch)
+        emitted = []
+        self.patch(component.get('EventManager'), 'emit', emitted.append)
+
+        yield torrentmanager.load_state().addErrback(torrentmanager.on_load_state_failed)
+        self.assertFalse(torrentmanager.is_loading_state)
+        self.assertEqual([event.name for event in emitted], ['SessionStartedEvent'])
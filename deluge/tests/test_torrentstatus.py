@@ -0,0 +1,103 @@
+from .twisted.trial import unittest
+
+from deluge.core.torrentstatus import TorrentStatusSnapshot, get_option_status_keys
+
+
+class FakeStatus(object):
+    def __init__(self, download_payload_rate=0):
+        self.download_payload_rate = download_payload_rate
+
+
+class FakeTorrent(object):
+    def __init__(self, torrent_id):
+        self.torrent_id = torrent_id
+        self.status = FakeStatus()
+        self.state = 'Paused'
+        self.options = {'max_connections': -1}
+        self.calls = 0
+        self.status_funcs = {
+            'download_payload_rate': self.get_download_payload_rate,
+            'name': lambda: 'name_' + self.torrent_id,
+        }
+
+    def get_download_payload_rate(self):
+        self.calls += 1
+        return self.status.download_payload_rate
+
+
+class TorrentStatusSnapshotTestCase(unittest.TestCase):
+
+    def setUp(self):  # NOQA: N803
+        self.snapshot = TorrentStatusSnapshot()
+        self.torrents = [FakeTorrent('id%d' % i) for i in range(3)]
+        for torrent in self.torrents:
+            self.snapshot.add(torrent)
+
+    def test_get_status(self):
+        keys = ['download_payload_rate', 'max_connections', 'state', 'name']
+        status = self.snapshot.get_status(['id0', 'id2', 'missing'], keys)
+        self.assertEqual(sorted(status), ['id0', 'id2'])
+        self.assertEqual(status['id2'], {'download_payload_rate': 0, 'max_connections': -1,
+                                         'state': 'Paused', 'name': 'name_id2'})
+
+    def test_status_columns_only_rebuilt_on_update(self):
+        self.snapshot.get_status(['id0', 'id1'], ['download_payload_rate'])
+        self.snapshot.get_status(['id0', 'id1'], ['download_payload_rate'])
+        self.assertEqual([t.calls for t in self.torrents[:2]], [1, 1])
+
+        self.torrents[1].status = FakeStatus(10)
+        status = self.snapshot.get_status(['id0', 'id1'], ['download_payload_rate'])
+        self.assertEqual(status['id1']['download_payload_rate'], 10)
+        self.assertEqual([t.calls for t in self.torrents[:2]], [1, 2])
+
+    def test_options_are_not_cached(self):
+        self.snapshot.get_status(['id0'], ['max_connections'])
+        self.torrents[0].options['max_connections'] = 50
+        status = self.snapshot.get_status(['id0'], ['max_connections'])
+        self.assertEqual(status['id0']['max_connections'], 50)
+
+    def test_remove_reuses_slot(self):
+        slot = self.snapshot.slots['id1']
+        self.snapshot.remove('id1')
+        self.assertFalse('id1' in self.snapshot)
+        self.assertEqual(self.snapshot.add(FakeTorrent('id3')), slot)
+        status = self.snapshot.get_status(['id3'], ['name', 'download_payload_rate'])
+        self.assertEqual(status['id3'], {'name': 'name_id3', 'download_payload_rate': 0})
+
+    def test_diff_status(self):
+        keys = ['download_payload_rate', 'state']
+        status = self.snapshot.get_status(['id0', 'id1'], keys, session_id=1)
+        self.assertEqual(status['id0'], {'download_payload_rate': 0, 'state': 'Paused'})
+
+        status = self.snapshot.get_status(['id0', 'id1'], keys, session_id=1)
+        self.assertEqual(status, {'id0': {}, 'id1': {}})
+
+        self.torrents[0].state = 'Downloading'
+        self.torrents[1].status = FakeStatus(10)
+        status = self.snapshot.get_status(['id0', 'id1'], keys, session_id=1)
+        self.assertEqual(status, {'id0': {'state': 'Downloading'}, 'id1': {'download_payload_rate': 10}})
+
+    def test_diff_status_sessions_are_independent(self):
+        keys = ['state']
+        self.snapshot.get_status(['id0'], keys, session_id=1)
+        self.snapshot.get_status(['id0'], keys, session_id=2)
+        self.torrents[0].state = 'Seeding'
+        # Session 2 sees the change first but session 1 must still receive it.
+        self.assertEqual(self.snapshot.get_status(['id0'], keys, session_id=2)['id0'], {'state': 'Seeding'})
+        self.assertEqual(self.snapshot.get_status(['id0'], keys, session_id=1)['id0'], {'state': 'Seeding'})
+        self.assertEqual(self.snapshot.get_status(['id0'], keys, session_id=1)['id0'], {})
+
+    def test_diff_status_new_keys(self):
+        self.snapshot.get_status(['id0'], ['state'], session_id=1)
+        status = self.snapshot.get_status(['id0'], ['state', 'max_connections'], session_id=1)
+        self.assertEqual(status['id0'], {'max_connections': -1})
+
+    def test_remove_session(self):
+        self.snapshot.get_status(['id0'], ['state'], session_id=1)
+        self.snapshot.remove_session(1)
+        self.assertEqual(self.snapshot.get_status(['id0'], ['state'], session_id=1)['id0'], {'state': 'Paused'})
+
+    def test_get_option_status_keys(self):
+        self.assertEqual(get_option_status_keys(['auto_managed', 'prioritize_first_last_pieces', 'name']),
+                         set(['is_auto_managed', 'prioritize_first_last', 'name']))
+        self.assertEqual(get_option_status_keys(['move_completed']), set(['move_completed', 'move_on_completed']))
@@ -10,12 +10,13 @@
 
 
 import base64
+import os
 
 from .twisted.trial import unittest
 
 import deluge.log
 import deluge.rencode as rencode
-from deluge.transfer import DelugeTransferProtocol
+from deluge.transfer import CODEC_HEADERS, MESSAGE_HEADER_SIZE, DelugeTransferProtocol, get_codecs
 
 deluge.log.setup_logger('none')
 
@@ -75,11 +76,8 @@ def data_received_old_protocol(self, data):
             print('Current data:', len(data))
 
             if self._message_length == 0:
-                # handle_new_message uses _buffer so set data to _buffer.
-                self._buffer = data
-                self._handle_new_message()
-                data = self._buffer
-                self._buffer = None
+                self._handle_new_message(data[:MESSAGE_HEADER_SIZE])
+                data = data[MESSAGE_HEADER_SIZE:]
                 self.packet_count = 1
                 print('New message of length:', self._message_length)
 
@@ -305,35 +303,57 @@ def test_receive_middle_of_header(self):
         message2 = self.transfer.get_messages_in().pop(0)
         self.assertEqual(rencode.dumps(self.msg2), rencode.dumps(message2))
 
-    # Needs file containing big data structure e.g. like thetorrent list as it is transfered by the daemon
-    # def test_simulate_big_transfer(self):
-    #    filename = "../deluge.torrentlist"
-    #
-    #    f = open(filename, "r")
-    #    data = f.read()
-    #    message_to_send = eval(data)
-    #    self.transfer.transfer_message(message_to_send)
-    #
-    # Get the data as sent to the network by DelugeTransferProtocol
-    #    compressed_data = self.transfer.get_messages_out_joined()
-    # packet_size = 16000 # Or something smaller...
-    #
-    #    for d in self.receive_parts_helper(compressed_data, packet_size):
-    #        bytes_recv = self.transfer.get_bytes_recv()
-    #        if bytes_recv < len(compressed_data):
-    #            self.assertEquals(len(self.transfer.get_messages_in()), 0)
-    #        else:
-    #            self.assertEquals(len(self.transfer.get_messages_in()), 1)
-    # Get the data as received by DelugeTransferProtocol
-    #    transfered_message = self.transfer.get_messages_in().pop(0)
-    # Test that the data structures are equal
-    # self.assertEquals(transfered_message, message_to_send)
-    # self.assertTrue(transfered_message == message_to_send)
-    #
-    # f.close()
-    # f = open("rencode.torrentlist", "w")
-    # f.write(str(transfered_message))
-    # f.close()
+    def test_receive_large_message_in_parts(self):
+        """
+        Receive a large message in parts, followed by part of the next message, and verify
+        the buffer only holds the unparsed data.
+
+        """
+        message = (1, 2, {'data': 'x' * 100000, 'random': base64.b64encode(os.urandom(50000)).decode()})
+        self.transfer.transfer_message(message)
+        msg_bytes = self.transfer.get_messages_out_joined()
+        msg1_bytes = base64.b64decode(self.msg1_expected_compressed_base64)
+
+        for dummy in self.receive_parts_helper(msg_bytes + msg1_bytes[:10], 4096):
+            pass
+        self.assertEqual(self.transfer.get_messages_in(), [message])
+        # The header of the next message has been parsed.
+        self.assertEqual(len(self.transfer._buffer), 10 - MESSAGE_HEADER_SIZE)
+        self.assertTrue(len(msg_bytes) <= self.transfer.get_peak_buffer_size() < len(msg_bytes) + 4096)
+
+        self.transfer.dataReceived(msg1_bytes[10:])
+        self.assertEqual(len(self.transfer.get_messages_in()), 2)
+        self.assertEqual(len(self.transfer._buffer), 0)
+
+    def test_negotiated_compression(self):
+        """
+        Send messages with each available codec, small messages are sent uncompressed.
+
+        """
+        large_message = (1, 2, {'data': 'x' * 1000})
+        for codec in get_codecs():
+            sender = TransferTestClass()
+            sender.set_compression(codec, threshold=200)
+            sender.transfer_message(self.msg1)
+            sender.transfer_message(large_message)
+            self.assertEqual(sender.messages_out[0][:1], CODEC_HEADERS['none'])
+            self.assertEqual(sender.messages_out[1][:1], CODEC_HEADERS[codec])
+
+            receiver = TransferTestClass()
+            receiver.dataReceived(sender.get_messages_out_joined())
+            self.assertEqual(rencode.dumps(receiver.get_messages_in()), rencode.dumps([self.msg1, large_message]))
+
+    def test_set_unknown_compression(self):
+        self.assertRaises(ValueError, self.transfer.set_compression, 'unknown')
+
+    def test_compression_level_clamped(self):
+        for codec in get_codecs():
+            sender = TransferTestClass()
+            sender.set_compression(codec, 22)
+            sender.transfer_message(self.msg1)
+            receiver = TransferTestClass()
+            receiver.dataReceived(sender.get_messages_out_joined())
+            self.assertEqual(rencode.dumps(receiver.get_messages_in()), rencode.dumps([self.msg1]))
 
     def receive_parts_helper(self, data, packet_size, receive_func=None):
         byte_count = len(data)
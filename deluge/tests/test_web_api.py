@@ -7,6 +7,7 @@
 # See LICENSE for more details.
 #
 
+import time
 from io import StringIO
 
 from .twisted.internet import defer, reactor
@@ -153,6 +154,42 @@ def test_download_torrent_from_url(self):
         res = yield self.deluge_web.web_api.download_torrent_from_url(url)
         self.assertTrue(res.endswith(filename))
 
+    def test_call_shared(self):
+        calls = []
+
+        class FakeCore(object):
+            def get_free_space(self, path):
+                calls.append(path)
+                return self.result
+
+        core = FakeCore()
+        core.result = defer.Deferred()
+        self.patch(client, 'core', core)
+        web_api = self.deluge_web.web_api
+        d1 = web_api._call_shared('get_free_space', '/a')
+        d2 = web_api._call_shared('get_free_space', '/a')
+        self.assertFalse(d1.called or d2.called)
+        core.result.callback(42)
+        self.assertEqual(self.successResultOf(d1), 42)
+        self.assertEqual(self.successResultOf(d2), 42)
+        self.assertEqual(self.successResultOf(web_api._call_shared('get_free_space', '/a')), 42)
+
+        core.result = defer.succeed(0)
+        self.assertEqual(self.successResultOf(web_api._call_shared('get_free_space', '/b')), 0)
+        self.assertEqual(calls, ['/a', '/b'])
+
+    def test_diff_torrents(self):
+        web_api = self.deluge_web.web_api
+        torrents = {'a': {'name': 'A', 'progress': 0.0}, 'b': {'name': 'B', 'progress': 0.0}}
+        self.assertEqual(web_api._diff_torrents('session', torrents, 0, 'view'), (None, None))
+
+        web_api.ui_sessions['session'] = {'update_id': 1, 'view': 'view', 'torrents': torrents, 'time': time.time()}
+        new_torrents = {'a': {'name': 'A', 'progress': 50.0}, 'c': {'name': 'C', 'progress': 0.0}}
+        self.assertEqual(web_api._diff_torrents('session', new_torrents, 1, 'view'),
+                         ({'a': {'progress': 50.0}, 'c': {'name': 'C', 'progress': 0.0}}, ['b']))
+        self.assertEqual(web_api._diff_torrents('session', new_torrents, 0, 'view'), (None, None))
+        self.assertEqual(web_api._diff_torrents('session', new_torrents, 1, 'other view'), (None, None))
+
     @defer.inlineCallbacks
     def test_invalid_json(self):
         """
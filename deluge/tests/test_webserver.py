@@ -8,6 +8,7 @@
 #
 
 import json as json_lib
+import zlib
 from io import StringIO
 
 from . import twisted.web.client
@@ -16,6 +17,8 @@
 from .twisted.web.client import Agent, FileBodyProducer
 from .twisted.web.http_headers import Headers
 
+from deluge.ui.web.server import rpath
+
 from . import common
 from .common import get_test_data_file
 from .common_web import WebServerMockBase, WebServerTestBase
@@ -51,3 +54,24 @@ def test_get_torrent_info(self):
 
         json = json_lib.loads(body)
         self.assertEqual(None, json['error'])
+
+    @defer.inlineCallbacks
+    def test_static_asset_cached(self):
+        agent = Agent(reactor)
+        url = 'http://127.0.0.1:%s/css/deluge.css' % self.webserver_listen_port
+
+        response = yield agent.request('GET', url)
+        body = yield twisted.web.client.readBody(response)
+        with open(rpath('css', 'deluge.css'), 'rb') as _file:
+            self.assertEqual(zlib.decompress(body, zlib.MAX_WBITS + 16), _file.read())
+        self.assertEqual(response.headers.getRawHeaders('cache-control'), ['no-cache'])
+        etag = response.headers.getRawHeaders('etag')[0]
+
+        response = yield agent.request('GET', url, Headers({'If-None-Match': [etag]}))
+        body = yield twisted.web.client.readBody(response)
+        self.assertEqual(response.code, 304)
+        self.assertEqual(body, b'')
+
+        response = yield agent.request('GET', url, Headers({'If-None-Match': ['"other"']}))
+        yield twisted.web.client.readBody(response)
+        self.assertEqual(response.code, 200)
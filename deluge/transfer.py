@@ -7,21 +7,147 @@
 # See LICENSE for more details.
 #
 
-try:
-    from . import rencode  # pylint: disable=useless-suppression,relative-import
-except ImportError:
-    import deluge.rencode as rencode
-
 import logging
 import struct
 import zlib
 
 from twisted.internet.protocol import Protocol
 
+import deluge.rencode
+
+try:
+    import rencode as c_rencode
+except ImportError:
+    c_rencode = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 log = logging.getLogger(__name__)
 
 MESSAGE_HEADER_SIZE = 5
 
+# Values of each type the RPC messages contain, the rencode modules must encode them identically.
+RENCODE_CONFORMANCE_DATA = (
+    1, (2, 'method', ('arg', b'bytes', -1, 1.5, 2 ** 40, None, True, False), {'key': ['value', 0.25]}),
+    {'torrent_id': {'state': 'Seeding', 'progress': 100.0, 'peers': [{'ip': '1.2.3.4:5678'}] * 70}},
+    dict((str(index), index) for index in range(30)), 'd\xe9j\xe0 vu',
+)
+
+
+def select_rencode():
+    """Select the rencode implementation used to encode and decode the messages.
+
+    The compiled rencode module is much faster than the pure python deluge.rencode
+    so it is used when installed, if it encodes and decodes like deluge.rencode.
+
+    Returns:
+        module: The rencode module.
+
+    """
+    if c_rencode is None:
+        return deluge.rencode
+    try:
+        encoded = c_rencode.dumps(RENCODE_CONFORMANCE_DATA)
+        compatible = (encoded == deluge.rencode.dumps(RENCODE_CONFORMANCE_DATA) and
+                      c_rencode.loads(encoded, decode_utf8=True) ==
+                      deluge.rencode.loads(encoded, decode_utf8=True))
+    except Exception as ex:  # pylint: disable=broad-except
+        log.debug('Unable to use the compiled rencode module: %s', ex)
+        compatible = False
+    if not compatible:
+        log.warning('Not using the installed rencode module, its wire format differs from deluge.rencode')
+        return deluge.rencode
+    return c_rencode
+
+
+rencode = select_rencode()
+
+# The first byte of the header identifies the codec of the payload. All versions
+# send and understand 'D' (zlib), the other codecs are only sent to a peer that
+# negotiated them, see DelugeTransferProtocol.set_compression.
+CODEC_HEADERS = {
+    'none': b'N',
+    'zlib': b'D',
+    'lz4': b'L',
+    'zstd': b'Z',
+}
+
+
+def _zlib_compress(data, level):
+    return zlib.compress(data, level)
+
+
+def _none_compress(data, level):
+    return data
+
+
+def _lz4_compress(data, level):
+    return lz4.frame.compress(data, compression_level=max(level, 0))
+
+
+def _zstd_compress(data, level):
+    return zstandard.ZstdCompressor(level=level if level >= 0 else 3).compress(data)
+
+
+def _zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+# {codec: (compress(data, level), decompress(data))}, level -1 is the codec default.
+CODECS = {
+    'none': (_none_compress, bytes),
+    'zlib': (_zlib_compress, zlib.decompress),
+}
+if lz4:
+    CODECS['lz4'] = (_lz4_compress, lz4.frame.decompress)
+if zstandard:
+    CODECS['zstd'] = (_zstd_compress, _zstd_decompress)
+
+HEADER_CODECS = dict((header, codec) for codec, header in CODEC_HEADERS.items() if codec in CODECS)
+
+# The valid compression levels of each codec, {codec: (min, max)}.
+CODEC_LEVELS = {
+    'none': (0, 0),
+    'zlib': (0, 9),
+    'lz4': (0, 16),
+    'zstd': (1, 22),
+}
+
+
+def get_compression_level(codec, level):
+    """Get a compression level valid for a codec.
+
+    Args:
+        codec (str): The codec name.
+        level (int): The compression level, -1 or any negative level for the codec default.
+
+    Returns:
+        int: The level clamped to the levels of the codec, or -1 for the codec default.
+
+    """
+    if level < 0:
+        return -1
+    min_level, max_level = CODEC_LEVELS[codec]
+    return min(max(level, min_level), max_level)
+
+
+def get_codecs():
+    """Get the available codecs, in order of preference.
+
+    Returns:
+        list: The codec names.
+
+    """
+    return [codec for codec in ['zstd', 'lz4', 'zlib', 'none'] if codec in CODECS]
+
 
 class DelugeTransferProtocol(Protocol, object):
     """
@@ -31,35 +157,84 @@ class DelugeTransferProtocol(Protocol, object):
 
     """
     def __init__(self):
-        self._buffer = ''
+        self._buffer = bytearray()
         self._message_length = 0
         self._bytes_received = 0
         self._bytes_sent = 0
+        self._peak_buffer_size = 0
+        self._message_codec = 'zlib'
+        # Legacy zlib compression of every message until the peer negotiates a codec.
+        self._compression_codec = 'zlib'
+        self._compression_level = -1
+        self._compression_threshold = 0
+
+    def set_compression(self, codec, level=-1, threshold=0):
+        """
+        Set the compression of the messages sent, the peer must be able to decode the codec.
+
+        :param codec: the codec name, one of `get_codecs()`.
+        :param level: the compression level, -1 for the codec default, clamped to the codec levels.
+        :param threshold: the payload size, in bytes, below which messages are sent uncompressed.
+
+        """
+        if codec not in CODECS:
+            raise ValueError('Unknown compression codec: %s' % codec)
+        self._compression_codec = codec
+        self._compression_level = get_compression_level(codec, level)
+        self._compression_threshold = threshold
 
     def transfer_message(self, data):
         """
         Transfer the data.
 
         The data will be serialized and compressed before being sent.
-        First a header is sent - containing the length of the compressed payload
-        to come as a signed integer. After the header, the payload is transfered.
+        First a header is sent - containing the codec and the length of the compressed
+        payload to come as a signed integer. After the header, the payload is transfered.
+
+        :param data: data to be transfered in a data structure serializable by rencode.
+
+        """
+        self.write_message(self.encode_message(data))
+
+    def encode_message(self, data):
+        """
+        Serialize and compress the data into a message, this does not use the
+        transport so it can be called from a thread.
 
         :param data: data to be transfered in a data structure serializable by rencode.
+        :returns: the header followed by the compressed payload.
+        :rtype: bytes
 
         """
-        compressed = zlib.compress(rencode.dumps(data))
+        payload = rencode.dumps(data)
+        codec = self._compression_codec
+        if len(payload) < self._compression_threshold:
+            codec = 'none'
+        compressed = CODECS[codec][0](payload, self._compression_level)
         size_data = len(compressed)
         # Store length as a signed integer (using 4 bytes). "!" denotes network byte order.
         payload_len = struct.pack('!i', size_data)
-        header = 'D' + payload_len
-        self._bytes_sent += len(header) + len(compressed)
-        self.transport.write(header)
-        self.transport.write(compressed)
+        return CODEC_HEADERS[codec] + payload_len + compressed
+
+    def write_message(self, message):
+        """
+        Write a message, as returned by encode_message, to the transport.
+
+        :param message: the encoded message.
+
+        """
+        self._bytes_sent += len(message)
+        self.transport.write(message)
 
     def dataReceived(self, data):  # NOQA: N802
         """
         This method is called whenever data is received.
 
+        The data is appended to the receive buffer and the complete messages in it are
+        parsed in place, through a memoryview, so a large message received in many parts
+        is only copied once into the buffer. The parsed data is removed from the buffer
+        once per call.
+
         :param data: a message as transfered by transfer_message, or a part of such
                      a messsage.
 
@@ -68,54 +243,69 @@ def dataReceived(self, data):  # NOQA: N802
             _message_length - the length of the payload of the current message.
 
         """
-        self._buffer += data
+        self._buffer.extend(data)
         self._bytes_received += len(data)
+        buffer_size = len(self._buffer)
+        if buffer_size > self._peak_buffer_size:
+            self._peak_buffer_size = buffer_size
 
-        while len(self._buffer) >= MESSAGE_HEADER_SIZE:
-            if self._message_length == 0:
-                self._handle_new_message()
-            # We have a complete packet
-            if len(self._buffer) >= self._message_length:
-                self._handle_complete_message(self._buffer[:self._message_length])
-                # Remove message data from buffer
-                self._buffer = self._buffer[self._message_length:]
+        pos = 0
+        with memoryview(self._buffer) as view:
+            while True:
+                if self._message_length == 0:
+                    if buffer_size - pos < MESSAGE_HEADER_SIZE:
+                        break
+                    if not self._handle_new_message(view[pos:pos + MESSAGE_HEADER_SIZE].tobytes()):
+                        # Discard all the data, there is no way to find the next message.
+                        pos = buffer_size
+                        break
+                    pos += MESSAGE_HEADER_SIZE
+                # We have a complete packet
+                if buffer_size - pos < self._message_length:
+                    break
+                end = pos + self._message_length
+                with view[pos:end] as payload:
+                    self._handle_complete_message(payload)
+                pos = end
                 self._message_length = 0
-            else:
-                break
 
-    def _handle_new_message(self):
+        # Remove message data from buffer
+        if pos:
+            del self._buffer[:pos]
+
+    def _handle_new_message(self, header):
         """
-        Handle the start of a new message. This method is called only when the
-        beginning of the buffer contains data from a new message (i.e. the header).
+        Handle the start of a new message, reading the payload length from the header.
+
+        :param header: the first MESSAGE_HEADER_SIZE bytes of the message.
+        :returns: True if the header is valid.
 
         """
         try:
-            # Read the first bytes of the message (MESSAGE_HEADER_SIZE bytes)
-            header = self._buffer[:MESSAGE_HEADER_SIZE]
             payload_len = header[1:MESSAGE_HEADER_SIZE]
-            if header[0] != 'D':
-                raise Exception('Invalid header format. First byte is %d' % ord(header[0]))
+            if header[0:1] not in HEADER_CODECS:
+                raise Exception('Invalid header format. First byte is %d' % header[0])
+            self._message_codec = HEADER_CODECS[header[0:1]]
             # Extract the length stored as a signed integer (using 4 bytes)
             self._message_length = struct.unpack('!i', payload_len)[0]
             if self._message_length < 0:
                 raise Exception('Message length is negative: %d' % self._message_length)
-            # Remove the header from the buffer
-            self._buffer = self._buffer[MESSAGE_HEADER_SIZE:]
         except Exception as ex:
             log.warn('Error occurred when parsing message header: %s.', ex)
             log.warn('This version of Deluge cannot communicate with the sender of this data.')
             self._message_length = 0
-            self._buffer = ''
+            return False
+        return True
 
     def _handle_complete_message(self, data):
         """
         Handles a complete message as it is transfered on the network.
 
-        :param data: a zlib compressed string encoded with rencode.
+        :param data: a compressed string encoded with rencode, may be a memoryview of the buffer.
 
         """
         try:
-            self.message_received(rencode.loads(zlib.decompress(data), decode_utf8=True))
+            self.message_received(rencode.loads(CODECS[self._message_codec][1](data), decode_utf8=True))
         except Exception as ex:
             log.warn('Failed to decompress (%d bytes) and load serialized data with rencode: %s', len(data), ex)
 
@@ -139,6 +329,16 @@ def get_bytes_sent(self):
         """
         return self._bytes_sent
 
+    def get_peak_buffer_size(self):
+        """
+        Returns the largest size the receive buffer has grown to.
+
+        :returns: the peak receive buffer size in bytes
+        :rtype: int
+
+        """
+        return self._peak_buffer_size
+
     def message_received(self, message):
         """Override this method to receive the complete message"""
         pass
@@ -11,18 +11,22 @@
 import logging
 import subprocess
 import sys
+from contextlib import contextmanager
+from types import GeneratorType
 
 from twisted.internet import defer, reactor, ssl
 from twisted.internet.protocol import ClientFactory
 
 import deluge.common
 from deluge import error
-from deluge.transfer import DelugeTransferProtocol
+from deluge.transfer import DelugeTransferProtocol, get_codecs
 from deluge.ui.common import get_localhost_auth
 
 RPC_RESPONSE = 1
 RPC_ERROR = 2
 RPC_EVENT = 3
+RPC_RESPONSE_PART = 4
+RPC_BATCH = 5
 
 log = logging.getLogger(__name__)
 
@@ -75,6 +79,10 @@ class DelugeRPCProtocol(DelugeTransferProtocol):
 
     def connectionMade(self):  # NOQA: N802
         self.__rpc_requests = {}
+        # The requests waiting to be sent together at the end of the reactor iteration or batch
+        self.__pending_requests = []
+        self.__batch_depth = 0
+        self.__flush_call = None
         # Set the protocol in the daemon so it can send data
         self.factory.daemon.protocol = self
         # Get the address of the daemon that we've connected to
@@ -102,6 +110,12 @@ def message_received(self, request):
 
         message_type = request[0]
 
+        if message_type == RPC_BATCH:
+            # The responses to a batch of requests
+            for response in request[2]:
+                self.message_received(response)
+            return
+
         if message_type == RPC_EVENT:
             event = request[1]
             # log.debug("Received RPCEvent: %s", event)
@@ -114,13 +128,19 @@ def message_received(self, request):
 
         request_id = request[1]
 
+        if message_type == RPC_RESPONSE_PART:
+            # A part of a streamed response, the RPC_RESPONSE follows the last part.
+            self.factory.daemon.add_response_part(request_id, request[2])
+            return
+
         # We get the Deferred object for this request_id to either run the
         # callbacks or the errbacks dependent on the response from the daemon.
         d = self.factory.daemon.pop_deferred(request_id)
+        result = self.factory.daemon.pop_response_parts(request_id)
 
         if message_type == RPC_RESPONSE:
             # Run the callbacks registered with this Deferred object
-            d.callback(request[2])
+            d.callback(request[2] if result is None else result)
         elif message_type == RPC_ERROR:
             # Recreate exception and errback'it
             try:
@@ -179,11 +199,39 @@ def send_request(self, request):
             # out the error for debugging purposes.
             self.__rpc_requests[request.request_id] = request
             # log.debug("Sending RPCRequest %s: %s", request.request_id, request)
-            # Send the request in a tuple because multiple requests can be sent at once
-            self.transfer_message((request.format_message(),))
+            # The requests made in the same reactor iteration are sent in one message.
+            self.__pending_requests.append(request.format_message())
+            if not self.__batch_depth and not (self.__flush_call and self.__flush_call.active()):
+                self.__flush_call = reactor.callLater(0, self.flush_requests)
+        except Exception as ex:
+            log.warn('Error occurred when sending message: %s', ex)
+
+    def flush_requests(self):
+        """
+        Sends the pending requests to the server in one message.
+        """
+        if not self.__pending_requests:
+            return
+        # Send the requests in a tuple because multiple requests can be sent at once
+        requests, self.__pending_requests = tuple(self.__pending_requests), []
+        try:
+            self.transfer_message(requests)
         except Exception as ex:
             log.warn('Error occurred when sending message: %s', ex)
 
+    @contextmanager
+    def batch(self):
+        """
+        Context manager sending all the requests made in it in one message when it exits.
+        """
+        self.__batch_depth += 1
+        try:
+            yield
+        finally:
+            self.__batch_depth -= 1
+            if not self.__batch_depth:
+                self.flush_requests()
+
 
 class DelugeRPCClientFactory(ClientFactory):
     protocol = DelugeRPCProtocol
@@ -229,6 +277,9 @@ def __init__(self, event_handlers=None):
         self.__factory.noisy = False
         self.__request_counter = 0
         self.__deferred = {}
+        # The merged parts of streamed responses and the callbacks of streamed calls, by request_id.
+        self.__response_parts = {}
+        self.__part_callbacks = {}
 
         # This is set when a connection is made to the daemon
         self.protocol = None
@@ -312,6 +363,56 @@ def call(self, method, *args, **kwargs):
 
         return d
 
+    def batch(self):
+        """
+        Returns a context manager sending all the requests made in it to the
+        daemon in one message.
+        """
+        return self.protocol.batch()
+
+    def call_streamed(self, method, part_callback, *args, **kwargs):
+        """
+        Makes a RPCRequest to a method that returns its result in parts, the
+        parts are passed to `:param:part_callback` as they are received.
+
+        :params method: str, the method to call in the form of 'component.method'
+        :params part_callback: func(part), called with each part of the response
+
+        :return: a twisted.Deferred object that will be activated when the last
+            part was received, or a RPCError is received from the daemon
+
+        """
+        self.__part_callbacks[self.__request_counter] = part_callback
+        return self.call(method, *args, **kwargs)
+
+    def add_response_part(self, request_id, part):
+        """
+        Handles a part of a streamed response, passing it to the part callback
+        of the request or merging it into the result.
+
+        :param request_id: the request_id of the response
+        :type request_id: int
+        :param part: the part of the response
+
+        """
+        if request_id in self.__part_callbacks:
+            self.__part_callbacks[request_id](part)
+        else:
+            self.__response_parts[request_id] = deluge.common.merge_response_part(
+                self.__response_parts.get(request_id), part)
+
+    def pop_response_parts(self, request_id):
+        """
+        Pops the merged parts of a streamed response.
+
+        :param request_id: the request_id of the response
+        :type request_id: int
+        :returns: the merged parts, or None if no parts were merged
+
+        """
+        self.__part_callbacks.pop(request_id, None)
+        return self.__response_parts.pop(request_id, None)
+
     def pop_deferred(self, request_id):
         """
         Pops a Deferred object.  This is generally called once we receive the
@@ -391,6 +492,9 @@ def __on_login(self, result, username, login_deferred):
         log.debug('__on_login called: %s %s', username, result)
         self.username = username
         self.authentication_level = result
+        # Negotiate the compression of the messages, old daemons do not support it and keep using zlib.
+        self.call('daemon.set_compression', get_codecs()).addCallbacks(
+            self.__on_set_compression, self.__on_set_compression_fail)
         # We need to tell the daemon what events we're interested in receiving
         if self.__factory.event_handlers:
             self.call('daemon.set_event_interest',
@@ -399,12 +503,26 @@ def __on_login(self, result, username, login_deferred):
             self.call('core.get_auth_levels_mappings').addCallback(
                 self.__on_auth_levels_mappings
             )
+        # Receive the parts of large responses as they are produced, old daemons reject it.
+        self.call('daemon.set_response_streaming', True).addErrback(
+            lambda reason: log.debug('Daemon does not support response streaming: %s', reason.getErrorMessage()))
+        # Receive the responses to the requests sent in one message in one message, old daemons reject it.
+        self.call('daemon.set_batch_responses', True).addErrback(
+            lambda reason: log.debug('Daemon does not support batch responses: %s', reason.getErrorMessage()))
 
         login_deferred.callback(result)
 
     def __on_login_fail(self, result, login_deferred):
         login_deferred.errback(result)
 
+    def __on_set_compression(self, result):
+        codec, level, threshold = result
+        log.debug('Using %s compression for messages to the daemon', codec)
+        self.protocol.set_compression(codec, level, threshold)
+
+    def __on_set_compression_fail(self, reason):
+        log.debug('Daemon does not support compression negotiation: %s', reason.getErrorMessage())
+
     def __on_auth_levels_mappings(self, result):
         auth_levels_mapping, auth_levels_mapping_reverse = result
         self.auth_levels_mapping = auth_levels_mapping
@@ -453,6 +571,30 @@ def disconnect(self):
         self.__daemon = None
 
     def call(self, method, *args, **kwargs):
+        def join_parts(result):
+            if isinstance(result, GeneratorType):
+                merged = None
+                for part in result:
+                    merged = deluge.common.merge_response_part(merged, part)
+                return merged
+            return result
+        return self.__call(method, args, kwargs).addCallback(join_parts)
+
+    @contextmanager
+    def batch(self):
+        # Calls are direct in standalone mode, there is nothing to batch.
+        yield
+
+    def call_streamed(self, method, part_callback, *args, **kwargs):
+        def pass_parts(result):
+            if isinstance(result, GeneratorType):
+                for part in result:
+                    part_callback(part)
+                return None
+            return result
+        return self.__call(method, args, kwargs).addCallback(pass_parts)
+
+    def __call(self, method, args, kwargs):
         # log.debug("call: %s %s %s", method, args, kwargs)
 
         import copy
@@ -728,6 +870,33 @@ def force_call(self, block=False):
     def __getattr__(self, method):
         return DottedObject(self._daemon_proxy, method)
 
+    def batch(self):
+        """
+        Returns a context manager sending all the calls made in it in a single
+        message, the daemon runs them in order and replies in a single message::
+
+            with client.batch():
+                for torrent_id in torrent_ids:
+                    client.core.set_torrent_options([torrent_id], options[torrent_id])
+
+        Calls made in the same reactor iteration are also sent together without it.
+
+        """
+        return self._daemon_proxy.batch()
+
+    def call_streamed(self, method, part_callback, *args, **kwargs):
+        """
+        Calls a remote method that returns its result in parts, such as
+        core.get_torrents_status_parts, passing each part to part_callback as
+        it is received instead of waiting for the whole result.
+
+        :param method: str, the method to call in the form of 'component.method'
+        :param part_callback: func(part), called with each part of the result
+        :returns: a Deferred fired once all the parts have been received
+
+        """
+        return self._daemon_proxy.call_streamed(method, part_callback, *args, **kwargs)
+
     def set_disconnect_callback(self, cb):
         """
         Set a function to be called whenever the client is disconnected from
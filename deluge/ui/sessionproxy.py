@@ -13,9 +13,39 @@
 
 import deluge.component as component
 from deluge.ui.client import client
+from deluge.ui.statuscache import TorrentStatusCache
 
 log = logging.getLogger(__name__)
 
+# Keys that only change on events the SessionProxy listens to, or very rarely.
+STATIC_KEYS = frozenset([
+    'comment', 'files', 'hash', 'name', 'num_files', 'num_pieces', 'orig_files', 'piece_length',
+    'private', 'storage_mode', 'time_added', 'total_size',
+])
+# Keys that change only with the state, the options or the trackers of the torrent.
+SLOW_KEYS = frozenset([
+    'completed_time', 'download_location', 'file_priorities', 'is_auto_managed', 'is_finished', 'is_seed',
+    'last_seen_complete', 'max_connections', 'max_download_speed', 'max_upload_slots', 'max_upload_speed',
+    'message', 'move_completed', 'move_completed_path', 'move_on_completed', 'move_on_completed_path', 'owner',
+    'paused', 'priority', 'prioritize_first_last', 'queue', 'remove_at_ratio', 'save_path', 'seed_mode',
+    'sequential_download', 'shared', 'state', 'stop_at_ratio', 'stop_ratio', 'super_seeding', 'tracker',
+    'tracker_host', 'tracker_status', 'trackers',
+])
+# The cache times in seconds of the static and slow keys, all other keys use SessionProxy.cache_time.
+STATIC_CACHE_TIME = 30.0
+SLOW_CACHE_TIME = 5.0
+
+# The keys to refetch after an event about the torrent.
+STATE_CHANGED_KEYS = ('is_finished', 'is_seed', 'message', 'paused', 'queue')
+FINISHED_KEYS = ('completed_time', 'is_finished', 'is_seed')
+FILE_RENAMED_KEYS = ('files', 'name')
+STORAGE_MOVED_KEYS = ('download_location', 'save_path')
+TRACKER_STATUS_KEYS = ('message', 'tracker', 'tracker_host')
+
+# Filter keys that can be matched against the cached status, except for the special values.
+LOCAL_FILTER_KEYS = ('owner', 'state', 'tracker_host')
+CORE_FILTER_VALUES = frozenset(['Active', 'Error'])
+
 
 class SessionProxy(component.Component):
     """
@@ -34,31 +64,55 @@ def __init__(self):
         # This is how long data will be valid before re-fetching from the core
         self.cache_time = 1.5
 
-        # Hold the torrents' status.. {torrent_id: [time, {status_dict}], ...}
-        self.torrents = {}
-
-        # Holds the time of the last key update.. {torrent_id: {key1, time, ...}, ...}
-        self.cache_times = {}
+        # Hold the torrents' status and the time of each key update
+        self.torrents = TorrentStatusCache()
+
+        # The cache time of the keys not using cache_time.. {key: seconds, ...}
+        self.key_cache_times = dict.fromkeys(STATIC_KEYS, STATIC_CACHE_TIME)
+        self.key_cache_times.update(dict.fromkeys(SLOW_KEYS, SLOW_CACHE_TIME))
+
+        self.event_handlers = {
+            'TorrentStateChangedEvent': self.on_torrent_state_changed,
+            'TorrentTrackerStatusEvent': self.on_torrent_tracker_status,
+            'TorrentRemovedEvent': self.on_torrent_removed,
+            'TorrentAddedEvent': self.on_torrent_added,
+            'TorrentFinishedEvent': self.on_torrent_finished,
+            'TorrentFileRenamedEvent': self.on_torrent_file_renamed,
+            'TorrentFolderRenamedEvent': self.on_torrent_folder_renamed,
+            'TorrentStorageMovedEvent': self.on_torrent_storage_moved,
+            'TorrentQueueChangedEvent': self.on_torrent_queue_changed,
+            'TorrentsChangedEvent': self.on_torrents_changed,
+        }
 
     def start(self):
-        client.register_event_handler('TorrentStateChangedEvent', self.on_torrent_state_changed)
-        client.register_event_handler('TorrentRemovedEvent', self.on_torrent_removed)
-        client.register_event_handler('TorrentAddedEvent', self.on_torrent_added)
+        for event, handler in self.event_handlers.items():
+            client.register_event_handler(event, handler)
 
         def on_get_session_state(torrent_ids):
             for torrent_id in torrent_ids:
                 # Let's at least store the torrent ids with empty statuses
                 # so that upcoming queries or status updates don't throw errors.
-                self.torrents.setdefault(torrent_id, [time(), {}])
-                self.cache_times.setdefault(torrent_id, {})
+                self.torrents.add(torrent_id, time())
             return torrent_ids
         return client.core.get_session_state().addCallback(on_get_session_state)
 
     def stop(self):
-        client.deregister_event_handler('TorrentStateChangedEvent', self.on_torrent_state_changed)
-        client.deregister_event_handler('TorrentRemovedEvent', self.on_torrent_removed)
-        client.deregister_event_handler('TorrentAddedEvent', self.on_torrent_added)
-        self.torrents = {}
+        for event, handler in self.event_handlers.items():
+            client.deregister_event_handler(event, handler)
+        self.torrents.clear()
+
+    def get_cache_time(self, key):
+        """
+        Get how long a key is valid before re-fetching it from the core.
+
+        :param key: the status key
+        :type key: string
+
+        :returns: the cache time in seconds
+        :rtype: float
+
+        """
+        return self.key_cache_times.get(key, self.cache_time)
 
     def create_status_dict(self, torrent_ids, keys):
         """
@@ -73,38 +127,7 @@ def create_status_dict(self, torrent_ids, keys):
         :rtype: dict
 
         """
-        sd = {}
-        keys = set(keys)
-        keys_len = -1  # The number of keys for the current cache (not the len of keys_diff_cached)
-        keys_diff_cached = []
-
-        for torrent_id in torrent_ids:
-            try:
-                if keys:
-                    sd[torrent_id] = self.torrents[torrent_id][1].copy()
-
-                    # Have to remove the keys that weren't requested
-                    if len(sd[torrent_id]) == keys_len:
-                        # If the number of keys are equal they are the same keys
-                        # so we use the cached diff of the keys we need to remove
-                        keys_to_remove = keys_diff_cached
-                    else:
-                        # Not the same keys so create a new diff
-                        keys_to_remove = set(sd[torrent_id].keys()) - keys
-                        # Update the cached diff
-                        keys_diff_cached = keys_to_remove
-                        keys_len = len(sd[torrent_id])
-
-                    # Usually there are no keys to remove, so it's cheaper with
-                    # this if-test than a for-loop with no iterations.
-                    if keys_to_remove:
-                        for k in keys_to_remove:
-                            del sd[torrent_id][k]
-                else:
-                    sd[torrent_id] = dict(self.torrents[torrent_id][1])
-            except KeyError:
-                continue
-        return sd
+        return self.torrents.get_status(torrent_ids, keys)
 
     def get_torrent_status(self, torrent_id, keys):
         """
@@ -120,14 +143,11 @@ def get_torrent_status(self, torrent_id, keys):
 
         """
         if torrent_id in self.torrents:
-            # Keep track of keys we need to request from the core
-            keys_to_get = []
             if not keys:
-                keys = list(self.torrents[torrent_id][1].keys())
+                keys = self.torrents.get_keys(torrent_id)
 
-            for key in keys:
-                if time() - self.cache_times[torrent_id].get(key, 0.0) > self.cache_time:
-                    keys_to_get.append(key)
+            # Keep track of keys we need to request from the core
+            keys_to_get = self.torrents.get_expired_keys(torrent_id, keys, time(), self.get_cache_time)
             if not keys_to_get:
                 return succeed(
                     self.create_status_dict([torrent_id], keys)[torrent_id]
@@ -137,10 +157,8 @@ def get_torrent_status(self, torrent_id, keys):
 
                 def on_status(result, torrent_id):
                     t = time()
-                    self.torrents[torrent_id][0] = t
-                    self.torrents[torrent_id][1].update(result)
-                    for key in keys_to_get:
-                        self.cache_times[torrent_id][key] = t
+                    self.torrents.touch(torrent_id, keys_to_get, t)
+                    self.torrents.update(torrent_id, result, t)
                     return self.create_status_dict([torrent_id], keys)[torrent_id]
                 return d.addCallback(on_status, torrent_id)
         else:
@@ -149,10 +167,8 @@ def on_status(result, torrent_id):
             def on_status(result):
                 if result:
                     t = time()
-                    self.torrents[torrent_id] = (t, result)
-                    self.cache_times[torrent_id] = {}
-                    for key in result:
-                        self.cache_times[torrent_id][key] = t
+                    self.torrents.add(torrent_id, t)
+                    self.torrents.update(torrent_id, result, t)
 
                 return result
             return d.addCallback(on_status)
@@ -175,85 +191,152 @@ def get_torrents_status(self, filter_dict, keys):
 
         """
         # Helper functions and callbacks ---------------------------------------
-        def on_status(result, torrent_ids, keys):
-            # Update the internal torrent status dict with the update values
+        def update_cache(result, keys):
+            # Update the internal torrent status with the update values, removed torrents are skipped
             t = time()
-            for key, value in list(result.items()):
-                try:
-                    self.torrents[key][0] = t
-                    self.torrents[key][1].update(value)
-                    for k in value:
-                        self.cache_times[key][k] = t
-                except KeyError:
-                    # The torrent was removed
-                    continue
+            for torrent_id, status in result.items():
+                self.torrents.touch(torrent_id, keys, t)
+                self.torrents.update(torrent_id, status, t)
 
-            # Create the status dict
-            if not torrent_ids:
-                torrent_ids = list(result.keys())
+        def on_status(result, keys):
+            update_cache(result, keys)
+            return self.create_status_dict(list(result.keys()), keys)
 
-            return self.create_status_dict(torrent_ids, keys)
-
-        def find_torrents_to_fetch(torrent_ids):
+        def find_torrents_to_fetch(torrent_ids, keys):
+            # Returns the torrents with expired keys and the expired keys, to fetch only those.
             to_fetch = []
+            keys_to_get = set()
             t = time()
             for torrent_id in torrent_ids:
-                torrent = self.torrents[torrent_id]
-                if t - torrent[0] > self.cache_time:
+                if torrent_id not in self.torrents:
+                    continue
+                if not keys:
+                    if t - self.torrents.get_fetch_time(torrent_id) > self.cache_time:
+                        to_fetch.append(torrent_id)
+                    continue
+
+                expired = self.torrents.get_expired_keys(torrent_id, keys, t, self.get_cache_time)
+                if expired:
                     to_fetch.append(torrent_id)
-                else:
-                    # We need to check if a key is expired
-                    for key in keys:
-                        if t - self.cache_times[torrent_id].get(key, 0.0) > self.cache_time:
-                            to_fetch.append(torrent_id)
-                            break
-
-            return to_fetch
+                    keys_to_get.update(expired)
+
+            return to_fetch, list(keys_to_get)
         # -----------------------------------------------------------------------
 
-        if not filter_dict:
-            # This means we want all the torrents status
-            # We get a list of any torrent_ids with expired status dicts
-            to_fetch = find_torrents_to_fetch(list(self.torrents.keys()))
-            if to_fetch:
-                d = client.core.get_torrents_status({'id': to_fetch}, keys, True)
-                return d.addCallback(on_status, list(self.torrents.keys()), keys)
-
-            # Don't need to fetch anything
-            return maybeDeferred(self.create_status_dict, list(self.torrents.keys()), keys)
-
-        if len(filter_dict) == 1 and 'id' in filter_dict:
-            # At this point we should have a filter with just "id" in it
-            to_fetch = find_torrents_to_fetch(filter_dict['id'])
-            if to_fetch:
-                d = client.core.get_torrents_status({'id': to_fetch}, keys, True)
-                return d.addCallback(on_status, filter_dict['id'], keys)
-            else:
-                # Don't need to fetch anything, so just return data from the cache
-                return maybeDeferred(self.create_status_dict, filter_dict['id'], keys)
-        else:
+        local_filter = self.get_local_filter(filter_dict)
+        if local_filter is None:
             # This is a keyworded filter so lets just pass it onto the core
-            # XXX: Add more caching here.
             d = client.core.get_torrents_status(filter_dict, keys, True)
-            return d.addCallback(on_status, None, keys)
+            return d.addCallback(on_status, keys)
+
+        # The no filter and 'id' filter queries, and filters that can be matched
+        # against the cache, only fetch the expired keys of the expired torrents.
+        torrent_ids = filter_dict.get('id', list(self.torrents))
+        fetch_keys = list(keys)
+        if keys:
+            fetch_keys.extend(key for key in local_filter if key not in keys)
+        to_fetch, keys_to_get = find_torrents_to_fetch(torrent_ids, fetch_keys)
+
+        def create_status_dict(result=None):
+            if result:
+                update_cache(result, keys_to_get)
+            if local_filter:
+                return self.create_status_dict(self.filter_torrent_ids(torrent_ids, local_filter), keys)
+            return self.create_status_dict(torrent_ids, keys)
+
+        if to_fetch:
+            d = client.core.get_torrents_status({'id': to_fetch}, keys_to_get, True)
+            return d.addCallback(create_status_dict)
+
+        # Don't need to fetch anything, so just return data from the cache
+        return maybeDeferred(create_status_dict)
+
+    def get_local_filter(self, filter_dict):
+        """
+        Get the filters of a query that can be matched against the cached status.
+
+        :param filter_dict: the filter of the query, see get_torrents_status
+        :type filter_dict: dict
+
+        :returns: the accepted values of each key, except *id*, or None if
+            the filter can only be applied by the core
+        :rtype: dict
+
+        """
+        local_filter = {}
+        for key, values in filter_dict.items():
+            if key == 'id':
+                continue
+            if key not in LOCAL_FILTER_KEYS:
+                return None
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+            if CORE_FILTER_VALUES.intersection(values):
+                return None
+            local_filter[key] = set(values)
+        return local_filter
+
+    def filter_torrent_ids(self, torrent_ids, local_filter):
+        """
+        Filter torrents by their cached status.
+
+        :param torrent_ids: the torrent_ids
+        :type torrent_ids: list of strings
+        :param local_filter: the accepted values of each key, see get_local_filter
+        :type local_filter: dict
+
+        :returns: the matching torrent_ids
+        :rtype: list of strings
+
+        """
+        matches = []
+        for torrent_id in torrent_ids:
+            if torrent_id not in self.torrents:
+                continue
+            for key, values in local_filter.items():
+                if self.torrents.get_value(torrent_id, key) not in values:
+                    break
+            else:
+                matches.append(torrent_id)
+        return matches
 
     def on_torrent_state_changed(self, torrent_id, state):
-        if torrent_id in self.torrents:
-            self.torrents[torrent_id][1].setdefault('state', state)
-            self.cache_times.setdefault(torrent_id, {}).update(state=time())
+        t = time()
+        self.torrents.touch(torrent_id, ['state'], t)
+        self.torrents.update(torrent_id, {'state': state}, t)
+        self.torrents.invalidate(torrent_id, STATE_CHANGED_KEYS)
+
+    def on_torrent_tracker_status(self, torrent_id, status):
+        t = time()
+        self.torrents.touch(torrent_id, ['tracker_status'], t)
+        self.torrents.update(torrent_id, {'tracker_status': status}, t)
+        self.torrents.invalidate(torrent_id, TRACKER_STATUS_KEYS)
+
+    def on_torrent_finished(self, torrent_id):
+        self.torrents.invalidate(torrent_id, FINISHED_KEYS)
+
+    def on_torrent_file_renamed(self, torrent_id, index, name):
+        self.torrents.invalidate(torrent_id, FILE_RENAMED_KEYS)
+
+    def on_torrent_folder_renamed(self, torrent_id, old, new):
+        self.torrents.invalidate(torrent_id, FILE_RENAMED_KEYS)
+
+    def on_torrent_storage_moved(self, torrent_id, path):
+        self.torrents.invalidate(torrent_id, STORAGE_MOVED_KEYS)
+
+    def on_torrent_queue_changed(self):
+        self.torrents.invalidate_all(['queue'])
+
+    def on_torrents_changed(self, torrent_ids, keys):
+        for torrent_id in torrent_ids:
+            self.torrents.invalidate(torrent_id, keys)
 
     def on_torrent_added(self, torrent_id, from_state):
-        self.torrents[torrent_id] = [time() - self.cache_time - 1, {}]
-        self.cache_times[torrent_id] = {}
+        self.torrents.add(torrent_id, time() - self.cache_time - 1)
 
         def on_status(status):
-            self.torrents[torrent_id][1].update(status)
-            t = time()
-            for key in status:
-                self.cache_times[torrent_id][key] = t
+            self.torrents.update(torrent_id, status, time())
         client.core.get_torrent_status(torrent_id, []).addCallback(on_status)
 
     def on_torrent_removed(self, torrent_id):
-        if torrent_id in self.torrents:
-            del self.torrents[torrent_id]
-            del self.cache_times[torrent_id]
+        self.torrents.remove(torrent_id)
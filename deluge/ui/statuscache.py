@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Deluge and is licensed under GNU General Public License 3.0, or later, with
+# the additional special exception to link portions of this program with the OpenSSL library.
+# See LICENSE for more details.
+#
+
+"""Columnar client-side torrent status storage used by SessionProxy.
+
+Attributes:
+    NOT_CACHED (float): The update time of a key that is not cached, older than any time.
+
+"""
+
+import logging
+from array import array
+from sys import intern
+
+log = logging.getLogger(__name__)
+
+NOT_CACHED = float('-inf')
+
+# Marks a column value that is not cached.
+_MISSING = object()
+
+
+class TorrentStatusCache(object):
+    """A columnar cache of the status of the torrents in the session.
+
+    Each torrent is assigned a slot and every status key is stored as a column
+    (a list indexed by slot), with the update time of the key in a parallel
+    array of floats, instead of a status dict and a dict of update times per
+    torrent. String values are interned so the few distinct values of keys
+    such as state, tracker_host and owner are stored once.
+
+    Attributes:
+        slots (dict): Maps torrent_id to slot index.
+        torrent_ids (list): The torrent_id in each slot, None for a free slot.
+        fetch_times (array): The time each slot's status was last fetched.
+        columns (dict): Maps status key to the list of values indexed by slot.
+        key_times (dict): Maps status key to the array of update times indexed by slot.
+
+    """
+    def __init__(self):
+        self.slots = {}
+        self.torrent_ids = []
+        self.free_slots = []
+        self.fetch_times = array('d')
+        self.columns = {}
+        self.key_times = {}
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, torrent_id):
+        return torrent_id in self.slots
+
+    def __iter__(self):
+        return iter(self.slots)
+
+    def add(self, torrent_id, fetch_time):
+        """Assign a slot to a torrent, without any cached keys.
+
+        Args:
+            torrent_id (str): The torrent_id.
+            fetch_time (float): The time to set as the last fetch of the torrent.
+
+        Returns:
+            int: The slot index.
+
+        """
+        if torrent_id in self.slots:
+            return self.slots[torrent_id]
+
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.torrent_ids[slot] = torrent_id
+            self.fetch_times[slot] = fetch_time
+        else:
+            slot = len(self.torrent_ids)
+            self.torrent_ids.append(torrent_id)
+            self.fetch_times.append(fetch_time)
+            for column in self.columns.values():
+                column.append(_MISSING)
+            for times in self.key_times.values():
+                times.append(NOT_CACHED)
+
+        self.slots[torrent_id] = slot
+        return slot
+
+    def remove(self, torrent_id):
+        """Release the slot of a torrent.
+
+        Args:
+            torrent_id (str): The torrent_id.
+
+        """
+        slot = self.slots.pop(torrent_id, None)
+        if slot is None:
+            return
+
+        self.torrent_ids[slot] = None
+        for column in self.columns.values():
+            column[slot] = _MISSING
+        for times in self.key_times.values():
+            times[slot] = NOT_CACHED
+        self.free_slots.append(slot)
+
+    def clear(self):
+        """Remove all torrents and columns"""
+        self.__init__()
+
+    def _get_column(self, key):
+        column = self.columns.get(key)
+        if column is None:
+            column = self.columns[key] = [_MISSING] * len(self.torrent_ids)
+            self.key_times[key] = array('d', [NOT_CACHED]) * len(self.torrent_ids)
+        return column
+
+    def update(self, torrent_id, status, update_time):
+        """Store changed keys of a torrent, use `touch` to also record a fetch of the torrent.
+
+        Args:
+            torrent_id (str): The torrent_id, skipped if not in the cache.
+            status (dict): The changed keys and their values.
+            update_time (float): The time the keys were fetched.
+
+        """
+        slot = self.slots.get(torrent_id)
+        if slot is None:
+            return
+
+        for key, value in status.items():
+            if type(value) is str:
+                value = intern(value)
+            self._get_column(key)[slot] = value
+            self.key_times[key][slot] = update_time
+
+    def touch(self, torrent_id, keys, update_time):
+        """Record a fetch of keys of a torrent, including keys the core omitted from a diff as unchanged.
+
+        Args:
+            torrent_id (str): The torrent_id, skipped if not in the cache.
+            keys (list of str): The status keys.
+            update_time (float): The time the keys were fetched.
+
+        """
+        slot = self.slots.get(torrent_id)
+        if slot is None:
+            return
+
+        self.fetch_times[slot] = update_time
+        for key in keys:
+            self._get_column(key)
+            self.key_times[key][slot] = update_time
+
+    def invalidate(self, torrent_id, keys):
+        """Expire cached keys of a torrent, the values are kept until updated.
+
+        Args:
+            torrent_id (str): The torrent_id, skipped if not in the cache.
+            keys (list of str): The status keys.
+
+        """
+        slot = self.slots.get(torrent_id)
+        if slot is None:
+            return
+
+        for key in keys:
+            times = self.key_times.get(key)
+            if times is not None:
+                times[slot] = NOT_CACHED
+
+    def invalidate_all(self, keys):
+        """Expire cached keys of all the torrents.
+
+        Args:
+            keys (list of str): The status keys.
+
+        """
+        for key in keys:
+            if key in self.key_times:
+                self.key_times[key] = array('d', [NOT_CACHED]) * len(self.torrent_ids)
+
+    def get_fetch_time(self, torrent_id):
+        """Get the time the status of a torrent was last fetched.
+
+        Args:
+            torrent_id (str): The torrent_id.
+
+        Returns:
+            float: The time.
+
+        Raises:
+            KeyError: If the torrent is not in the cache.
+
+        """
+        return self.fetch_times[self.slots[torrent_id]]
+
+    def get_expired_keys(self, torrent_id, keys, now, get_cache_time):
+        """Get the keys of a torrent that are not cached or older than their cache time.
+
+        Args:
+            torrent_id (str): The torrent_id.
+            keys (list of str): The status keys.
+            now (float): The current time.
+            get_cache_time (func): Called with a key, returns its cache time in seconds.
+
+        Returns:
+            list of str: The expired keys.
+
+        Raises:
+            KeyError: If the torrent is not in the cache.
+
+        """
+        slot = self.slots[torrent_id]
+        key_times = self.key_times
+        expired = []
+        for key in keys:
+            times = key_times.get(key)
+            if times is None or now - times[slot] > get_cache_time(key):
+                expired.append(key)
+        return expired
+
+    def get_keys(self, torrent_id):
+        """Get the cached keys of a torrent.
+
+        Args:
+            torrent_id (str): The torrent_id.
+
+        Returns:
+            list of str: The keys with a cached value.
+
+        Raises:
+            KeyError: If the torrent is not in the cache.
+
+        """
+        slot = self.slots[torrent_id]
+        return [key for key, column in self.columns.items() if column[slot] is not _MISSING]
+
+    def get_value(self, torrent_id, key, default=None):
+        """Get a cached value of a torrent.
+
+        Args:
+            torrent_id (str): The torrent_id.
+            key (str): The status key.
+            default (object, optional): Returned if the torrent or key is not cached.
+
+        Returns:
+            object: The value.
+
+        """
+        slot = self.slots.get(torrent_id)
+        column = self.columns.get(key)
+        if slot is None or column is None or column[slot] is _MISSING:
+            return default
+        return column[slot]
+
+    def get_status(self, torrent_ids, keys=None):
+        """Get the cached status of torrents, built from the requested columns only.
+
+        Args:
+            torrent_ids (list of str): The torrent_ids, any not in the cache are skipped.
+            keys (list of str, optional): The status keys, all cached keys if not set.
+
+        Returns:
+            dict: A status dict for each torrent, {torrent_id: {key: value, ...}, ...}.
+
+        """
+        slots = self.slots
+        if keys:
+            items = [(key, self.columns[key]) for key in keys if key in self.columns]
+        else:
+            items = list(self.columns.items())
+
+        status_dict = {}
+        for torrent_id in torrent_ids:
+            slot = slots.get(torrent_id)
+            if slot is None:
+                continue
+            status = {}
+            for key, column in items:
+                value = column[slot]
+                if value is not _MISSING:
+                    status[key] = value
+            status_dict[torrent_id] = status
+        return status_dict
@@ -29,13 +29,17 @@ def escape(text):
     return text
 
 
-def compress(contents, request):
-    request.setHeader('content-encoding', 'gzip')
-    compress_zlib = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS + 16, zlib.DEF_MEM_LEVEL, 0)
+def gzip_data(contents, level=6):
+    compress_zlib = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS + 16, zlib.DEF_MEM_LEVEL, 0)
     contents = compress_zlib.compress(contents)
     contents += compress_zlib.flush()
     return contents
 
+
+def compress(contents, request):
+    request.setHeader('content-encoding', 'gzip')
+    return gzip_data(contents)
+
 try:
     # This is beeing done like this in order to allow tests to use the above
     # `compress` without requiring Mako to be instaled
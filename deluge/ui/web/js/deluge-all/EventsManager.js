@@ -44,6 +44,16 @@ Deluge.EventsManager = Ext.extend(Ext.util.Observable, {
         });
     },
 
+    /**
+     * Receive the events as they arrive from the json/events stream if the
+     * browser supports server-sent events, otherwise by long polling get_events.
+     */
+    startStream: function() {
+        this.source = new EventSource(deluge.config.base + 'json/events');
+        this.source.onmessage = this.onStreamMessage.createDelegate(this);
+        this.source.onerror = this.onStreamError.createDelegate(this);
+    },
+
     /**
      * Starts the EventsManagerManager checking for events.
      */
@@ -53,7 +63,11 @@ Deluge.EventsManager = Ext.extend(Ext.util.Observable, {
         });
         this.running = true;
         this.errorCount = 0;
-        this.getEvents();
+        if (window.EventSource) {
+            this.startStream();
+        } else {
+            this.getEvents();
+        }
     },
 
     /**
@@ -61,6 +75,10 @@ Deluge.EventsManager = Ext.extend(Ext.util.Observable, {
      */
     stop: function() {
         this.running = false;
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
     },
 
     // private
@@ -68,18 +86,38 @@ Deluge.EventsManager = Ext.extend(Ext.util.Observable, {
         this.start();
     },
 
+    // private
+    fireEvents: function(events) {
+        Ext.each(events, function(event) {
+            var name = event[0], args = event[1];
+            args.splice(0, 0, name);
+            this.fireEvent.apply(this, args);
+        }, this);
+    },
+
     onGetEventsSuccess: function(events) {
         if (!this.running) return;
         if (events) {
-            Ext.each(events, function(event) {
-                var name = event[0], args = event[1];
-                args.splice(0, 0, name);
-                this.fireEvent.apply(this, args);
-            }, this);
+            this.fireEvents(events);
         }
         this.getEvents();
     },
 
+    // private
+    onStreamMessage: function(message) {
+        if (!this.running) return;
+        this.errorCount = 0;
+        this.fireEvents(Ext.decode(message.data));
+    },
+
+    // private
+    onStreamError: function() {
+        // The browser reconnects the stream unless it was refused, fall back to polling then.
+        if (!this.running || this.source.readyState != EventSource.CLOSED) return;
+        this.source = null;
+        this.getEvents();
+    },
+
     // private
     onGetEventsFailure: function(result, error) {
         // the request timed out or we had a communication failure
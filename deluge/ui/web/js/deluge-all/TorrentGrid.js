@@ -382,7 +382,14 @@
         return ids;
     },
 
-    update: function(torrents, wipe) {
+    /**
+     * Update the torrents in the grid.
+     * @param {Object} torrents The status of the torrents, by torrent id.
+     * @param {Boolean} wipe Remove all the torrents first.
+     * @param {Array} removed If set, torrents only contains the changed torrents
+     * and keys, and these torrent ids are removed.
+     */
+    update: function(torrents, wipe, removed) {
         var store = this.getStore();
 
         // Need to perform a complete reload of the torrent grid.
@@ -416,12 +423,20 @@
         store.add(newTorrents);
 
         // Remove any torrents that should not be in the store.
-        store.each(function(record) {
-            if (!torrents[record.id]) {
-                store.remove(record);
-                delete this.torrents[record.id];
-            }
-        }, this);
+        if (removed) {
+            Ext.each(removed, function(torrentId) {
+                var record = store.getById(torrentId);
+                if (record) store.remove(record);
+                delete this.torrents[torrentId];
+            }, this);
+        } else {
+            store.each(function(record) {
+                if (!torrents[record.id]) {
+                    store.remove(record);
+                    delete this.torrents[record.id];
+                }
+            }, this);
+        }
         store.commitChanges();
 
         var sortState = store.getSortState()
@@ -44,6 +44,10 @@ deluge.ui = {
 
     filters: null,
 
+    // The update_id of the last update_ui response, the server sends the
+    // torrents changed since this update.
+    updateId: 0,
+
     /**
      * @description Create all the interface components, the json-rpc client
      * and set up various events that the UI will utilise.
@@ -133,7 +137,7 @@ deluge.ui = {
         this.oldFilters = this.filters;
         this.filters = filters;
 
-        deluge.client.web.update_ui(Deluge.Keys.Grid, filters, {
+        deluge.client.web.update_ui(Deluge.Keys.Grid, filters, this.updateId, true, {
             success: this.onUpdate,
             failure: this.onUpdateError,
             scope: this
@@ -173,6 +177,30 @@ deluge.ui = {
         this.errorCount++;
     },
 
+    /**
+     * @static
+     * @private
+     * Converts the tabular torrents of update_ui to the status of each torrent.
+     */
+    unpackTorrents: function(packed) {
+        var keys = packed['keys'], torrents = {};
+        Ext.each(packed['ids'], function(torrentId, index) {
+            var row = packed['rows'][index], torrent = {};
+            for (var i = 0; i < keys.length; i++) {
+                torrent[keys[i]] = row[i];
+            }
+            torrents[torrentId] = torrent;
+        });
+        Ext.each(packed['updates'], function(update) {
+            var torrent = {};
+            for (var i = 1; i < update.length; i += 2) {
+                torrent[keys[update[i]]] = update[i + 1];
+            }
+            torrents[update[0]] = torrent;
+        });
+        return torrents;
+    },
+
     /**
      * @static
      * @private
@@ -189,10 +217,17 @@ deluge.ui = {
                 ' U: ' + fsize_short(data['stats'].upload_rate, true) + ' - ' +
                 this.originalTitle;
         }
-        if (Ext.areObjectsEqual(this.filters, this.oldFilters)) {
-            deluge.torrents.update(data['torrents']);
-        } else {
-            deluge.torrents.update(data['torrents'], true);
+        // The torrents are missing if getting them failed, keep the last ones.
+        if (data['torrents']) {
+            this.updateId = data['update_id'];
+            data['torrents'] = this.unpackTorrents(data['torrents']);
+            if (data['torrents_diff']) {
+                deluge.torrents.update(data['torrents'], false, data['torrents_removed']);
+            } else if (Ext.areObjectsEqual(this.filters, this.oldFilters)) {
+                deluge.torrents.update(data['torrents']);
+            } else {
+                deluge.torrents.update(data['torrents'], true);
+            }
         }
         deluge.statusbar.update(data['stats']);
         deluge.sidebar.update(data['filters']);
@@ -277,6 +312,7 @@ deluge.ui = {
         if (this.running) {
             clearInterval(this.running);
             this.running = false;
+            this.updateId = 0;
             deluge.torrents.getStore().removeAll();
         }
     }
@@ -17,10 +17,14 @@
 import shutil
 import tempfile
 import time
+import zlib
+from collections import deque
+from itertools import chain
 from types import FunctionType
 
 from twisted.internet import defer, reactor
 from twisted.internet.defer import Deferred, DeferredList
+from twisted.internet.task import LoopingCall
 from twisted.web import http, resource, server
 
 from deluge import common, component, httpdownloader
@@ -37,6 +41,129 @@
 AUTH_LEVEL_DEFAULT = None
 AuthError = None
 
+# Responses whose JSON exceeds this size are streamed gzip compressed in chunks of this size.
+STREAM_CHUNK_SIZE = 64 * 1024
+# The nesting depth of the dicts and lists encoded item by item, which is the
+# result dict, the torrents dict and the torrent status dicts of update_ui.
+STREAM_ENCODE_DEPTH = 3
+
+
+def get_json_dumps(name):
+    """
+    Get the function encoding JSON with a JSON library.
+
+    :param name: the library, json, ujson or orjson
+    :type name: string
+
+    :returns: the function returning the JSON of an object as a string, the
+        json module one if the library is not installed
+    :rtype: function
+    """
+    if name == 'ujson':
+        try:
+            import ujson
+        except ImportError:
+            pass
+        else:
+            return ujson.dumps
+    elif name == 'orjson':
+        try:
+            import orjson
+        except ImportError:
+            pass
+        else:
+            return lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf8')
+
+    if name != 'json':
+        log.warning('The JSON library %s is not available, using json instead', name)
+    return json.dumps
+
+
+def iter_json(obj, dumps=json.dumps, depth=STREAM_ENCODE_DEPTH):
+    """
+    Encode an object as JSON in chunks, the dicts, lists and tuples nested up
+    to depth are encoded item by item and the items with dumps.
+
+    :param obj: the object to encode
+    :type obj: object
+    :param dumps: the function encoding the items
+    :type dumps: function
+    :param depth: the nesting depth of the containers encoded item by item
+    :type depth: int
+
+    :returns: the JSON chunks
+    :rtype: generator of strings
+    """
+    if depth and isinstance(obj, dict):
+        separator = '{'
+        for key, value in obj.items():
+            # Keys which are not strings are converted like json.dumps does.
+            key = dumps(key if isinstance(key, str) else dumps(key))
+            yield separator + key + ': '
+            for chunk in iter_json(value, dumps, depth - 1):
+                yield chunk
+            separator = ', '
+        yield '}' if obj else '{}'
+    elif depth and isinstance(obj, (list, tuple)):
+        separator = '['
+        for value in obj:
+            yield separator
+            for chunk in iter_json(value, dumps, depth - 1):
+                yield chunk
+            separator = ', '
+        yield ']' if obj else '[]'
+    else:
+        yield dumps(obj)
+
+
+class JSONResponseProducer(object):
+    """
+    A pull producer writing the JSON chunks of a response gzip compressed to
+    the request, only as fast as the transport sends them.
+    """
+
+    def __init__(self, request, chunks):
+        self.request = request
+        self.chunks = chunks
+        self.compress_zlib = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS + 16, zlib.DEF_MEM_LEVEL, 0)
+
+    def start(self):
+        self.request.setHeader('content-encoding', 'gzip')
+        self.request.registerProducer(self, False)
+
+    def resumeProducing(self):  # NOQA: N802
+        if self.chunks is None:
+            return
+
+        data = []
+        size = 0
+        try:
+            for chunk in self.chunks:
+                data.append(chunk)
+                size += len(chunk)
+                if size >= STREAM_CHUNK_SIZE:
+                    # Flush so that each call writes data and is followed by another.
+                    data = self.compress_zlib.compress(''.join(data).encode('utf8'))
+                    self.request.write(data + self.compress_zlib.flush(zlib.Z_SYNC_FLUSH))
+                    return
+            data = self.compress_zlib.compress(''.join(data).encode('utf8'))
+        except Exception as ex:
+            # The headers and part of the response are sent, so only the connection can be dropped.
+            log.error('Error encoding the JSON response: %s', ex)
+            self.chunks = None
+            self.request.unregisterProducer()
+            self.request.loseConnection()
+            return
+
+        self.request.write(data + self.compress_zlib.flush())
+        self.chunks = None
+        self.request.unregisterProducer()
+        self.request.finish()
+
+    def stopProducing(self):  # NOQA: N802
+        # The connection was lost.
+        self.chunks = None
+
 
 class JSONComponent(component.Component):
     def __init__(self, name, interval=1, depend=None):
@@ -90,6 +217,8 @@ def __init__(self):
         component.Component.__init__(self, 'JSON')
         self._remote_methods = []
         self._local_methods = {}
+        self.dumps = json.dumps
+        self.putChild('events', EventStream())
         if client.is_standalone():
             self.get_remote_methods()
 
@@ -209,12 +338,32 @@ def _on_json_request_failed(self, reason, request):
                               'message': '%s: %s' % (reason.__class__.__name__, str(reason))}}
         return self._send_response(request, response)
 
+    def set_json_library(self, name):
+        """
+        Set the library encoding the responses.
+
+        :param name: the library, json, ujson or orjson
+        :type name: string
+        """
+        self.dumps = get_json_dumps(name)
+
     def _send_response(self, request, response):
         if request._disconnected:
             return ''
-        response = json.dumps(response)
         request.setHeader('content-type', 'application/x-json')
-        request.write(compress(response, request))
+
+        # Large responses are streamed rather than encoded and compressed at once.
+        chunks = iter_json(response, self.dumps)
+        data = []
+        size = 0
+        for chunk in chunks:
+            data.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_CHUNK_SIZE:
+                JSONResponseProducer(request, chain(data, chunks)).start()
+                return server.NOT_DONE_YET
+
+        request.write(compress(''.join(data), request))
         request.finish()
         return server.NOT_DONE_YET
 
@@ -272,10 +421,104 @@ def register_object(self, obj, name=None):
 FILES_KEYS = ['files', 'file_progress', 'file_priorities']
 
 
+def pack_torrents(torrents, keys, previous=None):
+    """
+    Pack the status of torrents in the tabular format of update_ui, which lists
+    the keys once instead of in the status dict of every torrent.
+
+    :param torrents: the status of the torrents, {torrent_id: status}, only
+        the changed keys for the torrents in previous
+    :type torrents: dict
+    :param keys: the status keys, all the keys of the torrents if empty
+    :type keys: list
+    :param previous: the torrents of the update the changes apply to
+    :type previous: dict
+
+    :returns: {'keys': [key, ...], 'ids': [torrent_id, ...], 'rows': [[value, ...], ...],
+        'updates': [[torrent_id, column, value, column, value, ...], ...]} with a row
+        of values, in the order of the keys, for each of ids and an update of the
+        changed columns for each torrent in previous
+    :rtype: dict
+    """
+    if not keys:
+        keys = sorted(set(key for status in torrents.values() for key in status))
+    columns = dict((key, index) for index, key in enumerate(keys))
+
+    ids = []
+    rows = []
+    updates = []
+    for torrent_id, status in torrents.items():
+        if previous is not None and torrent_id in previous:
+            update = [torrent_id]
+            for key, value in status.items():
+                if key in columns:
+                    update.extend((columns[key], value))
+            updates.append(update)
+        else:
+            ids.append(torrent_id)
+            rows.append([status.get(key) for key in keys])
+    return {'keys': keys, 'ids': ids, 'rows': rows, 'updates': updates}
+
+
+def merge_status_updates(args, new_args):
+    """
+    Merge the arguments of two TorrentsStatusUpdateEvents into one.
+
+    :param args: the status and removed torrent_ids of the queued event
+    :type args: tuple
+    :param new_args: the status and removed torrent_ids of the new event
+    :type new_args: tuple
+
+    :returns: the merged status and removed torrent_ids
+    :rtype: tuple
+    """
+    status, removed = args
+    new_status, new_removed = new_args
+    merged = dict((torrent_id, dict(torrent_status)) for torrent_id, torrent_status in status.items())
+    for torrent_id, torrent_status in new_status.items():
+        merged.setdefault(torrent_id, {}).update(torrent_status)
+    for torrent_id in new_removed:
+        merged.pop(torrent_id, None)
+    removed = [torrent_id for torrent_id in removed if torrent_id not in new_status]
+    removed.extend(torrent_id for torrent_id in new_removed if torrent_id not in removed)
+    return merged, removed
+
+
+# The most events queued for a listener, the oldest are dropped when it is full.
+MAX_QUEUED_EVENTS = 1000
+# How long get_events waits for events before returning None.
+EVENTS_TIMEOUT = 5.0
+# The interval of the comment lines keeping the event streams open.
+STREAM_KEEPALIVE_INTERVAL = 15.0
+# The minimum interval of the TorrentsStatusUpdateEvents sent to the subscribed sessions.
+STATUS_UPDATE_INTERVAL = 2.0
+# How long the results of the daemon calls of update_ui are shared between the web sessions.
+UI_CACHE_TIME = 1.0
+# How long the last torrents sent by update_ui are kept to diff the next update of the session.
+UI_SESSION_TIMEOUT = 60.0
+# Events that replace a queued event with the same name and leading arguments,
+# {event: number of arguments identifying the event}, as only the latest is relevant.
+COALESCED_EVENTS = {
+    'ConfigValueChangedEvent': 1,
+    'SessionLoadingProgressEvent': 0,
+    'TorrentQueueChangedEvent': 0,
+    'TorrentStateChangedEvent': 1,
+}
+# Events merged into a queued event with the same name, {event: merge(args, new_args)}.
+MERGED_EVENTS = {
+    'TorrentsStatusUpdateEvent': merge_status_updates,
+}
+
+
 class EventQueue(object):
     """
     This class subscribes to events from the core and stores them until all
     the subscribed listeners have received the events.
+
+    The events are delivered as soon as they arrive, to the pending get_events
+    requests and the event streams of the listener, instead of polling the queue.
+    The queue of each listener is bounded by MAX_QUEUED_EVENTS, and events in
+    COALESCED_EVENTS or MERGED_EVENTS replace or update the queued event.
     """
 
     def __init__(self):
@@ -283,6 +526,10 @@ def __init__(self):
         self.__handlers = {}
         self.__queue = {}
         self.__requests = {}
+        self.__streams = {}
+        self.__flush_calls = {}
+        self.__last_seen = {}
+        self.__keepalive = LoopingCall(self._send_keepalive)
 
     def add_listener(self, listener_id, event):
         """
@@ -293,13 +540,12 @@ def add_listener(self, listener_id, event):
         :param event: The event name
         :type event: string
         """
+        self.__last_seen[listener_id] = reactor.seconds()
         if event not in self.__events:
 
             def on_event(*args):
                 for listener in self.__events[event]:
-                    if listener not in self.__queue:
-                        self.__queue[listener] = []
-                    self.__queue[listener].append((event, args))
+                    self.push_event(listener, event, args)
 
             client.register_event_handler(event, on_event)
             self.__handlers[event] = on_event
@@ -307,37 +553,119 @@ def on_event(*args):
         elif listener_id not in self.__events[event]:
             self.__events[event].append(listener_id)
 
+    def push_event(self, listener_id, event, args):
+        """
+        Queue an event for a listener, applying the coalesce and merge policies.
+
+        :param listener_id: A unique id for the listener
+        :type listener_id: string
+        :param event: The event name
+        :type event: string
+        :param args: The event arguments
+        :type args: tuple
+        """
+        queue = self.__queue.setdefault(listener_id, deque())
+        if event in COALESCED_EVENTS or event in MERGED_EVENTS:
+            key_count = COALESCED_EVENTS.get(event, 0)
+            for index, (queued_event, queued_args) in enumerate(queue):
+                if queued_event == event and queued_args[:key_count] == args[:key_count]:
+                    del queue[index]
+                    if event in MERGED_EVENTS:
+                        args = MERGED_EVENTS[event](queued_args, args)
+                    break
+
+        if len(queue) >= MAX_QUEUED_EVENTS:
+            dropped_event = queue.popleft()[0]
+            log.debug('Event queue of listener %s is full, dropped %s', listener_id, dropped_event)
+        queue.append((event, args))
+
+        if (listener_id in self.__requests or listener_id in self.__streams) and \
+                listener_id not in self.__flush_calls:
+            # Deliver all the events arriving in this reactor iteration together.
+            self.__flush_calls[listener_id] = reactor.callLater(0, self._flush, listener_id)
+
+    def _flush(self, listener_id):
+        self.__flush_calls.pop(listener_id, None)
+        requests = self.__requests.pop(listener_id, [])
+        streams = self.__streams.get(listener_id, [])
+        if not (requests or streams) or listener_id not in self.__queue:
+            return
+
+        events = list(self.__queue.pop(listener_id))
+        self.__last_seen[listener_id] = reactor.seconds()
+        for d, timeout in requests:
+            timeout.cancel()
+            d.callback(events)
+        if streams:
+            data = ('data: %s\n\n' % json.dumps(events)).encode('utf8')
+            for request in streams:
+                request.write(data)
+
     def get_events(self, listener_id):
         """
         Retrieve the pending events for the listener.
 
         :param listener_id: A unique id for the listener
         :type listener_id: string
-        """
 
+        :returns: the events, or a deferred firing with the events when they
+            arrive or with None after EVENTS_TIMEOUT seconds.
+        """
+        self.__last_seen[listener_id] = reactor.seconds()
         # Check to see if we have anything to return immediately
         if listener_id in self.__queue:
-            queue = self.__queue[listener_id]
-            del self.__queue[listener_id]
-            return queue
+            return list(self.__queue.pop(listener_id))
 
-        # Create a deferred to and check again in 100ms
         d = Deferred()
-        reactor.callLater(0.1, self._get_events, listener_id, 0, d)
+        timeout = reactor.callLater(EVENTS_TIMEOUT, self._on_get_events_timeout, listener_id, d)
+        self.__requests.setdefault(listener_id, []).append((d, timeout))
         return d
 
-    def _get_events(self, listener_id, count, d):
-        if listener_id in self.__queue:
-            queue = self.__queue[listener_id]
-            del self.__queue[listener_id]
-            d.callback(queue)
-        else:
-            # Prevent this loop going on indefinitely incase a client leaves
-            # the page or disconnects uncleanly.
-            if count >= 50:
-                d.callback(None)
-            else:
-                reactor.callLater(0.1, self._get_events, listener_id, count + 1, d)
+    def _on_get_events_timeout(self, listener_id, d):
+        # Prevent waiting indefinitely incase a client leaves the page or disconnects uncleanly.
+        requests = [request for request in self.__requests.pop(listener_id, []) if request[0] is not d]
+        if requests:
+            self.__requests[listener_id] = requests
+        self.__last_seen[listener_id] = reactor.seconds()
+        d.callback(None)
+
+    def add_stream(self, listener_id, request):
+        """
+        Stream the events of the listener to a request, as server-sent events.
+
+        :param listener_id: A unique id for the listener
+        :type listener_id: string
+        :param request: The request of the event stream
+        :type request: twisted.web.http.Request
+        """
+        self.__streams.setdefault(listener_id, []).append(request)
+        if not self.__keepalive.running:
+            self.__keepalive.start(STREAM_KEEPALIVE_INTERVAL, now=False)
+        if listener_id in self.__queue and listener_id not in self.__flush_calls:
+            self.__flush_calls[listener_id] = reactor.callLater(0, self._flush, listener_id)
+
+    def remove_stream(self, listener_id, request):
+        """
+        Stop streaming the events of the listener to a request.
+
+        :param listener_id: A unique id for the listener
+        :type listener_id: string
+        :param request: The request of the event stream
+        :type request: twisted.web.http.Request
+        """
+        streams = self.__streams.get(listener_id, [])
+        if request in streams:
+            streams.remove(request)
+        if not streams:
+            self.__streams.pop(listener_id, None)
+        self.__last_seen[listener_id] = reactor.seconds()
+        if not self.__streams and self.__keepalive.running:
+            self.__keepalive.stop()
+
+    def _send_keepalive(self):
+        for streams in self.__streams.values():
+            for request in streams:
+                request.write(b': keepalive\n\n')
 
     def remove_listener(self, listener_id, event):
         """
@@ -354,6 +682,63 @@ def remove_listener(self, listener_id, event):
             del self.__events[event]
             del self.__handlers[event]
 
+    def remove_listeners(self, listener_id):
+        """
+        Remove a listener from all its events and drop its queued events.
+
+        :param listener_id: The unique id for the listener
+        :type listener_id: string
+        """
+        for event, listeners in list(self.__events.items()):
+            if listener_id in listeners:
+                self.remove_listener(listener_id, event)
+        self.__queue.pop(listener_id, None)
+        self.__last_seen.pop(listener_id, None)
+        flush_call = self.__flush_calls.pop(listener_id, None)
+        if flush_call:
+            flush_call.cancel()
+
+    def is_idle(self, listener_id, timeout):
+        """
+        Check whether a listener has stopped getting its events.
+
+        :param listener_id: The unique id for the listener
+        :type listener_id: string
+        :param timeout: The seconds without a get_events request or event stream
+        :type timeout: float
+
+        :returns: True if the listener has no pending request or stream and
+            got no events for timeout seconds
+        :rtype: bool
+        """
+        if listener_id in self.__requests or listener_id in self.__streams:
+            return False
+        return reactor.seconds() - self.__last_seen.get(listener_id, 0) >= timeout
+
+
+class EventStream(resource.Resource):
+    """
+    A Twisted Web resource streaming the events of the session to the browser as
+    server-sent events, each message is the JSON list of events get_events returns.
+    """
+    isLeaf = True
+
+    def render_GET(self, request):  # NOQA: N802
+        try:
+            component.get('Auth').check_request(request, level=AUTH_LEVEL_DEFAULT)
+        except AuthError:
+            request.setResponseCode(http.FORBIDDEN)
+            return b''
+
+        event_queue = component.get('Web').event_queue
+        listener_id = request.session_id
+        request.setHeader('content-type', 'text/event-stream')
+        request.setHeader('cache-control', 'no-cache')
+        request.write(b'retry: 5000\n\n')
+        event_queue.add_stream(listener_id, request)
+        request.notifyFinish().addBoth(lambda dummy: event_queue.remove_stream(listener_id, request))
+        return server.NOT_DONE_YET
+
 
 class WebApi(JSONComponent):
     """
@@ -369,6 +754,16 @@ def __init__(self):
             self.host_list.save()
         self.core_config = CoreConfig()
         self.event_queue = EventQueue()
+        # The status keys of the sessions subscribed to status updates, {session_id: keys}
+        self.status_subscribers = {}
+        self.status_subscribers_cleaner = LoopingCall(self._clean_status_subscribers)
+        # The shared results of the daemon calls, {(method, args): (time, result)}
+        self.shared_results = {}
+        # The callers waiting for a shared daemon call, {(method, args): [deferreds]}
+        self.shared_calls = {}
+        # The last torrents sent to each session by update_ui, {session_id: {...}}
+        self.ui_sessions = {}
+        self.ui_update_id = 0
         try:
             self.sessionproxy = component.get('SessionProxy')
         except KeyError:
@@ -401,6 +796,10 @@ def enable(self):
         return defer.succeed(True)
 
     def _on_client_disconnect(self, *args):
+        # The daemon subscription ended with the daemon session
+        self.status_subscribers.clear()
+        if self.status_subscribers_cleaner.running:
+            self.status_subscribers_cleaner.stop()
         component.get('Web.PluginManager').stop()
         return self.stop()
 
@@ -428,6 +827,8 @@ def start(self):
     def stop(self):
         self.core_config.stop()
         self.sessionproxy.stop()
+        self.shared_results.clear()
+        self.ui_sessions.clear()
         return defer.succeed(True)
 
     def _connect_daemon(self, host='localhost', port=58846, username='', password=''):
@@ -485,15 +886,98 @@ def on_disconnect(reason):
         d.addCallback(on_disconnect)
         return d
 
+    def _call_shared(self, method, *args):
+        """
+        Call a core method, sharing the result with the concurrent calls and the
+        calls in the following UI_CACHE_TIME seconds with the same arguments.
+
+        :param method: the name of the core method
+        :type method: string
+
+        :returns: a deferred firing with the result, which must not be modified
+        :rtype: twisted.internet.defer.Deferred
+        """
+        key = (method, args)
+        cached = self.shared_results.get(key)
+        if cached and time.time() - cached[0] < UI_CACHE_TIME:
+            return defer.succeed(cached[1])
+
+        d = Deferred()
+        if key in self.shared_calls:
+            self.shared_calls[key].append(d)
+            return d
+        self.shared_calls[key] = [d]
+
+        def on_result(result):
+            self.shared_results[key] = (time.time(), result)
+            for waiting in self.shared_calls.pop(key):
+                waiting.callback(result)
+
+        def on_error(failure):
+            for waiting in self.shared_calls.pop(key):
+                waiting.errback(failure)
+
+        getattr(client.core, method)(*args).addCallbacks(on_result, on_error)
+        return d
+
+    def _diff_torrents(self, session_id, torrents, since, view):
+        """
+        Diff the torrents with the last torrents sent to the session.
+
+        :param session_id: the session id
+        :type session_id: string
+        :param torrents: the status of the torrents, {torrent_id: status}
+        :type torrents: dict
+        :param since: the update id the session received last
+        :type since: int
+        :param view: identifies the keys and filters of the torrents
+        :type view: string
+
+        :returns: the changed keys of the changed and added torrents, the removed
+            torrent_ids, or None if the full torrents must be sent
+        :rtype: tuple
+        """
+        now = time.time()
+        for other_id, ui_session in list(self.ui_sessions.items()):
+            if now - ui_session['time'] > UI_SESSION_TIMEOUT:
+                del self.ui_sessions[other_id]
+
+        previous = self.ui_sessions.get(session_id)
+        if not previous or previous['update_id'] != since or previous['view'] != view:
+            return None, None
+
+        previous = previous['torrents']
+        changed = {}
+        for torrent_id, status in torrents.items():
+            old_status = previous.get(torrent_id)
+            if old_status is None:
+                changed[torrent_id] = status
+                continue
+            diff = dict((key, value) for key, value in status.items()
+                        if key not in old_status or old_status[key] != value)
+            if diff:
+                changed[torrent_id] = diff
+        removed = [torrent_id for torrent_id in previous if torrent_id not in torrents]
+        return changed, removed
+
     @export
-    def update_ui(self, keys, filter_dict):
+    def update_ui(self, keys, filter_dict, since=None, tabular=False):
         """
         Gather the information required for updating the web interface.
 
+        The session stats, filter tree and free space are shared by all the
+        sessions updating within UI_CACHE_TIME seconds.
+
         :param keys: the information about the torrents to gather
         :type keys: list
         :param filter_dict: the filters to apply when selecting torrents.
         :type filter_dict: dictionary
+        :param since: the update_id of the last update the session applied, if
+            set the torrents only include the keys changed since that update
+            when the keys and filters are unchanged, and `torrents_diff` is True.
+        :type since: int
+        :param tabular: if True the torrents are packed by `pack_torrents`.
+        :type tabular: bool
         :returns: The torrent and ui information.
         :rtype: dictionary
         """
@@ -513,6 +997,12 @@ def update_ui(self, keys, filter_dict):
             d.callback(ui_info)
             return d
 
+        session_id = None
+        if since is not None:
+            session_id = __request__.session_id
+            # Kept if getting the torrents fails, the session applies no torrents.
+            ui_info['update_id'] = since
+
         def got_stats(stats):
             ui_info['stats']['num_connections'] = stats['num_peers']
             ui_info['stats']['upload_rate'] = stats['payload_upload_rate']
@@ -532,7 +1022,26 @@ def got_external_ip(external_ip):
             ui_info['stats']['external_ip'] = external_ip
 
         def got_torrents(torrents):
-            ui_info['torrents'] = torrents
+            previous = None
+            if since is not None:
+                view = json.dumps([keys, filter_dict], sort_keys=True)
+                changed, removed = self._diff_torrents(session_id, torrents, since, view)
+                if changed is not None:
+                    previous = self.ui_sessions[session_id]['torrents']
+                self.ui_update_id += 1
+                self.ui_sessions[session_id] = {
+                    'update_id': self.ui_update_id,
+                    'view': view,
+                    'torrents': torrents,
+                    'time': time.time(),
+                }
+                ui_info['update_id'] = self.ui_update_id
+                ui_info['torrents_diff'] = changed is not None
+                if changed is not None:
+                    torrents = changed
+                    ui_info['torrents_removed'] = removed
+
+            ui_info['torrents'] = pack_torrents(torrents, keys, previous) if tabular else torrents
 
         def on_complete(result):
             d.callback(ui_info)
@@ -540,10 +1049,10 @@ def on_complete(result):
         d1 = component.get('SessionProxy').get_torrents_status(filter_dict, keys)
         d1.addCallback(got_torrents)
 
-        d2 = client.core.get_filter_tree()
+        d2 = self._call_shared('get_filter_tree')
         d2.addCallback(got_filters)
 
-        d3 = client.core.get_session_status([
+        d3 = self._call_shared('get_session_status', (
             'num_peers',
             'payload_download_rate',
             'payload_upload_rate',
@@ -551,13 +1060,13 @@ def on_complete(result):
             'upload_rate',
             'dht_nodes',
             'has_incoming_connections'
-        ])
+        ))
         d3.addCallback(got_stats)
 
-        d4 = client.core.get_free_space(self.core_config.get('download_location'))
+        d4 = self._call_shared('get_free_space', self.core_config.get('download_location'))
         d4.addCallback(got_free_space)
 
-        d5 = client.core.get_external_ip()
+        d5 = self._call_shared('get_external_ip')
         d5.addCallback(got_external_ip)
 
         dl = DeferredList([d1, d2, d3, d4, d5], consumeErrors=True)
@@ -979,6 +1488,79 @@ def get_events(self):
         """
         return self.event_queue.get_events(__request__.session_id)
 
+    def _subscribe_torrents_status(self):
+        keys = set()
+        for session_keys in self.status_subscribers.values():
+            if not session_keys:
+                # All the keys
+                keys = set()
+                break
+            keys.update(session_keys)
+        return client.core.subscribe_torrents_status({}, sorted(keys), STATUS_UPDATE_INTERVAL)
+
+    @export
+    def subscribe_torrents_status(self, keys):
+        """
+        Subscribe the session to the changes of the torrents status, sent as
+        TorrentsStatusUpdateEvents with the other events of the session.
+
+        The web server holds a single daemon subscription for the union of the
+        keys of all the subscribed sessions.
+
+        :param keys: the status keys, all the keys if empty
+        :type keys: list of strings
+
+        :returns: the full status of the torrents
+        :rtype: dict
+        """
+        session_id = __request__.session_id
+        self.status_subscribers[session_id] = keys
+        self.event_queue.add_listener(session_id, 'TorrentsStatusUpdateEvent')
+        if not self.status_subscribers_cleaner.running:
+            self.status_subscribers_cleaner.start(EVENTS_TIMEOUT, now=False)
+
+        def on_subscribed(status):
+            # Resubscribing resets the diffs, so the other sessions get the full status too.
+            for listener_id in self.status_subscribers:
+                if listener_id != session_id:
+                    self.event_queue.push_event(listener_id, 'TorrentsStatusUpdateEvent', (status, []))
+            return status
+        return self._subscribe_torrents_status().addCallback(on_subscribed)
+
+    @export
+    def unsubscribe_torrents_status(self):
+        """
+        Stop the status updates of subscribe_torrents_status for the session.
+        """
+        session_id = __request__.session_id
+        if self.status_subscribers.pop(session_id, None) is None:
+            return
+        self.event_queue.remove_listener(session_id, 'TorrentsStatusUpdateEvent')
+        return self._on_status_subscriber_removed()
+
+    def _on_status_subscriber_removed(self):
+        if self.status_subscribers:
+            return
+        if self.status_subscribers_cleaner.running:
+            self.status_subscribers_cleaner.stop()
+        return client.core.unsubscribe_torrents_status()
+
+    def _clean_status_subscribers(self):
+        """
+        Drop the subscribers whose web session expired or that stopped getting
+        their events, e.g. the browser tab was closed, with their event listeners.
+        """
+        sessions = component.get('Auth').config['sessions']
+        for session_id in list(self.status_subscribers):
+            if session_id in sessions and not self.event_queue.is_idle(session_id, EVENTS_TIMEOUT):
+                continue
+            log.debug('Dropping the status subscription of inactive session %s', session_id)
+            del self.status_subscribers[session_id]
+            self.event_queue.remove_listeners(session_id)
+        d = self._on_status_subscriber_removed()
+        if d:
+            d.addErrback(lambda failure: log.debug('Unable to unsubscribe from the torrents status: %s', failure))
+
 
 class WebUtils(JSONComponent):
     """
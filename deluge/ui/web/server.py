@@ -8,6 +8,7 @@
 #
 
 import fnmatch
+import hashlib
 import json
 import logging
 import mimetypes
@@ -25,7 +26,7 @@
 from deluge.ui.tracker_icons import TrackerIcons
 from deluge.ui.util import lang
 from deluge.ui.web.auth import Auth
-from deluge.ui.web.common import Template, compress
+from deluge.ui.web.common import Template, compress, gzip_data
 from deluge.ui.web.json_api import JSON, WebApi, WebUtils
 from deluge.ui.web.pluginmanager import PluginManager
 
@@ -50,6 +51,9 @@
     'theme': 'gray',
     'first_login': True,
     'language': '',
+    'bundle_scripts': False,
+    # The library encoding the JSON responses: json, ujson or orjson
+    'json_library': 'json',
 
     # Server Settings
     'base': '/',
@@ -65,6 +69,11 @@
     'show_session_speed', 'base', 'first_login'
 )
 
+# Browsers revalidate the static files on each use, getting a 304 response while the ETag matches.
+ASSET_CACHE_CONTROL = 'no-cache'
+# The path of the script concatenating the scripts of a script type, formatted with the type.
+SCRIPTS_BUNDLE = 'bundle-%s.js'
+
 
 def rpath(*paths):
     """Convert a relative path into an absolute path relative to the location
@@ -73,11 +82,98 @@ def rpath(*paths):
     return common.resource_filename('deluge.ui.web', os.path.join(*paths))
 
 
+class AssetCache(object):
+    """
+    Holds the gzip compressed contents of static files in memory, they are only
+    read and compressed again when the files are modified.
+    """
+
+    def __init__(self):
+        self.__assets = {}
+
+    def clear(self):
+        """
+        Removes all the files from the cache.
+        """
+        self.__assets.clear()
+
+    def get(self, paths, separator=b''):
+        """
+        Gets a cached asset, reading it if it is not cached or modified.
+
+        :param paths: The files to concatenate into the asset
+        :type paths: tuple
+        :keyword separator: Inserted between the files
+        :type separator: bytes
+        :returns: The asset, with the keys data, etag, mtime and mime_type
+        :rtype: dict
+        :raises OSError: If one of the files does not exist
+        """
+        stats = [os.stat(path) for path in paths]
+        signature = [(stat.st_mtime, stat.st_size) for stat in stats]
+        asset = self.__assets.get(paths)
+        if asset and asset['signature'] == signature:
+            return asset
+
+        contents = []
+        for path in paths:
+            with open(path, 'rb') as _file:
+                contents.append(_file.read())
+        data = separator.join(contents)
+        log.debug('Caching asset: %s', paths)
+        asset = {
+            'signature': signature,
+            # Compressed once, so use the best compression.
+            'data': gzip_data(data, 9),
+            'etag': '"%s"' % hashlib.sha1(data).hexdigest(),
+            'mtime': max(stat.st_mtime for stat in stats),
+            'mime_type': mimetypes.guess_type(paths[0])[0],
+        }
+        self.__assets[paths] = asset
+        return asset
+
+    def render(self, request, paths, separator=b''):
+        """
+        Writes the headers of a cached asset and returns its compressed data,
+        or an empty body with a 304 response if the client has the asset.
+
+        :param request: The request of the asset
+        :type request: twisted.web.http.Request
+        :param paths: The files to concatenate into the asset
+        :type paths: tuple
+        :keyword separator: Inserted between the files
+        :type separator: bytes
+        :returns: The response body
+        :rtype: bytes
+        """
+        asset = self.get(paths, separator)
+        request.setHeader('content-type', asset['mime_type'])
+        request.setHeader('cache-control', ASSET_CACHE_CONTROL)
+        if request.getHeader('if-none-match'):
+            # The ETag takes precedence over the modification time.
+            request.setHeader('last-modified', http.datetimeToString(asset['mtime']))
+            cached = request.setETag(asset['etag'])
+        else:
+            request.setETag(asset['etag'])
+            cached = request.setLastModified(asset['mtime'])
+        if cached == http.CACHED:
+            return b''
+        request.setHeader('content-encoding', 'gzip')
+        return asset['data']
+
+
 class GetText(resource.Resource):
+
+    def __init__(self):
+        resource.Resource.__init__(self)
+        self.__template = None
+
     def render(self, request):
         request.setHeader('content-type', 'text/javascript; encoding=utf-8')
-        template = Template(filename=rpath('js', 'gettext.js'))
-        return compress(template.render(), request)
+        if not self.__template:
+            self.__template = Template(filename=rpath('js', 'gettext.js'))
+        # Rendered on each request as the translations depend on the language setting.
+        return compress(self.__template.render(), request)
 
 
 class Upload(resource.Resource):
@@ -199,6 +295,7 @@ def __init__(self, name, *directories):
         component.Component.__init__(self, name)
 
         self.__paths = {}
+        self.__assets = AssetCache()
         for directory in directories:
             self.add_directory(directory)
 
@@ -206,10 +303,12 @@ def add_directory(self, directory, path=''):
         log.debug('Adding directory `%s` with path `%s`', directory, path)
         paths = self.__paths.setdefault(path, [])
         paths.append(directory)
+        self.__assets.clear()
 
     def remove_directory(self, directory, path=''):
         log.debug('Removing directory `%s`', directory)
         self.__paths[path].remove(directory)
+        self.__assets.clear()
 
     def getChild(self, path, request):  # NOQA: N802
         if hasattr(request, 'lookup_path'):
@@ -228,14 +327,10 @@ def render(self, request):
 
         filename = os.path.basename(request.path)
         for directory in self.__paths[path]:
-            if os.path.join(directory, filename):
+            if os.path.isfile(os.path.join(directory, filename)):
                 path = os.path.join(directory, filename)
                 log.debug("Serving path: '%s'", path)
-                mime_type = mimetypes.guess_type(path)
-                request.setHeader('content-type', mime_type[0])
-                with open(path, 'rb') as _file:
-                    data = _file.read()
-                return compress(data, request)
+                return self.__assets.render(request, (path,))
 
         request.setResponseCode(http.NOT_FOUND)
         return '<h1>404 - Not Found</h1>'
@@ -248,7 +343,8 @@ def __init__(self):
         component.Component.__init__(self, 'Scripts')
         self.__scripts = {}
         for script_type in ['normal', 'debug', 'dev']:
-            self.__scripts[script_type] = {'scripts': {}, 'order': [], 'files_exist': True}
+            self.__scripts[script_type] = {'scripts': {}, 'order': [], 'files_exist': True, 'cache': None}
+        self.__assets = AssetCache()
 
     def has_script_type_files(self, script_type):
         """Returns whether all the script files exist for this script type.
@@ -280,6 +376,7 @@ def add_script(self, path, filepath, script_type=None):
         self.__scripts[script_type]['order'].append(path)
         if not os.path.isfile(filepath):
             self.__scripts[script_type]['files_exist'] = False
+        self._clear_cache(script_type)
 
     def add_script_folder(self, path, filepath, script_type=None, recurse=True):
         """
@@ -301,6 +398,7 @@ def add_script_folder(self, path, filepath, script_type=None, recurse=True):
         self.__scripts[script_type]['order'].append(path)
         if not os.path.isdir(filepath):
             self.__scripts[script_type]['files_exist'] = False
+        self._clear_cache(script_type)
 
     def remove_script(self, path, script_type=None):
         """
@@ -316,18 +414,31 @@ def remove_script(self, path, script_type=None):
 
         del self.__scripts[script_type]['scripts'][path]
         self.__scripts[script_type]['order'].remove(path)
+        self._clear_cache(script_type)
+
+    def _clear_cache(self, script_type):
+        self.__scripts[script_type]['cache'] = None
+        self.__assets.clear()
 
     def get_scripts(self, script_type=None):
         """
         Returns a list of the scripts that can be used for producing
         script tags.
 
+        The list is cached until a script is added or removed, except for the
+        dev scripts as the script folders may change while developing.
+
         :keyword script_type: The type of scripts to get (normal, debug, dev)
         :param script_type: string
         """
         if script_type not in ('dev', 'debug', 'normal'):
             script_type = 'normal'
 
+        if self.__scripts[script_type]['cache'] is None or script_type == 'dev':
+            self.__scripts[script_type]['cache'] = self._find_scripts(script_type)
+        return list(self.__scripts[script_type]['cache'])
+
+    def _find_scripts(self, script_type):
         _scripts = self.__scripts[script_type]['scripts']
         _order = self.__scripts[script_type]['order']
 
@@ -372,30 +483,58 @@ def getChild(self, path, request):  # NOQA: N802
             request.lookup_path = path
         return self
 
-    def render(self, request):
-        log.debug("Requested path: '%s'", request.lookup_path)
+    def get_script_path(self, lookup_path):
+        """
+        Returns the physical location of a script.
 
+        :param lookup_path: The path of the script, relative to the script resource
+        :type lookup_path: string
+        :returns: The location, or None if the script does not exist
+        :rtype: string
+        """
         for script_type in ('dev', 'debug', 'normal'):
             scripts = self.__scripts[script_type]['scripts']
             for pattern in scripts:
-                if not request.lookup_path.startswith(pattern):
+                if not lookup_path.startswith(pattern):
                     continue
 
                 filepath = scripts[pattern]
                 if isinstance(filepath, tuple):
                     filepath = filepath[0]
 
-                path = filepath + request.lookup_path[len(pattern):]
+                path = filepath + lookup_path[len(pattern):]
+                if os.path.isfile(path):
+                    return path
+        return None
 
-                if not os.path.isfile(path):
-                    continue
+    def get_bundle_paths(self, script_type):
+        """
+        Returns the physical locations of the scripts of a script type, in the
+        order of `get_scripts`, which are concatenated into its bundle.
 
-                log.debug("Serving path: '%s'", path)
-                mime_type = mimetypes.guess_type(path)
-                request.setHeader('content-type', mime_type[0])
-                with open(path, 'rb') as _file:
-                    data = _file.read()
-                return compress(data, request)
+        :param script_type: The type of scripts (normal, debug, dev)
+        :type script_type: string
+        :returns: The locations of the scripts
+        :rtype: tuple
+        """
+        paths = [self.get_script_path(script[len('js/'):]) for script in self.get_scripts(script_type)]
+        return tuple(path for path in paths if path)
+
+    def render(self, request):
+        log.debug("Requested path: '%s'", request.lookup_path)
+
+        for script_type in ('dev', 'debug', 'normal'):
+            if request.lookup_path != SCRIPTS_BUNDLE % script_type:
+                continue
+            paths = self.get_bundle_paths(script_type)
+            if paths:
+                # Scripts may not end with a newline or semicolon.
+                return self.__assets.render(request, paths, b'\n;\n')
+
+        path = self.get_script_path(request.lookup_path)
+        if path:
+            log.debug("Serving path: '%s'", path)
+            return self.__assets.render(request, (path,))
 
         request.setResponseCode(http.NOT_FOUND)
         return '<h1>404 - Not Found</h1>'
@@ -412,6 +551,7 @@ class TopLevel(resource.Resource):
 
     def __init__(self):
         resource.Resource.__init__(self)
+        self.__template = None
         self.putChild('css', LookupResource('Css', rpath('css')))
         self.putChild('gettext.js', GetText())
         self.putChild('flag', Flag())
@@ -526,19 +666,23 @@ def render(self, request):
                         log.warning("WebUI falling back to '%s' mode.", script_type)
                     break
 
-        scripts = component.get('Scripts').get_scripts(script_type)
+        web_config = component.get('Web').get_config()
+        if web_config['bundle_scripts'] and script_type == 'normal':
+            scripts = ['js/' + SCRIPTS_BUNDLE % script_type]
+        else:
+            scripts = component.get('Scripts').get_scripts(script_type)
         scripts.insert(0, 'gettext.js')
 
-        template = Template(filename=rpath('index.html'))
+        if not self.__template:
+            self.__template = Template(filename=rpath('index.html'))
         request.setHeader('content-type', 'text/html; charset=utf-8')
 
-        web_config = component.get('Web').get_config()
         web_config['base'] = request.base
         config = dict([(key, web_config[key]) for key in UI_CONFIG_KEYS])
         js_config = json.dumps(config)
         # Insert the values into 'index.html' and return.
-        return template.render(scripts=scripts, stylesheets=self.stylesheets,
-                               debug=debug_arg, base=request.base, js_config=js_config)
+        return self.__template.render(scripts=scripts, stylesheets=self.stylesheets,
+                                      debug=debug_arg, base=request.base, js_config=js_config)
 
 
 class DelugeWeb(component.Component):
@@ -559,6 +703,7 @@ def __init__(self, options=None, daemon=True):
         self.config.register_set_function('language', self._on_language_changed)
         self.socket = None
         self.top_level = TopLevel()
+        self.config.register_set_function('json_library', self._on_json_library_changed)
 
         self.interface = self.config['interface']
         self.port = self.config['port']
@@ -595,6 +740,10 @@ def _on_language_changed(self, key, value):
         log.debug("Setting UI language '%s'", value)
         lang.set_language(value)
 
+    def _on_json_library_changed(self, key, value):
+        log.debug("Setting JSON library '%s'", value)
+        component.get('JSON').set_json_library(value)
+
     def install_signal_handlers(self):
         # Since twisted assigns itself all the signals may as well make
         # use of it.